@@ -0,0 +1,93 @@
+"""
+Compares the two comment ingestion engines on live Reddit data: expanding the comment tree of every approved
+post ("trees") and reading the subreddit comment stream ("stream"), both back to the same start time.
+Reports comments gathered per API request. Needs the Reddit credentials in .env; uses the [reddit_api] budget.
+
+    python -m benchmarks.comment_ingestion --subreddits de,france --hours 24
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+
+from src.core.config_utils import get_config
+from src.core.connect_reddit import connect_reddit
+from src.core.request_scheduler import RequestScheduler
+from src.scrapers.comment_scraper import scrape_post_comments
+from src.scrapers.comment_stream import scrape_subreddit_stream
+from src.scrapers.subreddit_scraper import scrape_subreddit_posts
+
+
+def measured(scheduler, function):
+    requests_before = scheduler.total_requests
+    start = time.perf_counter()
+    result = function()
+    return result, scheduler.total_requests - requests_before, time.perf_counter() - start
+
+
+def report(name, comments, requests, seconds):
+    per_request = comments / requests if requests else 0.0
+    print(f"{name:<22} {comments:>8} comments {requests:>6} requests {per_request:>8.1f} comments/request {seconds:>7.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subreddits", required=True, help="Comma-separated subreddit names")
+    parser.add_argument("--hours", type=float, default=24, help="Comment window (default: 24 hours)")
+    parser.add_argument("--post-limit", type=int, default=get_config("reddit_post_scraper", "post_limit", type=int, fallback=150))
+    parser.add_argument("--comment-link-limit", type=int,
+                        default=get_config("reddit_comment_scraper", "comment_link_limit", type=int, fallback=32))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    logger = logging.getLogger("benchmark")
+    scheduler = RequestScheduler(requests_per_minute=get_config("reddit_api", "requests_per_minute", type=int, fallback=100),
+                                 burst=get_config("reddit_api", "burst", type=int, fallback=10))
+    reddit = connect_reddit(logger, scheduler)
+    scrape_till = datetime.utcnow() - timedelta(hours=args.hours)
+    approve_limit = get_config("reddit_post_scraper", "post_comment_approve_limit", type=int, fallback=50)
+
+    totals = {"trees": [0, 0, 0.0], "stream (approved)": [0, 0, 0.0], "stream (all)": [0, 0, 0.0]}
+    for subreddit_name in args.subreddits.split(","):
+        subreddit_name = subreddit_name.strip()
+        print(f"r/{subreddit_name}")
+
+        posts, listing_requests, listing_seconds = measured(
+            scheduler, lambda: scrape_subreddit_posts(subreddit_name, None, logger, reddit, args.post_limit,
+                                                      approve_limit, scrape_till))
+        approved_ids = {post["post_id"] for post in posts if post["approved"]}
+
+        def expand_trees():
+            comments = []
+            for post_id in approved_ids:
+                comments.extend(scrape_post_comments(post_id, subreddit_name, None, logger, reddit, args.comment_link_limit))
+            return comments
+
+        tree_comments, tree_requests, tree_seconds = measured(scheduler, expand_trees)
+        (approved_comments, _, _), approved_requests, approved_seconds = measured(
+            scheduler, lambda: scrape_subreddit_stream(subreddit_name, None, logger, reddit, scrape_till, approved_ids))
+        (all_comments, _, reached), all_requests, all_seconds = measured(
+            scheduler, lambda: scrape_subreddit_stream(subreddit_name, None, logger, reddit, scrape_till))
+
+        # Both engines need the Step 2 post listing to know the approved posts; "stream (all)" does not.
+        results = {
+            "trees": (len(tree_comments), listing_requests + tree_requests, listing_seconds + tree_seconds),
+            "stream (approved)": (len(approved_comments), listing_requests + approved_requests,
+                                  listing_seconds + approved_seconds),
+            "stream (all)": (len(all_comments), all_requests, all_seconds),
+        }
+        for name, (comments, requests, seconds) in results.items():
+            report(f"  {name}", comments, requests, seconds)
+            totals[name][0] += comments
+            totals[name][1] += requests
+            totals[name][2] += seconds
+        if not reached:
+            print("  (the stream ended before the window start: Reddit served only its newest comments)")
+
+    print("Total")
+    for name, (comments, requests, seconds) in totals.items():
+        report(f"  {name}", comments, requests, seconds)
+
+
+if __name__ == "__main__":
+    main()
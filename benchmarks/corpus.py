@@ -0,0 +1,67 @@
+import random
+from pathlib import Path
+
+import pandas as pd
+
+# Small multilingual vocabulary so the synthetic corpus exercises the tokenizer like real comments do.
+VOCABULARY = (
+    "the people here are really friendly and the food is great but prices went up again "
+    "i love this city so much thank you for sharing this amazing photo what a beautiful view "
+    "government announced new taxes today nobody is happy about the traffic and the rent "
+    "das ist wirklich schön aber viel zu teuer merci beaucoup pour les infos très bien "
+    "gracias por compartir qué bonito lugar muy caro todo grazie mille bellissimo ottimo lavoro "
+    "dziękuję bardzo to jest super teşekkürler çok güzel spasibo bolshoe obrigado muito bom"
+).split()
+
+
+def synthetic_corpus(size=2000, seed=7):
+    """
+    Deterministic corpus with a Reddit-like, heavily skewed length distribution:
+    most comments are a sentence or two, a few are essays.
+    """
+    rng = random.Random(seed)
+    comments = []
+    for _ in range(size):
+        word_count = max(3, min(900, int(rng.lognormvariate(3.0, 1.0))))
+        comments.append(" ".join(rng.choice(VOCABULARY) for _ in range(word_count)))
+    return comments
+
+
+# Raw-comment noise for the text normalisation benchmark: markup, URLs, numbers, emoji, unicode punctuation and spacing.
+RAW_NOISE = [
+    "https://www.reddit.com/r/europe/comments/abc123/", "www.example.org/page?id=42", "http://i.imgur.com/x.jpg",
+    "2024", "3.5%", "€120", "10:30", "1st", "²", "٣", "!!!", "?", "...", "—", "“quoted”", "l'été", "it's",
+    "&amp;", "**bold**", "_underscore_", "😀", "🇩🇪", "👍🏽", "\n\n", "\t", "\u00a0", "\u3000", "İstanbul", "ÇOK", "ß",
+]
+
+
+def raw_corpus(size=2000, seed=7):
+    """Deterministic corpus of raw (not yet preprocessed) comments, for the text normalisation benchmark."""
+    rng = random.Random(seed)
+    comments = []
+    for _ in range(size):
+        word_count = max(3, min(900, int(rng.lognormvariate(3.0, 1.0))))
+        words = []
+        for _ in range(word_count):
+            word = rng.choice(RAW_NOISE) if rng.random() < 0.15 else rng.choice(VOCABULARY)
+            words.append(word.capitalize() if rng.random() < 0.1 else word)
+        comments.append(" ".join(words))
+    return comments
+
+
+def load_corpus(path=None, size=2000, seed=7):
+    """
+    Loads 'size' bodies from preprocessed comments (a CSV file or a 'date=<date>' Parquet partition),
+    or builds the synthetic corpus if no path is given. Only the 'body' column is read.
+    """
+    if path is None:
+        return synthetic_corpus(size, seed)
+
+    if Path(path).is_dir():
+        bodies = pd.read_parquet(path, columns=["body"])["body"]
+    else:
+        bodies = pd.read_csv(path, usecols=["body"])["body"]
+    bodies = bodies.dropna().astype(str)
+    if len(bodies) > size:
+        bodies = bodies.sample(n=size, random_state=seed)
+    return bodies.tolist()
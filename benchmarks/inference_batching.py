@@ -0,0 +1,55 @@
+"""
+Compares fixed-size pipeline batching with length-bucketed, token-budget batching.
+
+    python -m benchmarks.inference_batching
+    python -m benchmarks.inference_batching --corpus data/processed/preprocessed_comments/2025-01-05.csv --size 5000
+"""
+import argparse
+import time
+
+from transformers import pipeline
+
+from benchmarks.corpus import load_corpus
+from src.analyzers.inference_engine import BucketedInferenceEngine
+from src.analyzers.sentiment_analyzer import resolve_model_path
+
+
+def timed(fn, text_list):
+    start = time.perf_counter()
+    results = fn(text_list)
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=None, help="Preprocessed comments CSV (default: synthetic corpus)")
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--model", default="roberta", choices=["roberta", "distilbert"])
+    parser.add_argument("--batch-size", type=int, default=64, help="Fixed batch size of the baseline")
+    parser.add_argument("--max-batch-tokens", type=int, default=16384)
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    text_list = load_corpus(args.corpus, args.size)
+    model_pipeline = pipeline("sentiment-analysis", model=resolve_model_path(args.model), framework="pt",
+                              truncation=True, max_length=512, device=args.device)
+    engine = BucketedInferenceEngine(model_pipeline, max_batch_tokens=args.max_batch_tokens, max_length=512)
+
+    # Warm-up so neither side pays for lazy initialisation.
+    model_pipeline(text_list[:8], batch_size=8)
+    engine(text_list[:8])
+
+    fixed_results, fixed_seconds = timed(lambda texts: model_pipeline(texts, batch_size=args.batch_size), text_list)
+    bucketed_results, bucketed_seconds = timed(engine, text_list)
+
+    agreement = sum(a["label"] == b["label"] for a, b in zip(fixed_results, bucketed_results)) / len(text_list)
+    max_score_diff = max(abs(a["score"] - b["score"]) for a, b in zip(fixed_results, bucketed_results))
+
+    print(f"Corpus: {len(text_list)} comments ({args.corpus or 'synthetic'}), model: {args.model}, device: {args.device}")
+    print(f"fixed    (batch_size={args.batch_size}):        {len(text_list) / fixed_seconds:8.1f} comments/s  ({fixed_seconds:.1f}s)")
+    print(f"bucketed (max_batch_tokens={args.max_batch_tokens}): {len(text_list) / bucketed_seconds:8.1f} comments/s  ({bucketed_seconds:.1f}s)")
+    print(f"speedup: {fixed_seconds / bucketed_seconds:.2f}x, label agreement: {agreement:.2%}, max score diff: {max_score_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Measures the confidence-gated cascade (model_name = cascade) against a full XLM-RoBERTa run:
+for every threshold, the share of comments escalated to XLM-RoBERTa, the label agreement with
+XLM-RoBERTa on all comments, and the CPU time against XLM-RoBERTa alone.
+
+    python -m benchmarks.model_cascade
+    python -m benchmarks.model_cascade --corpus data/processed/preprocessed_comments/date=2025-01-05 --thresholds 0.7,0.8,0.9
+"""
+import argparse
+import time
+
+from transformers import pipeline
+
+from benchmarks.corpus import load_corpus
+from src.analyzers.inference_engine import BucketedInferenceEngine, CascadeInferenceEngine
+from src.analyzers.sentiment_analyzer import CASCADE_FAST_MODEL, DISTILBERT_LABELS, resolve_model_path
+
+
+def load_engine(model_name, max_batch_tokens):
+    model_pipeline = pipeline("sentiment-analysis", model=resolve_model_path(model_name), framework="pt",
+                              truncation=True, max_length=512, device="cpu")
+    engine = BucketedInferenceEngine(model_pipeline, max_batch_tokens=max_batch_tokens, max_length=512)
+    engine(["warm-up"])
+    return engine
+
+
+def timed(engine, text_list):
+    start = time.process_time()
+    results = engine(text_list)
+    return results, time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=None, help="Preprocessed comments CSV or Parquet partition (default: synthetic corpus)")
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--fast-model", default=CASCADE_FAST_MODEL)
+    parser.add_argument("--thresholds", default="0.6,0.7,0.8,0.9,0.95")
+    parser.add_argument("--max-batch-tokens", type=int, default=16384)
+    args = parser.parse_args()
+
+    text_list = load_corpus(args.corpus, args.size)
+    large_engine = load_engine("roberta", args.max_batch_tokens)
+    fast_engine = load_engine(args.fast_model, args.max_batch_tokens)
+    fast_labels = DISTILBERT_LABELS if args.fast_model.lower() == "distilbert" else None
+
+    reference, reference_seconds = timed(large_engine, text_list)
+    reference_labels = [result["label"].upper() for result in reference]
+
+    print(f"Corpus: {len(text_list)} comments ({args.corpus or 'synthetic'}), fast model: {args.fast_model}")
+    print(f"xlm-roberta only      {reference_seconds:7.1f}s CPU")
+    for threshold in (float(value) for value in args.thresholds.split(",")):
+        cascade = CascadeInferenceEngine(fast_engine, large_engine, threshold, fast_labels)
+        results, seconds = timed(cascade, text_list)
+        agreement = sum(result["label"] == label for result, label in zip(results, reference_labels)) / len(text_list)
+        print(f"cascade @ {threshold:<5}       {seconds:7.1f}s CPU ({reference_seconds / seconds:.2f}x), "
+              f"{cascade.escalated / len(text_list):6.1%} escalated, label agreement with xlm-roberta {agreement:.2%}")
+
+
+if __name__ == "__main__":
+    main()
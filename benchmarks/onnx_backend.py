@@ -0,0 +1,82 @@
+"""
+Compares the PyTorch backend (BucketedInferenceEngine, as used with batching = bucketed) with the ONNX Runtime
+backend (FP32 and dynamic INT8) on the same token-budget batches.
+Reports throughput and agreement with PyTorch against the documented tolerance.
+
+    python -m benchmarks.onnx_backend
+    python -m benchmarks.onnx_backend --model distilbert --corpus data/processed/preprocessed_comments/2025-01-05.csv
+"""
+import argparse
+import time
+
+import numpy as np
+from transformers import pipeline
+
+from benchmarks.corpus import load_corpus
+from src.analyzers.inference_engine import BucketedInferenceEngine
+from src.analyzers.onnx_backend import (
+    ensure_onnx_model,
+    OnnxInferenceEngine,
+    LABEL_AGREEMENT_TOLERANCE,
+    MEAN_SCORE_DIFF_TOLERANCE
+)
+from src.analyzers.sentiment_analyzer import resolve_model_path, resolve_model_revision
+
+
+def run(engine, text_list):
+    start = time.perf_counter()
+    results = engine(text_list)
+    return results, time.perf_counter() - start
+
+
+def compare(reference, candidate):
+    agreement = np.mean([a["label"] == b["label"] for a, b in zip(reference, candidate)])
+    score_diffs = np.abs([a["score"] - b["score"] for a, b in zip(reference, candidate)])
+    return agreement, score_diffs.mean(), score_diffs.max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=None, help="Preprocessed comments CSV (default: synthetic corpus)")
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--model", default="roberta", choices=["roberta", "distilbert"])
+    parser.add_argument("--max-batch-tokens", type=int, default=16384)
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads (0 = default)")
+    args = parser.parse_args()
+
+    text_list = load_corpus(args.corpus, args.size)
+    model_path = resolve_model_path(args.model)
+    model_revision = resolve_model_revision(model_path)
+
+    engines = {
+        "pytorch-bucketed": BucketedInferenceEngine(
+            pipeline("sentiment-analysis", model=model_path, framework="pt", device="cpu"),
+            max_batch_tokens=args.max_batch_tokens),
+    }
+    for label, quantize in (("onnx-fp32", False), ("onnx-int8", True)):
+        export_dir, model_file = ensure_onnx_model(model_path, model_revision, quantize=quantize)
+        engines[label] = OnnxInferenceEngine(export_dir, model_file, max_batch_tokens=args.max_batch_tokens,
+                                             num_threads=args.threads)
+
+    print(f"Corpus: {len(text_list)} comments ({args.corpus or 'synthetic'}), model: {model_path}@{model_revision[:12]}")
+    reference = None
+    reference_seconds = None
+    for label, engine in engines.items():
+        engine(text_list[:8])
+        results, seconds = run(engine, text_list)
+        line = f"{label:<16} {len(text_list) / seconds:8.1f} comments/s ({seconds:.1f}s)"
+
+        if reference is None:
+            reference, reference_seconds = results, seconds
+        else:
+            agreement, mean_diff, max_diff = compare(reference, results)
+            within = agreement >= LABEL_AGREEMENT_TOLERANCE and mean_diff <= MEAN_SCORE_DIFF_TOLERANCE
+            line += (f"  speedup {reference_seconds / seconds:.2f}x, label agreement {agreement:.2%}, "
+                     f"score diff mean {mean_diff:.4f} / max {max_diff:.4f} -> {'OK' if within else 'OUT OF TOLERANCE'}")
+        print(line)
+
+    print(f"Tolerance: label agreement >= {LABEL_AGREEMENT_TOLERANCE:.0%}, mean score diff <= {MEAN_SCORE_DIFF_TOLERANCE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Compares the old Step 5 scheduling (np.array_split into one chunk per core + pool.map) with the
+streaming micro-batch scheduler on a skewed corpus. Uses the model settings from config.ini.
+
+    python -m benchmarks.step5_scheduling --cores 4 --size 4000
+"""
+import argparse
+import logging
+import multiprocessing
+import time
+
+import numpy as np
+
+from benchmarks.corpus import load_corpus
+from src.analyzers.sentiment_analyzer import init_worker, process_micro_batch, analyze_streaming
+
+
+def skewed(text_list):
+    # Put every long comment into the first quarter, which is what makes one array_split chunk the straggler.
+    return sorted(text_list, key=len, reverse=True)
+
+
+def split_per_core(text_list, cores):
+    # The old scheduling: one contiguous (positions, texts) chunk per core, handed out once with pool.map.
+    return [(positions, [text_list[i] for i in positions]) for positions in np.array_split(np.arange(len(text_list)), cores)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=None, help="Preprocessed comments CSV (default: synthetic corpus)")
+    parser.add_argument("--size", type=int, default=4000)
+    parser.add_argument("--cores", type=int, default=4)
+    parser.add_argument("--micro-batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger = logging.getLogger("benchmark")
+    text_list = skewed(load_corpus(args.corpus, args.size))
+
+    with multiprocessing.Pool(processes=args.cores, initializer=init_worker) as pool:
+        # Warm every worker so model loading is not part of either measurement.
+        pool.map(process_micro_batch, split_per_core(text_list[:args.cores * 4], args.cores))
+
+        start = time.perf_counter()
+        pool.map(process_micro_batch, split_per_core(text_list, args.cores))
+        split_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        analyze_streaming(text_list, pool, logger, micro_batch_size=args.micro_batch_size, progress_seconds=3600)
+        streaming_seconds = time.perf_counter() - start
+
+    print(f"Corpus: {len(text_list)} comments ({args.corpus or 'synthetic'}), sorted longest-first, {args.cores} cores")
+    print(f"array_split + map:  {split_seconds:7.1f}s ({len(text_list) / split_seconds:.1f} comments/s)")
+    print(f"streaming ({args.micro_batch_size}/batch): {streaming_seconds:7.1f}s ({len(text_list) / streaming_seconds:.1f} comments/s)")
+    print(f"speedup: {split_seconds / streaming_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compares the original preprocess_text (four re.sub passes per comment through .apply) with the
+current one in src/utils/cleaners.py, and checks that both produce byte-identical output
+on the corpus and on every Unicode code point. Exits with status 1 if any output differs.
+
+    python -m benchmarks.text_normalisation --size 200000
+    python -m benchmarks.text_normalisation --corpus data/raw/weekly_scrapings/comments/2025-01-05.csv --workers 4
+"""
+import argparse
+import re
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.corpus import load_corpus, raw_corpus
+from src.utils.cleaners import preprocess_bodies, preprocess_text
+
+
+def legacy_preprocess_text(text):
+    text = text.lower()
+    text = re.sub(r'https?://\S+|www\.\S+', '', text)
+    text = re.sub(r'\d+', '', text)
+    text = re.sub(r'[^\w\s]', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text
+
+
+def code_point_cases():
+    # Every code point alone and in the contexts where the fast paths branch (ASCII neighbours, runs, URLs).
+    for code in range(0x110000):
+        char = chr(code)
+        yield from (char, f"a{char}b", f"x {char}  y", f"{char}{char}\t{char}", f"http{char}://q w", f"ß{char}é")
+
+
+def first_mismatch(reference, candidate, text_list):
+    for text in text_list:
+        expected, actual = reference(text), candidate(text)
+        if expected != actual:
+            return text, expected, actual
+    return None
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=None, help="Raw comments file with a 'body' column (default: synthetic raw corpus)")
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=1, help="Also time preprocess_bodies with this many processes")
+    parser.add_argument("--skip-code-points", action="store_true", help="Only check the corpus, not all code points")
+    args = parser.parse_args()
+
+    text_list = load_corpus(args.corpus, args.size) if args.corpus else raw_corpus(args.size)
+    bodies = pd.Series(text_list)
+    print(f"Corpus: {len(text_list)} comments ({args.corpus or 'synthetic raw'}), "
+          f"{sum(map(len, text_list)) / len(text_list):.0f} characters on average")
+
+    legacy_bodies, legacy_seconds = timed(lambda: bodies.apply(legacy_preprocess_text).tolist())
+    fast_bodies, fast_seconds = timed(preprocess_bodies, text_list)
+    print(f"preprocess_text: {legacy_seconds:6.2f}s -> {fast_seconds:6.2f}s ({legacy_seconds / fast_seconds:.2f}x)")
+
+    if args.workers > 1:
+        parallel_bodies, parallel_seconds = timed(preprocess_bodies, text_list, args.workers)
+        print(f"{args.workers} processes:     {legacy_seconds:6.2f}s -> {parallel_seconds:6.2f}s "
+              f"({legacy_seconds / parallel_seconds:.2f}x)")
+        if parallel_bodies != legacy_bodies:
+            print("FAIL: multi-process output differs from the original implementation.")
+            sys.exit(1)
+
+    failures = []
+    if fast_bodies != legacy_bodies:
+        failures.append(("preprocess_text", first_mismatch(legacy_preprocess_text, preprocess_text, text_list)))
+
+    if not args.skip_code_points:
+        cases = list(code_point_cases())
+        mismatch = first_mismatch(legacy_preprocess_text, preprocess_text, cases)
+        if mismatch:
+            failures.append(("preprocess_text (code points)", mismatch))
+        print(f"Golden check: {len(cases)} code point cases compared.")
+
+    for name, (text, expected, actual) in failures:
+        print(f"FAIL: {name} differs for {text!r}: expected {expected!r}, got {actual!r}")
+    if failures:
+        sys.exit(1)
+    print("Golden check passed: output is byte-identical to the original implementation.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Evaluates token-budget truncation policies against the 512-token baseline on a stored sample of comments:
+CPU time, label agreement (on all comments and on the comments that are actually cut) and mean score drift.
+Prints the cheapest policy whose label agreement stays at or above --min-agreement.
+
+    python -m benchmarks.truncation_policy
+    python -m benchmarks.truncation_policy --corpus data/processed/preprocessed_comments/date=2025-01-05 --size 5000
+"""
+import argparse
+import time
+
+import numpy as np
+from transformers import pipeline
+
+from benchmarks.corpus import load_corpus
+from src.analyzers.inference_engine import BucketedInferenceEngine
+from src.analyzers.sentiment_analyzer import resolve_model_path
+
+
+def parse_policy(policy):
+    # "256" = head truncation to 256 tokens, "256:0.25" = head+tail with a quarter of the budget from the start.
+    max_tokens, _, head_share = policy.partition(":")
+    return int(max_tokens), float(head_share) if head_share else None
+
+
+def timed(engine, text_list):
+    start = time.process_time()
+    results = engine(text_list)
+    return results, time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=None, help="Preprocessed comments CSV or Parquet partition (default: synthetic corpus)")
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--model", default="roberta", choices=["roberta", "distilbert"])
+    parser.add_argument("--policies", default="256,256:0.25,128,128:0.25,64:0.25",
+                        help="Comma-separated max_tokens[:head_share] settings to compare with 512")
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    parser.add_argument("--max-batch-tokens", type=int, default=16384)
+    args = parser.parse_args()
+
+    text_list = load_corpus(args.corpus, args.size)
+    model_pipeline = pipeline("sentiment-analysis", model=resolve_model_path(args.model), framework="pt", device="cpu")
+    token_counts = np.array([len(ids) for ids in model_pipeline.tokenizer(text_list, verbose=False)["input_ids"]])
+
+    baseline_engine = BucketedInferenceEngine(model_pipeline, max_batch_tokens=args.max_batch_tokens, max_length=512)
+    baseline_engine(text_list[:8])
+    baseline, baseline_seconds = timed(baseline_engine, text_list)
+
+    print(f"Corpus: {len(text_list)} comments ({args.corpus or 'synthetic'}), model: {args.model}, "
+          f"tokens per comment: median {np.median(token_counts):.0f}, p95 {np.percentile(token_counts, 95):.0f}, "
+          f"max {token_counts.max()}")
+    print(f"{'512 (baseline)':<16} {baseline_seconds:7.1f}s CPU")
+
+    cheapest = None
+    for policy in args.policies.split(","):
+        max_tokens, head_share = parse_policy(policy)
+        engine = BucketedInferenceEngine(model_pipeline, max_batch_tokens=args.max_batch_tokens, max_length=max_tokens,
+                                         head_share=head_share)
+        results, seconds = timed(engine, text_list)
+
+        same_label = np.array([a["label"] == b["label"] for a, b in zip(baseline, results)])
+        score_drift = np.abs([a["score"] - b["score"] for a, b in zip(baseline, results)])
+        cut = token_counts > max_tokens
+        agreement = same_label.mean()
+        label = f"{max_tokens} " + (f"head+tail {head_share}" if head_share is not None else "head")
+        print(f"{label:<16} {seconds:7.1f}s CPU ({baseline_seconds / seconds:.2f}x), label agreement {agreement:.2%} "
+              f"(on the {cut.sum()} cut comments: {same_label[cut].mean() if cut.any() else 1.0:.2%}), "
+              f"mean score drift {score_drift.mean():.4f}")
+
+        if agreement >= args.min_agreement and (cheapest is None or seconds < cheapest[1]):
+            cheapest = (policy, seconds)
+
+    if cheapest is None:
+        print(f"No policy keeps label agreement >= {args.min_agreement:.0%}. Keep max_tokens = 512.")
+    else:
+        max_tokens, head_share = parse_policy(cheapest[0])
+        print(f"Cheapest policy with label agreement >= {args.min_agreement:.0%}: max_tokens = {max_tokens}, "
+              + (f"truncation = head_tail, head_share = {head_share}" if head_share is not None else "truncation = head"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,47 @@
+import sys
 import time
 import warnings
 
 import pandas as pd
 from pathlib import Path
-from datetime import datetime, timedelta
-from multiprocessing import Pool
-import numpy as np
+from datetime import datetime, timedelta, timezone
 import torch
-import shutil
 
 # Core modules
 from src.core.connect_reddit import connect_reddit
 from src.core.logger import setup_logger
 from src.core.config_utils import get_config
+from src.core.request_scheduler import RequestScheduler
+from src.core.checkpoint_store import CheckpointStore
+from src.core.comment_index import CommentIndex, fill_known_sentiment, record_sentiment
+from src.core.pipelined_runner import PipelinedRun
+from src.core.daemon import run_daemon
 
 # Pipeline steps
 from src.checkers.check_subreddits import main as check_main
 from src.scrapers.subreddit_scraper import main as scrape_posts_main
+from src.scrapers.listing_cache import ListingCache
 from src.scrapers.comment_scraper import main as scrape_comments_main
+from src.scrapers.comment_scraper import hydrate_posts, iter_post_comments, iter_post_comments_concurrent
+from src.scrapers.comment_delta import plan_delta_fetch, record_post_marks
+from src.scrapers.comment_stream import main as scrape_stream_main
+from src.scrapers.comment_stream import iter_subreddit_comments
 from src.utils.cleaners import nlp_preprocess
-from src.utils.save_csv import save_csv
+from src.utils.storage import save_table, save_segments, table_exists, load_table
+from src.utils.frame_schema import SCORED_CATEGORY_COLUMNS, compact, concat_frames, memory_report
+from src.utils.memory import peak_rss_mb
 from src.analyzers.sentiment_analyzer import (
     load_sentiment_model,
-    analyze_sentiment_batch,
-    init_worker,
-    process_chunk
+    label_batch,
+    open_analysis_pool,
+    analyze_streaming,
+    analyze_with_cache,
+    resolve_model_identity,
+    log_escalation
 )
-from src.analyzers.data_aggregator import aggregate_main
+from src.analyzers.sentiment_cache import SentimentCache
+from src.analyzers.data_aggregator import aggregate_main, publish_live, LIVE_DIR
+from src.analyzers.adaptive_sampling import sample_and_score
 
 warnings.simplefilter(action='ignore', category=FutureWarning)
 warnings.simplefilter(action='ignore', category=DeprecationWarning)
@@ -34,54 +49,135 @@ warnings.simplefilter(action='ignore', category=DeprecationWarning)
 if __name__ == "__main__":
 
     # --- Setup ---
-    today_str = datetime.today().strftime("%Y-%m-%d")
     logger = setup_logger()
-    reddit = connect_reddit(logger)
+    scheduler = RequestScheduler(
+        requests_per_minute=get_config("reddit_api", "requests_per_minute", type=int, fallback=100),
+        burst=get_config("reddit_api", "burst", type=int, fallback=10),
+        reserve=get_config("reddit_api", "reserve", type=int, fallback=2),
+        max_retries=get_config("reddit_api", "max_retries", type=int, fallback=3),
+        backoff_seconds=get_config("reddit_api", "backoff_seconds", type=float, fallback=2.0)
+    )
+    reddit = connect_reddit(logger, scheduler)
     logger.info("Main process started. Logger and Reddit connection initialized.")
 
+    # --- Daemon mode: continuous ingestion instead of one weekly batch ---
+    if "--daemon" in sys.argv[1:]:
+        run_daemon(logger, reddit, scheduler)
+        sys.exit(0)
+
+    # --- Checkpoints ---
+    # A resumed run keeps its original date (file names) and start time (scrape window).
+    checkpoint = None
+    run_started_at = datetime.utcnow()
+    today_str = run_started_at.strftime("%Y-%m-%d")
+    if get_config("checkpoint", "enabled", type=bool, fallback=True):
+        checkpoint_store = CheckpointStore(get_config("checkpoint", "path", fallback="data/checkpoints/pipeline.db"))
+        checkpoint = checkpoint_store.open_run(
+            logger, resume_max_days=get_config("checkpoint", "resume_max_days", type=float, fallback=1))
+        today_str = checkpoint.run_date
+        run_started_at = checkpoint.started_at
+
     # --- Config ---
     try:
         post_limit = get_config("reddit_post_scraper", "post_limit", type=int)
         post_comment_approve_limit = get_config("reddit_post_scraper", "post_comment_approve_limit", type=int)
         comment_link_limit_config = get_config("reddit_comment_scraper", "comment_link_limit", type=int)
         comment_link_limit = None if comment_link_limit_config == -1 else comment_link_limit_config
-        scrape_till = datetime.utcnow() - timedelta(get_config("global", "comment_max_days", type=int))
+        comment_workers = get_config("reddit_comment_scraper", "comment_workers", type=int, fallback=1)
+        refresh_posts = get_config("reddit_comment_scraper", "refresh_posts", type=bool, fallback=True)
+        delta_fetch = get_config("reddit_comment_scraper", "delta_fetch", type=bool, fallback=True)
+        delta_max_pages = get_config("reddit_comment_scraper", "delta_max_pages", type=int, fallback=10)
+        comment_ingestion = get_config("reddit_comment_scraper", "ingestion", fallback="trees").lower()
+        stream_posts = get_config("reddit_comment_scraper", "stream_posts", fallback="approved").lower()
+        stream_max_comments_config = get_config("reddit_comment_scraper", "stream_max_comments", type=int, fallback=-1)
+        stream_max_comments = None if stream_max_comments_config == -1 else stream_max_comments_config
+        preprocess_workers = get_config("preprocessing", "workers", type=int, fallback=1)
+        scrape_till = run_started_at - timedelta(get_config("global", "comment_max_days", type=int))
+        reuse_check_listing = get_config("reddit_post_scraper", "reuse_check_listing", type=bool, fallback=True)
 
         analysis_device = get_config("analysis", "device_type", fallback="cpu")
         cpu_cores_config = get_config("analysis", "cpu_cores", type=int, fallback=4)
+        model_name_config = get_config("analysis", "model_name", fallback="roberta")
+        model_backend = get_config("analysis", "model_backend", fallback="pytorch").lower()
+        model_sharing = get_config("analysis", "model_sharing", fallback="fork").lower()
+        micro_batch_size = get_config("analysis", "micro_batch_size", type=int, fallback=256)
+
+        pipeline_mode = get_config("pipeline", "mode", fallback="staged").lower()
+        pipeline_queue_size = get_config("pipeline", "queue_size", type=int, fallback=32)
+        pipeline_max_in_flight = get_config("pipeline", "max_in_flight", type=int, fallback=0)
+        pipeline_batch_timeout = get_config("pipeline", "batch_timeout_minutes", type=float, fallback=30) * 60
+
+        sampling_enabled = get_config("sampling", "enabled", type=bool, fallback=False)
+        sampling_ci_width = get_config("sampling", "ci_width", type=float, fallback=0.05)
+        sampling_confidence = get_config("sampling", "confidence", type=float, fallback=0.95)
+        sampling_batch_size = get_config("sampling", "batch_size", type=int, fallback=500)
 
     except Exception as e:
         logger.error(f"❌ Failed to load configuration: {e}")
         logger.error("Exiting.")
         exit()
 
+    # --- Comment Index ---
+    # Comments scored in earlier runs keep their sentiment unless their body changed.
+    comment_index = None
+    if get_config("comment_index", "enabled", type=bool, fallback=True):
+        comment_index = CommentIndex(
+            get_config("comment_index", "path", fallback="data/index/comment_index.db"),
+            model_name="@".join(resolve_model_identity(model_name_config))
+        )
+        pruned = comment_index.prune(get_config("comment_index", "retention_days", type=int, fallback=30))
+        logger.info(f"🗂️ Comment index ready ({pruned} entries older than the retention window pruned).")
+
+    # --- Content-addressed cache: identical bodies are scored once, across batches and runs ---
+    def open_sentiment_cache():
+        if not get_config("sentiment_cache", "enabled", type=bool, fallback=True):
+            return None
+        model_path, model_revision = resolve_model_identity(model_name_config)
+        return SentimentCache(
+            model_path,
+            model_revision,
+            path=get_config("sentiment_cache", "path", fallback="data/cache/sentiment_cache.db"),
+            max_entries=get_config("sentiment_cache", "max_entries", type=int, fallback=2_000_000)
+        )
+
+    if pipeline_mode == "pipelined" and analysis_device.lower() == "gpu":
+        logger.warning("⚠️ Pipelined mode runs on the CPU worker pool only. Using the staged pipeline for the GPU.")
+        pipeline_mode = "staged"
+
+    if sampling_enabled and pipeline_mode == "pipelined":
+        logger.warning("⚠️ Adaptive sampling only applies to the staged pipeline: pipelined mode scores every comment.")
+        sampling_enabled = False
+
     # --- Step 1-7 ---
     processed_dir = Path("data/processed/preprocessed_comments/")
-    CLEANED_FILE_PATH = processed_dir / f"{today_str}.csv"
+    processed_df = pd.DataFrame()
 
-    if CLEANED_FILE_PATH.exists():
-        logger.info(f"✅ Found cleaned data file: {CLEANED_FILE_PATH.name}")
-        logger.info("⏳ Skipping Scraping and Preprocessing steps. Loading file...")
+    if table_exists(processed_dir, today_str):
+        logger.info(f"✅ Found cleaned data for {today_str} in {processed_dir}")
+        logger.info("⏳ Skipping Scraping and Preprocessing steps. Loading data...")
         try:
-            processed_df = pd.read_csv(CLEANED_FILE_PATH)
-        except pd.errors.EmptyDataError:
-            logger.warning(f"⚠️ Cleaned data file {CLEANED_FILE_PATH.name} is empty. Re-running pipeline.")
-            CLEANED_FILE_PATH.unlink()
-            processed_df = pd.DataFrame()
+            processed_df = compact(load_table(processed_dir, today_str))
         except Exception as e:
-            logger.error(f"❌ Failed to read {CLEANED_FILE_PATH.name}: {e}. Exiting.")
+            logger.error(f"❌ Failed to read the cleaned data of {today_str}: {e}. Exiting.")
             exit()
+        if processed_df.empty:
+            logger.warning(f"⚠️ Cleaned data of {today_str} is empty. Re-running pipeline.")
 
-    if not CLEANED_FILE_PATH.exists():
-        logger.warning(f"⚠️ Cleaned data file not found at: {CLEANED_FILE_PATH}")
+    if processed_df.empty:
+        logger.warning(f"⚠️ No cleaned data found for {today_str} in {processed_dir}")
         logger.info("⏳ Running the full pipeline (Steps 1-7)...")
 
         logger.info("-" * 30 + " STEP 1: CHECK SUBREDDITS " + "-" * 30)
+        # The 'new' listings read by the check are reused by the post scraper in Step 2.
+        listing_cache = ListingCache() if reuse_check_listing else None
         subreddit_template = pd.read_csv("assets/subreddits.csv")
         subreddits_checked = check_main(
             subreddits=subreddit_template,
             reddit=reddit,
-            logger=logger
+            logger=logger,
+            scheduler=scheduler,
+            checkpoint=checkpoint,
+            listing_cache=listing_cache
         )
         logger.info("✅ Step 1 complete.")
 
@@ -92,39 +188,127 @@ if __name__ == "__main__":
             reddit=reddit,
             post_limit=post_limit,
             post_comment_approve_limit=post_comment_approve_limit,
-            scrape_till=scrape_till
+            scrape_till=scrape_till,
+            scheduler=scheduler,
+            checkpoint=checkpoint,
+            listing_cache=listing_cache
         )
+        if listing_cache:
+            listing_cache.clear()
         logger.info("✅ Step 2 complete.")
 
+        # Comment counts are refreshed in bulk, so deleted or quiet posts never get a comment-tree fetch.
+        if refresh_posts and not posts_scraped.empty:
+            posts_scraped = hydrate_posts(posts_scraped, logger, reddit, post_comment_approve_limit, scheduler, checkpoint)
+
+        # Posts scraped in earlier runs only fetch the comments written since then.
+        reused_posts = None
+        # (Only for the per-post trees: the comment stream reads each subreddit once anyway.)
+        if delta_fetch and comment_ingestion == "trees" and comment_index is not None and not posts_scraped.empty:
+            reused_posts = plan_delta_fetch(posts_scraped, logger, reddit, comment_index, scheduler, delta_max_pages)
+        scraped_at = run_started_at.replace(tzinfo=timezone.utc).timestamp()
+
         if posts_scraped.empty:
             logger.warning("⚠️ No posts were scraped. Skipping comment scraping and preprocessing.")
             processed_df = pd.DataFrame()
-            save_csv(processed_df, logger, str(processed_dir))
+            save_table(processed_df, logger, processed_dir, today_str)
+        elif pipeline_mode == "pipelined":
+            # Steps 3-5 overlap: comments are preprocessed and scored while later posts are still being scraped.
+            logger.info("-" * 30 + " STEPS 3-5: PIPELINED SCRAPE, PREPROCESS AND ANALYSIS " + "-" * 30)
+            if comment_ingestion == "stream":
+                post_comment_stream = iter_subreddit_comments(
+                    posts_scraped, logger, reddit, scrape_till, stream_posts, stream_max_comments, scheduler, checkpoint,
+                    comment_index)
+            elif comment_workers > 1:
+                post_comment_stream = iter_post_comments_concurrent(
+                    posts_scraped, logger, comment_link_limit, comment_workers, scheduler, checkpoint, comment_index,
+                    reused_posts)
+            else:
+                post_comment_stream = iter_post_comments(
+                    posts_scraped, logger, reddit, comment_link_limit, scheduler, checkpoint, comment_index, reused_posts)
+
+            sentiment_cache = open_sentiment_cache()
+            with open_analysis_pool(cpu_cores_config, logger, model_name_config, model_backend, model_sharing) as pool:
+                pipelined_run = PipelinedRun(
+                    pool, cpu_cores_config, logger,
+                    micro_batch_size=micro_batch_size,
+                    queue_size=pipeline_queue_size,
+                    max_in_flight=pipeline_max_in_flight or None,
+                    batch_timeout=pipeline_batch_timeout,
+                    comment_index=comment_index,
+                    sentiment_cache=sentiment_cache
+                )
+                comments_scraped, processed_segments = pipelined_run.run(
+                    post_comments for _, post_comments in post_comment_stream)
+
+            logger.info(
+                f"📊 Reddit API: {scheduler.total_requests} requests, {scheduler.throttled_seconds:.1f}s paced, "
+                f"{scheduler.rate_limit_hits} rate-limit hits, {scheduler.retries} retries.")
+            # Both outputs are on-disk segments: they are saved segment by segment, like the staged path.
+            save_segments(comments_scraped, logger, "data/raw/weekly_scrapings/comments/", today_str)
+            if comment_index is not None and comment_ingestion == "trees":
+                record_post_marks(comments_scraped.to_pandas(columns=['post_id']), posts_scraped, comment_index,
+                                  today_str, scraped_at)
+            comments_scraped.discard()
+            # The scores are saved with the cleaned data, so Step 5 below only retries failed micro-batches.
+            save_segments(processed_segments, logger, processed_dir, today_str)
+            processed_df = concat_frames(list(processed_segments.iter_batches()))
+            processed_segments.discard()
+            memory_report(processed_df, logger, "Step 4 cleaned comments")
+            logger.info(f"✅ Steps 3-5 complete. Cleaned and scored data saved to: {processed_dir}")
+
         else:
             logger.info("-" * 30 + " STEP 3: SCRAPE COMMENTS " + "-" * 30)
-            comments_scraped = scrape_comments_main(
-                posts_scraped=posts_scraped,
-                logger=logger,
-                reddit=reddit,
-                comment_limit=comment_link_limit
-            )
+            if comment_ingestion == "stream":
+                comments_scraped = scrape_stream_main(
+                    posts_scraped=posts_scraped,
+                    logger=logger,
+                    reddit=reddit,
+                    scrape_till=scrape_till,
+                    stream_posts=stream_posts,
+                    max_comments=stream_max_comments,
+                    scheduler=scheduler,
+                    checkpoint=checkpoint,
+                    comment_index=comment_index
+                )
+            else:
+                comments_scraped = scrape_comments_main(
+                    posts_scraped=posts_scraped,
+                    logger=logger,
+                    reddit=reddit,
+                    comment_limit=comment_link_limit,
+                    workers=comment_workers,
+                    scheduler=scheduler,
+                    checkpoint=checkpoint,
+                    comment_index=comment_index,
+                    reused_posts=reused_posts
+                )
+                if comment_index is not None:
+                    record_post_marks(comments_scraped.to_pandas(columns=['post_id']), posts_scraped, comment_index,
+                                      today_str, scraped_at)
             logger.info("✅ Step 3 complete.")
+            logger.info(
+                f"📊 Reddit API: {scheduler.total_requests} requests, {scheduler.throttled_seconds:.1f}s paced, "
+                f"{scheduler.rate_limit_hits} rate-limit hits, {scheduler.retries} retries.")
 
             if comments_scraped.empty:
+                comments_scraped.discard()
                 logger.warning("⚠️ No comments were scraped. Skipping preprocessing.")
                 processed_df = pd.DataFrame()
-                save_csv(processed_df, logger, str(processed_dir))
+                save_table(processed_df, logger, processed_dir, today_str)
             else:
                 logger.info("-" * 30 + " STEP 4: PREPROCESSING COMMENTS " + "-" * 30)
-                processed_df = nlp_preprocess(comments_scraped)
-                save_csv(processed_df, logger, str(processed_dir))
+                # The raw comments are cleaned one on-disk segment at a time; only the cleaned rows are kept.
+                processed_df = concat_frames([nlp_preprocess(batch, preprocess_workers)
+                                              for batch in comments_scraped.iter_batches()])
+                comments_scraped.discard()
+                memory_report(processed_df, logger, "Step 4 cleaned comments")
+                save_table(processed_df, logger, processed_dir, today_str)
                 logger.info(f"✅ Step 4 complete. Cleaned data saved to: {processed_dir}")
 
-        if not processed_df.empty and not CLEANED_FILE_PATH.exists():
-            logger.error(f"❌ Failed to find or create the cleaned data file at {CLEANED_FILE_PATH}. Exiting.")
+        if not processed_df.empty and not table_exists(processed_dir, today_str):
+            logger.error(f"❌ Failed to save the cleaned data to {processed_dir}. Exiting.")
             exit()
-        elif not processed_df.empty and CLEANED_FILE_PATH.exists():
-            processed_df = pd.read_csv(CLEANED_FILE_PATH)
 
             # --- Step 5: Sentiment Analysis (CPU or GPU) ---
 
@@ -136,28 +320,57 @@ if __name__ == "__main__":
         sentiment_scores = pd.DataFrame()
         start_time = time.time()
 
-        if analysis_device.lower() == "gpu":
+        # --- Reuse scores of comments already analysed in earlier runs ---
+        if comment_index is not None:
+            processed_df = fill_known_sentiment(processed_df, comment_index)
+
+        if 'sentiment_label' in processed_df.columns:
+            known_mask = processed_df['sentiment_label'].notna()
+        else:
+            known_mask = pd.Series(False, index=processed_df.index)
+
+        known_df = processed_df[known_mask]
+        pending_df = processed_df[~known_mask].drop(columns=['sentiment_label', 'sentiment_score'], errors='ignore')
+        logger.info(f"♻️ {len(known_df)} comments reuse their stored sentiment. {len(pending_df)} comments need inference.")
+
+        new_scores = pd.DataFrame()
+        sentiment_cache = open_sentiment_cache() if not pending_df.empty else None
+
+        def score_pending(infer):
+            # Returns (reused rows, newly scored rows). 'infer' runs the model on texts the sentiment cache misses.
+            # With [sampling] enabled, only a per-country random sample of the comments is kept and scored.
+            def score_texts(texts):
+                return analyze_with_cache(texts, infer, sentiment_cache, logger)
+
+            if not sampling_enabled:
+                results_df = score_texts(pending_df['body'].tolist())
+                return known_df, pd.concat([pending_df.reset_index(drop=True), results_df], axis=1)
+
+            sampled_df = sample_and_score(processed_df, score_texts, logger, sampling_ci_width, sampling_confidence,
+                                          sampling_batch_size)
+            reused = sampled_df.index.isin(known_df.index)
+            return sampled_df[reused], sampled_df[~reused].reset_index(drop=True)
+
+        if pending_df.empty:
+            logger.info("⏭️ Nothing new to analyse. Skipping model inference.")
+
+        elif analysis_device.lower() == "gpu":
             # --- GPU PATH ---
             try:
                 logger.info(f"🚀 Step 5: Starting GPU Sentiment Analysis (NVIDIA)...")
 
                 logger.info("Loading XLM-RoBERTa model onto GPU memory...")
-                model_pipeline = load_sentiment_model()
+                model_pipeline, _, model_name = load_sentiment_model()
                 logger.info("✅ Model loaded to GPU successfully.")
 
-                comment_list = processed_df['body'].tolist()
-                logger.info(f"Analyzing all {len(comment_list)} comments on GPU...")
-
-                sentimental_analysis_results = analyze_sentiment_batch(
-                    text_list=comment_list,
-                    model=model_pipeline
-                )
+                logger.info(f"Analyzing {len(pending_df)} comments on GPU...")
 
-                logger.info(f"Successfully analyzed {len(sentimental_analysis_results)} comments.")
+                known_df, new_scores = score_pending(
+                    lambda texts: label_batch(texts, model_pipeline, model_name))
 
-                results_df = pd.DataFrame(sentimental_analysis_results)
-                processed_df = processed_df.reset_index(drop=True)
-                sentiment_scores = pd.concat([processed_df, results_df], axis=1)
+                logger.info(f"Successfully analyzed {len(new_scores)} comments.")
+                if getattr(model_pipeline, "texts", 0):
+                    log_escalation(logger, model_pipeline.escalated, model_pipeline.texts)
 
             except torch.OutOfMemoryError:
                 logger.error("=" * 50)
@@ -189,17 +402,40 @@ if __name__ == "__main__":
             # --- CPU PATH ---
             num_cores = cpu_cores_config
             logger.info(f"🚀 Step 5: Starting Multiprocessing Sentiment Analysis ({num_cores} Cores)...")
-            logger.info(f"Total {len(processed_df)} comments will be split across {num_cores} cores.")
 
-            df_chunks = np.array_split(processed_df, num_cores)
+            # The pool starts on the first texts the cache misses and serves every sampling round after that.
+            pools = []
 
-            with Pool(processes=num_cores, initializer=init_worker) as pool:
-                logger.info(f"Pool initialized with {num_cores} cores. Starting parallel analysis...")
-                results_list = pool.map(process_chunk, df_chunks)
-                logger.info("Parallel analysis complete. Concatenating results...")
+            def analyze_on_pool(text_list):
+                logger.info(f"Total {len(text_list)} unique uncached comments will be streamed to {num_cores} cores "
+                            f"in micro-batches of {micro_batch_size}.")
+                if not pools:
+                    pools.append(open_analysis_pool(num_cores, logger, model_name_config, model_backend, model_sharing))
+                    logger.info("Starting parallel analysis...")
+                return analyze_streaming(text_list, pools[0], logger, micro_batch_size=micro_batch_size)
 
-            sentiment_scores = pd.concat(results_list, ignore_index=True)
-            logger.info(f"Successfully analyzed {len(sentiment_scores)} comments in total.")
+            pool_start = time.time()
+            try:
+                known_df, new_scores = score_pending(analyze_on_pool)
+            finally:
+                for pool in pools:
+                    pool.terminate()
+                    pool.join()
+
+            if pools:
+                logger.info("Parallel analysis complete.")
+                parent_rss, worker_rss = peak_rss_mb(), peak_rss_mb(children=True)
+                if parent_rss is not None:
+                    logger.info(f"📊 Pool finished in {time.time() - pool_start:.1f}s. Peak RSS: main {parent_rss:.0f} MB, "
+                                f"largest worker {worker_rss:.0f} MB.")
+            logger.info(f"Successfully analyzed {len(new_scores)} comments in total.")
+
+        if comment_index is not None and not new_scores.empty:
+            stored_count = record_sentiment(new_scores, comment_index)
+            logger.info(f"🗂️ Stored {stored_count} new comment scores in the comment index.")
+
+        sentiment_scores = concat_frames([known_df, new_scores], SCORED_CATEGORY_COLUMNS)
+        memory_report(sentiment_scores, logger, "Step 5 scored comments")
 
         # --- SENTIMENT ANALYSIS FINISH ---
 
@@ -212,9 +448,7 @@ if __name__ == "__main__":
         logger.info(f"Total Time: {total_time_minutes:.2f} minutes.")
 
         if not sentiment_scores.empty:
-            scores_dir = Path("data/processed/sentiment_scores/")
-            scores_dir.mkdir(parents=True, exist_ok=True)
-            save_csv(sentiment_scores, logger, str(scores_dir))
+            save_table(sentiment_scores, logger, "data/processed/sentiment_scores/", today_str)
         else:
             logger.warning("⚠️ Sentiment analysis resulted in an empty DataFrame. No data was saved.")
 
@@ -222,36 +456,21 @@ if __name__ == "__main__":
     logger.info(f"🚀 Step 6: Aggregating Sentimental Data...")
     aggregated_scores = aggregate_main(
         sentiment_scores=sentiment_scores,
+        date_str=today_str,
+        confidence=sampling_confidence
     )
     logger.info("✅ Done aggregating sentiment scores.")
 
     if not aggregated_scores.empty:
-
-        live_dir = Path("data/dashboard/live/")
-        timeseries_dir = Path("data/dashboard/time_series/")
-
-        live_dir.mkdir(parents=True, exist_ok=True)
-        timeseries_dir.mkdir(parents=True, exist_ok=True)
-
-        live_files = list(live_dir.glob("*.csv"))
-
-        for old_file_path in live_files:
-            try:
-                archive_target_path = timeseries_dir / old_file_path.name
-                shutil.move(str(old_file_path), str(archive_target_path))
-                logger.info(f"Successfully archived {old_file_path.name} to time_series.")
-            except Exception as e:
-                logger.error(f"Failed to archive {old_file_path.name}: {e}")
-
-        new_agg_path = live_dir / f"{today_str}.csv"
-        temp_agg_path = live_dir / f"{today_str}.csv.tmp"
-
         try:
-            aggregated_scores.to_csv(temp_agg_path, index=False)
-            shutil.move(temp_agg_path, new_agg_path)
-            logger.info(f"✅ New aggregated (live) data saved to: {new_agg_path}")
+            publish_live(aggregated_scores, logger, today_str)
+            logger.info(f"✅ New aggregated (live) data saved to: {LIVE_DIR}")
         except Exception as e:
             logger.error(f"❌ Failed to save new aggregated data: {e}")
 
     else:
         logger.warning("⚠️ Aggregating resulted in an empty DataFrame. No data was saved.")
+
+    if checkpoint:
+        checkpoint.finish()
+        logger.info(f"✅ Run {today_str} finished. Checkpoints cleared.")
@@ -0,0 +1,96 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.analyzers.data_aggregator import HAPPINESS_VALUES, confidence_interval
+
+
+def sample_and_score(processed_df, score_texts, logger, ci_width=0.05, confidence=0.95, batch_size=500, seed=None):
+    """
+    Scores a random sample of every country's comments instead of all of them (Step 5, [sampling] enabled).
+
+    The comments of each country are shuffled once and taken in batches of 'batch_size', whether they already carry
+    a label (comment index) or not, so every country's sample is a simple random sample of all its comments. Sampled
+    comments with a label are reused without inference. After every round the running mean happiness and its
+    'confidence' interval are updated, and a country stops as soon as the interval is narrower than 'ci_width' (or all
+    its comments are taken). Every round scores the unlabelled comments of all countries still running with one
+    'score_texts' call (texts -> DataFrame with sentiment_label/sentiment_score), so the workers stay busy.
+
+    Returns the sampled rows of 'processed_df' (original index) with sentiment_label/sentiment_score.
+    """
+    rng = np.random.default_rng(seed)
+    if 'sentiment_label' not in processed_df.columns:
+        processed_df = processed_df.assign(sentiment_label=None, sentiment_score=float('nan'))
+
+    labelled = processed_df['sentiment_label'].notna().to_numpy()
+    positions = processed_df.groupby('country', observed=True).indices
+    # Keeping only the labelled comments and sampling the rest would over-weight the labelled ones,
+    # whose happiness can differ (older posts, other subreddits): both are drawn from the same shuffle.
+    order = {country: rng.permutation(country_positions) for country, country_positions in positions.items()}
+    taken = dict.fromkeys(order, 0)
+    # Per country: [labelled comments, sum of happiness values, sum of squared values].
+    stats = {}
+
+    def still_running(country):
+        count, total, squares = stats.get(country, [0, 0.0, 0.0])
+        low, high = confidence_interval(count, total, squares, confidence)
+        return taken[country] < len(order[country]) and not (count > 1 and high - low < ci_width)
+
+    active = sorted(order)
+    sampled_parts = []
+    scored_texts = 0
+    inference_seconds = 0.0
+    while active:
+        round_positions = []
+        for country in active:
+            round_positions.append(order[country][taken[country]:taken[country] + batch_size])
+            taken[country] += batch_size
+        round_positions = np.concatenate(round_positions)
+
+        round_labelled = labelled[round_positions]
+        reused = processed_df.iloc[round_positions[round_labelled]]
+        rows = processed_df.iloc[round_positions[~round_labelled]].copy()
+        if not rows.empty:
+            start = time.time()
+            results_df = score_texts(rows['body'].tolist())
+            inference_seconds += time.time() - start
+            scored_texts += len(rows)
+            rows['sentiment_label'] = results_df['sentiment_label'].to_numpy()
+            rows['sentiment_score'] = results_df['sentiment_score'].to_numpy()
+        sampled_parts += [reused, rows]
+
+        add_stats(stats, reused)
+        add_stats(stats, rows)
+        active = [country for country in active if still_running(country)]
+
+    sampled_df = pd.concat(sampled_parts)
+    log_sampling(processed_df, sampled_df, logger, scored_texts, inference_seconds)
+    return sampled_df
+
+
+def add_stats(stats, rows):
+    values = rows['sentiment_label'].map(HAPPINESS_VALUES).astype(float)
+    for country, country_values in values.groupby(rows['country'].to_numpy()):
+        country_values = country_values.dropna()
+        country_stats = stats.setdefault(country, [0, 0.0, 0.0])
+        country_stats[0] += len(country_values)
+        country_stats[1] += country_values.sum()
+        country_stats[2] += (country_values ** 2).sum()
+
+
+def log_sampling(processed_df, sampled_df, logger, scored_texts, inference_seconds):
+    total = processed_df['country'].value_counts()
+    sampled = sampled_df['country'].value_counts()
+    # Comments left out that would have needed inference (those with a stored label cost nothing).
+    skipped = processed_df.loc[processed_df.index.difference(sampled_df.index), 'sentiment_label'].isna()
+    skipped_by_country = skipped.groupby(processed_df.loc[skipped.index, 'country'].to_numpy()).sum()
+
+    seconds_per_text = inference_seconds / scored_texts if scored_texts else 0.0
+    for country, skipped_count in skipped_by_country.sort_values(ascending=False).items():
+        if skipped_count:
+            logger.info(f"🎯 {country}: stable after {sampled.get(country, 0)} of {total[country]} comments, "
+                        f"~{skipped_count * seconds_per_text / 60:.1f} min of inference saved.")
+    logger.info(f"🎯 Adaptive sampling: {len(sampled_df)} of {len(processed_df)} comments scored or reused, "
+                f"{int(skipped.sum())} skipped, ~{skipped.sum() * seconds_per_text / 60:.1f} min of inference saved "
+                f"({seconds_per_text * 1000:.1f} ms per comment in this run).")
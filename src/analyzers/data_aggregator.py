@@ -1,12 +1,77 @@
+import shutil
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from statistics import NormalDist
+from src.utils.storage import dataset_root, save_table
 
-def aggregate_main(sentiment_scores):
-    today_str = datetime.today().strftime("%Y-%m-%d")
+HAPPINESS_VALUES = {"POSITIVE": 1, "NEGATIVE": -1, "NEUTRAL": 0}
+
+LIVE_DIR = "data/dashboard/live/"
+TIMESERIES_DIR = "data/dashboard/time_series/"
+
+def confidence_interval(count, total, squares, confidence=0.95):
+    """
+    (low, high) of the mean happiness from the count, sum and sum of squares of the happiness values
+    (normal approximation). Works on scalars and arrays; a count below 2 gives NaN.
+    """
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    count = np.asarray(count, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.asarray(total, dtype=float) / count
+        # The sample variance needs two values: a single comment gives no interval.
+        variance = np.where(count > 1, np.maximum(np.asarray(squares, dtype=float) / count - mean ** 2, 0)
+                            * count / (count - 1), np.nan)
+        half_width = z * np.sqrt(variance / count)
+    return mean - half_width, mean + half_width
+
+
+def aggregate_main(sentiment_scores, date_str=None, confidence=0.95):
+    """
+    Per-country mean happiness of the labelled comments, with the number of comments it is based on
+    ('sample_size') and its 'confidence' interval ('ci_low', 'ci_high').
+    """
+    today_str = date_str or datetime.today().strftime("%Y-%m-%d")
     df = pd.DataFrame(sentiment_scores)
-    df["happiness_value"] = df["sentiment_label"]
-    df["happiness_value"].replace({"POSITIVE": 1, "NEGATIVE": -1, "NEUTRAL":0}, inplace=True)
+    # Labels outside HAPPINESS_VALUES ('ERROR', unlabelled) become NaN and are left out of the mean.
+    df["happiness_value"] = df["sentiment_label"].map(HAPPINESS_VALUES).astype(float)
+    df["squared_value"] = df["happiness_value"] ** 2
 
-    aggregated_df = df.groupby("country")["happiness_value"].mean().reset_index()
+    # 'country' is categorical in the compact schema: only countries with comments get a row.
+    grouped = df.groupby("country", observed=True)
+    aggregated_df = grouped["happiness_value"].agg(["mean", "count", "sum"]).join(grouped["squared_value"].sum())
+    aggregated_df = aggregated_df.reset_index().rename(columns={"mean": "happiness_value", "count": "sample_size"})
+    aggregated_df["ci_low"], aggregated_df["ci_high"] = confidence_interval(
+        aggregated_df["sample_size"], aggregated_df["sum"], aggregated_df["squared_value"], confidence)
+    aggregated_df = aggregated_df.drop(columns=["sum", "squared_value"])
     aggregated_df["Date"] = today_str
     return aggregated_df
+
+def publish_live(aggregated_scores, logger, date_str):
+    """
+    Moves the live snapshots of other dates to the time series and saves 'aggregated_scores' as the live
+    snapshot of 'date_str'. A snapshot of the same date is replaced in place, so it can be refreshed many times a day.
+    """
+    live_dir = dataset_root(LIVE_DIR)
+    timeseries_dir = dataset_root(TIMESERIES_DIR)
+    live_dir.mkdir(parents=True, exist_ok=True)
+    timeseries_dir.mkdir(parents=True, exist_ok=True)
+
+    # Both layouts are archived: '<date>.csv' files and 'date=<date>/' Parquet partitions.
+    current_names = {f"{date_str}.csv", f"date={date_str}"}
+    live_entries = [entry for entry in live_dir.iterdir()
+                    if (entry.suffix == ".csv" or (entry.name.startswith("date=") and ".tmp-" not in entry.name))
+                    and entry.name not in current_names]
+
+    for old_entry in live_entries:
+        try:
+            archive_target_path = timeseries_dir / old_entry.name
+            if archive_target_path.is_dir():
+                shutil.rmtree(archive_target_path)
+            shutil.move(str(old_entry), str(archive_target_path))
+            logger.info(f"Successfully archived {old_entry.name} to time_series.")
+        except Exception as e:
+            logger.error(f"Failed to archive {old_entry.name}: {e}")
+
+    # One row per country, so the aggregate is a single file per date.
+    save_table(aggregated_scores, logger, live_dir, date_str, partition_by_country=False)
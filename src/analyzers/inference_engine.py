@@ -0,0 +1,131 @@
+import torch
+
+
+class BucketedInferenceEngine:
+    """
+    Drop-in replacement for calling the transformers pipeline on a list of texts.
+
+    Texts are tokenized once up front, sorted by token length and grouped into batches whose
+    padded size (batch rows x longest member) stays under 'max_batch_tokens'. Short comments
+    therefore travel in large batches, long ones in small batches, and almost no compute is spent
+    on padding. Results are returned in the original order, in the pipeline's {'label', 'score'} format.
+
+    Texts longer than 'max_length' tokens keep their first tokens. With 'head_share' set, they keep that share
+    of the budget from the start and the rest from the end instead (head+tail truncation).
+    """
+
+    tensor_type = "pt"
+
+    def __init__(self, model_pipeline, max_batch_tokens=16384, max_length=512, head_share=None):
+        self.tokenizer = model_pipeline.tokenizer
+        self.model = model_pipeline.model
+        self.device = model_pipeline.device
+        self.id2label = self.model.config.id2label
+        self.max_batch_tokens = max_batch_tokens
+        self.max_length = max_length
+        self.head_share = head_share
+        self.model.eval()
+
+    def encode(self, text_list):
+        if self.head_share is None:
+            return self.tokenizer(text_list, truncation=True, max_length=self.max_length)
+
+        # Tokenized in full, then cut to head + tail before the special tokens are added back.
+        budget = self.max_length - self.tokenizer.num_special_tokens_to_add()
+        head = int(budget * self.head_share)
+        input_ids = []
+        for ids in self.tokenizer(text_list, add_special_tokens=False, verbose=False)["input_ids"]:
+            if len(ids) > budget:
+                ids = ids[:head] + ids[len(ids) - (budget - head):]
+            input_ids.append(self.tokenizer.build_inputs_with_special_tokens(ids))
+        return {"input_ids": input_ids, "attention_mask": [[1] * len(ids) for ids in input_ids]}
+
+    def plan_batches(self, lengths, batch_size=None):
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        batches = []
+        current = []
+        current_max = 0
+
+        for index in order:
+            new_max = max(current_max, lengths[index])
+            over_budget = new_max * (len(current) + 1) > self.max_batch_tokens
+            over_count = batch_size is not None and len(current) >= batch_size
+            if current and (over_budget or over_count):
+                batches.append(current)
+                current = []
+                new_max = lengths[index]
+            current.append(index)
+            current_max = new_max
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def forward(self, features):
+        # Returns class probabilities for one padded batch as a numpy array.
+        features = {key: value.to(self.device) for key, value in features.items()}
+        with torch.inference_mode():
+            logits = self.model(**features).logits
+            return torch.softmax(logits.float(), dim=-1).cpu().numpy()
+
+    def __call__(self, text_list, batch_size=None):
+        # 'batch_size' only caps the rows per batch, so existing OOM fallbacks keep working.
+        text_list = list(text_list)
+        if not text_list:
+            return []
+
+        encoded = self.encode(text_list)
+        lengths = [len(input_ids) for input_ids in encoded["input_ids"]]
+        results = [None] * len(text_list)
+
+        for batch in self.plan_batches(lengths, batch_size):
+            features = self.tokenizer.pad(
+                {key: [encoded[key][i] for i in batch] for key in encoded.keys()},
+                return_tensors=self.tensor_type)
+            probabilities = self.forward(features)
+
+            for i, label_id, score in zip(batch, probabilities.argmax(axis=-1).tolist(), probabilities.max(axis=-1).tolist()):
+                results[i] = {"label": self.id2label[label_id], "score": score}
+
+        return results
+
+
+class CascadeInferenceEngine:
+    """
+    Confidence-gated cascade of two engines, called like the pipeline.
+
+    Every text is scored by the small 'fast_engine' first. Only texts whose top-class probability is under
+    'threshold' are scored again by 'large_engine', whose result replaces the fast one. Labels are returned
+    upper-case; 'fast_labels' maps fast-model labels that differ from the large model's (e.g. LABEL_0).
+    'texts' and 'escalated' count what went through the cascade; 'last_escalated' is the count of the last call.
+    """
+
+    def __init__(self, fast_engine, large_engine, threshold=0.8, fast_labels=None):
+        self.fast_engine = fast_engine
+        self.large_engine = large_engine
+        self.engines = [fast_engine, large_engine]
+        self.threshold = threshold
+        self.fast_labels = fast_labels or {}
+        self.texts = 0
+        self.escalated = 0
+        self.last_escalated = 0
+
+    def __call__(self, text_list, batch_size=None):
+        text_list = list(text_list)
+        if not text_list:
+            self.last_escalated = 0
+            return []
+
+        results = [{"label": self.fast_labels.get(result["label"], result["label"]).upper(), "score": result["score"]}
+                   for result in self.fast_engine(text_list, batch_size=batch_size)]
+
+        unsure = [i for i, result in enumerate(results) if result["score"] < self.threshold]
+        if unsure:
+            large_results = self.large_engine([text_list[i] for i in unsure], batch_size=batch_size)
+            for i, result in zip(unsure, large_results):
+                results[i] = {"label": result["label"].upper(), "score": result["score"]}
+
+        self.texts += len(text_list)
+        self.escalated += len(unsure)
+        self.last_escalated = len(unsure)
+        return results
@@ -0,0 +1,136 @@
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification, AutoConfig
+
+from src.analyzers.inference_engine import BucketedInferenceEngine
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# Equivalence with the PyTorch pipeline that 'benchmarks/onnx_backend.py' checks for.
+# FP32 ONNX matches to float precision. Dynamic INT8 quantization shifts the softmax scores slightly.
+# It is accepted when at least 98% of labels agree and the mean absolute score difference stays under 0.03.
+LABEL_AGREEMENT_TOLERANCE = 0.98
+MEAN_SCORE_DIFF_TOLERANCE = 0.03
+
+ONNX_INSTALL_HINT = "model_backend = onnx needs the optional packages 'onnx' and 'onnxruntime' (pip install onnx onnxruntime)."
+
+
+def onnx_export_dir(model_path, model_revision, cache_dir="data/models/onnx"):
+    export_root = Path(cache_dir)
+    if not export_root.is_absolute():
+        export_root = PROJECT_ROOT / export_root
+    return export_root / f"{model_path.replace('/', '--')}-{model_revision[:12]}"
+
+
+def export_onnx_model(model_path, export_dir):
+    """
+    Exports the model to FP32 ONNX once ('model.onnx').
+    The tokenizer and config are saved next to it so later loads never touch the network.
+    The export is written to a temporary folder and renamed at the end, so a crash never leaves a half artifact.
+    """
+    try:
+        import onnx  # used by torch.onnx.export
+    except ImportError as e:
+        raise ImportError(ONNX_INSTALL_HINT) from e
+
+    export_dir = Path(export_dir)
+    tmp_dir = export_dir.with_name(export_dir.name + f".tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    model.config.return_dict = False
+    model.eval()
+
+    dummy = tokenizer(["export sample", "a slightly longer export sample"], padding=True, return_tensors="pt")
+    # no_grad rather than inference_mode: inference tensors can break tracing inside torch.onnx.export.
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy["input_ids"], dummy["attention_mask"]),
+            str(tmp_dir / "model.onnx"),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=14,
+        )
+
+    tokenizer.save_pretrained(tmp_dir)
+    model.config.save_pretrained(tmp_dir)
+
+    if export_dir.exists():
+        # A half export left by an older version (no 'model.onnx') is replaced; a concurrent complete one is kept.
+        if (export_dir / "model.onnx").exists():
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return export_dir
+        shutil.rmtree(export_dir, ignore_errors=True)
+    os.replace(tmp_dir, export_dir)
+    return export_dir
+
+
+def quantize_onnx_model(export_dir):
+    """Quantizes the exported 'model.onnx' to dynamic INT8 ('model.int8.onnx'), via a temporary file."""
+    try:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+    except ImportError as e:
+        raise ImportError(ONNX_INSTALL_HINT) from e
+
+    export_dir = Path(export_dir)
+    tmp_file = export_dir / f"model.int8.tmp-{os.getpid()}.onnx"
+    quantize_dynamic(str(export_dir / "model.onnx"), str(tmp_file), weight_type=QuantType.QInt8)
+    os.replace(tmp_file, export_dir / "model.int8.onnx")
+
+
+def ensure_onnx_model(model_path, model_revision, cache_dir="data/models/onnx", quantize=True):
+    # The FP32 export is made once per model revision; the INT8 model is quantized from it when first needed.
+    export_dir = onnx_export_dir(model_path, model_revision, cache_dir)
+    if not (export_dir / "model.onnx").exists():
+        print(f"Exporting {model_path} to ONNX. This only happens once per model revision...")
+        export_onnx_model(model_path, export_dir)
+    model_file = export_dir / ("model.int8.onnx" if quantize else "model.onnx")
+    if not model_file.exists():
+        print(f"Quantizing the ONNX export of {model_path} to INT8...")
+        quantize_onnx_model(export_dir)
+    return export_dir, model_file
+
+
+class OnnxInferenceEngine(BucketedInferenceEngine):
+    """Length-bucketed inference on an exported (optionally INT8-quantized) ONNX model through ONNX Runtime."""
+
+    tensor_type = "np"
+
+    def __init__(self, export_dir, model_file, max_batch_tokens=16384, max_length=512, num_threads=0, head_share=None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError(ONNX_INSTALL_HINT) from e
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            session_options.intra_op_num_threads = num_threads
+
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        self.session = ort.InferenceSession(str(model_file), session_options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.id2label = AutoConfig.from_pretrained(export_dir).id2label
+        self.device = "cpu"
+        self.max_batch_tokens = max_batch_tokens
+        self.max_length = max_length
+        self.head_share = head_share
+
+    def forward(self, features):
+        feeds = {key: np.asarray(value, dtype=np.int64) for key, value in features.items() if key in self.input_names}
+        (logits,) = self.session.run(["logits"], feeds)
+        logits = logits.astype(np.float32)
+        exp_logits = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp_logits / exp_logits.sum(axis=-1, keepdims=True)
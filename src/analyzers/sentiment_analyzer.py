@@ -1,25 +1,130 @@
+import multiprocessing
+import os
+import time
+import numpy as np
 import pandas as pd
-from transformers import pipeline
+from transformers import pipeline, AutoConfig
 import torch
 from src.core.config_utils import get_config
+from src.analyzers.inference_engine import BucketedInferenceEngine, CascadeInferenceEngine
+from src.analyzers.onnx_backend import ensure_onnx_model, OnnxInferenceEngine
 
 model_pipeline_worker = None
 model_label_map = None
 current_model_name = None
 
-def load_sentiment_model():
-    try:
-        device_type = get_config("analysis", "device_type", fallback="cpu")
-        model_name_config = get_config("analysis", "model_name", fallback="roberta")
-    except Exception:
-        print("WARN: Could not read config, defaulting to CPU.")
-        device_type = "cpu"
-        model_name_config = "roberta"
+DISTILBERT_LABELS = {
+    'LABEL_0': 'NEGATIVE',
+    'LABEL_1': 'POSITIVE'
+}
+
+# Rows per batch of the plain pipeline (batching = fixed) in the CPU workers.
+FIXED_CPU_BATCH_SIZE = 64
 
+# Small multilingual model (distilled from mDeBERTa) with the same three labels as XLM-RoBERTa.
+CASCADE_FAST_MODEL = "lxyuan/distilbert-base-multilingual-cased-sentiments-student"
+
+def resolve_model_path(model_name_config):
     if model_name_config.lower() == "distilbert":
-        model_path = "distilbert-base-multilingual-cased"
-    else:
-        model_path = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
+        return "distilbert-base-multilingual-cased"
+    if "/" in model_name_config:
+        # A Hugging Face model id, e.g. for 'cascade_fast_model'.
+        return model_name_config
+    return "cardiffnlp/twitter-xlm-roberta-base-sentiment"
+
+
+def resolve_model_revision(model_path):
+    # Only the (small) config is fetched; its commit hash identifies the exact weights.
+    try:
+        model_config = AutoConfig.from_pretrained(model_path)
+        return getattr(model_config, "_commit_hash", None) or "unknown"
+    except Exception as e:
+        print(f"WARN: Could not resolve revision of {model_path}: {e}")
+        return "unknown"
+
+
+def cascade_settings():
+    # (fast model name, confidence threshold) of model_name = cascade.
+    return (get_config("analysis", "cascade_fast_model", fallback=CASCADE_FAST_MODEL),
+            get_config("analysis", "cascade_threshold", type=float, fallback=0.8))
+
+
+def truncation_settings():
+    # (max tokens per comment, head share of head+tail truncation or None for plain head truncation), as applied:
+    # head+tail needs the bucketed engine or the ONNX backend, the fixed pipeline keeps the first tokens only.
+    max_tokens = get_config("analysis", "max_tokens", type=int, fallback=512)
+    if get_config("analysis", "truncation", fallback="head").lower() == "head_tail" and (
+            get_config("analysis", "batching", fallback="bucketed").lower() == "bucketed"
+            or get_config("analysis", "model_backend", fallback="pytorch").lower() == "onnx"):
+        return max_tokens, get_config("analysis", "head_share", type=float, fallback=0.25)
+    return max_tokens, None
+
+
+def truncation_tag():
+    # Suffix of the model revision for scores computed under a non-default truncation policy.
+    max_tokens, head_share = truncation_settings()
+    if head_share is not None:
+        return f"+head_tail{max_tokens}@{head_share}"
+    return "" if max_tokens == 512 else f"+head{max_tokens}"
+
+
+def backend_tag():
+    # Suffix of the model revision for scores of the ONNX backend: INT8 scores differ slightly from PyTorch.
+    if get_config("analysis", "model_backend", fallback="pytorch").lower() != "onnx":
+        return ""
+    return "+onnx-int8" if get_config("analysis", "onnx_quantize", type=bool, fallback=True) else "+onnx"
+
+
+def resolve_model_identity(model_name_config):
+    """
+    (model path, revision) that identify the scores of 'model_name_config', e.g. for the sentiment cache and the
+    comment index. The revision carries the truncation policy and backend, and for the cascade both models and
+    the threshold.
+    """
+    if model_name_config.lower() == "cascade":
+        # Cascade scores depend on both models and on the threshold.
+        fast_name, threshold = cascade_settings()
+        fast_path, large_path = resolve_model_path(fast_name), resolve_model_path("roberta")
+        return (f"cascade:{fast_path}+{large_path}",
+                f"{resolve_model_revision(fast_path)[:12]}+{resolve_model_revision(large_path)[:12]}@{threshold}"
+                + truncation_tag() + backend_tag())
+    model_path = resolve_model_path(model_name_config)
+    return model_path, resolve_model_revision(model_path) + truncation_tag() + backend_tag()
+
+
+def model_paths(model_name_config):
+    # The models 'model_name_config' loads: two for the cascade, one otherwise.
+    if model_name_config.lower() == "cascade":
+        return [resolve_model_path(cascade_settings()[0]), resolve_model_path("roberta")]
+    return [resolve_model_path(model_name_config)]
+
+
+def prepare_onnx_model(model_path):
+    # Called once in the main process before the worker pool starts, so workers only ever load the cached export.
+    return ensure_onnx_model(
+        model_path,
+        resolve_model_revision(model_path),
+        cache_dir=get_config("analysis", "onnx_cache_dir", fallback="data/models/onnx"),
+        quantize=get_config("analysis", "onnx_quantize", type=bool, fallback=True)
+    )
+
+
+def load_model_engine(model_path, device_type, batching, max_batch_tokens, model_backend):
+    # Returns (engine called like the pipeline, id2label) for one model.
+    max_tokens, head_share = truncation_settings()
+    if model_backend.lower() == "onnx":
+        if device_type.lower() == "gpu":
+            print("WARN: The ONNX backend is CPU-only. Running ONNX Runtime on the CPU.")
+        export_dir, model_file = prepare_onnx_model(model_path)
+        print(f"Using ONNX Runtime backend: {model_file.name} ({model_path})")
+        model_engine = OnnxInferenceEngine(
+            export_dir, model_file,
+            max_batch_tokens=max_batch_tokens,
+            max_length=max_tokens,
+            num_threads=get_config("analysis", "onnx_threads", type=int, fallback=0),
+            head_share=head_share
+        )
+        return model_engine, model_engine.id2label
 
     if device_type.lower() == "gpu":
         print(f"Config set to GPU. Using model: {model_path}")
@@ -32,59 +137,205 @@ def load_sentiment_model():
                               model=model_path,
                               framework="pt",
                               truncation=True,
-                              max_length=512,
+                              max_length=max_tokens,
                               device=device_arg)
 
     label_map = model_pipeline.model.config.id2label
 
-    return model_pipeline, label_map, model_name_config
+    if batching.lower() == "bucketed":
+        model_pipeline = BucketedInferenceEngine(model_pipeline, max_batch_tokens=max_batch_tokens,
+                                                 max_length=max_tokens, head_share=head_share)
+    elif get_config("analysis", "truncation", fallback="head").lower() == "head_tail":
+        print("WARN: head_tail truncation needs batching = bucketed. The fixed pipeline keeps the first tokens only.")
+
+    return model_pipeline, label_map
+
+
+def load_sentiment_model():
+    try:
+        device_type = get_config("analysis", "device_type", fallback="cpu")
+        model_name_config = get_config("analysis", "model_name", fallback="roberta")
+        batching = get_config("analysis", "batching", fallback="bucketed")
+        max_batch_tokens = get_config("analysis", "max_batch_tokens", type=int, fallback=16384)
+        model_backend = get_config("analysis", "model_backend", fallback="pytorch")
+    except Exception:
+        print("WARN: Could not read config, defaulting to CPU.")
+        device_type = "cpu"
+        model_name_config = "roberta"
+        batching = "bucketed"
+        max_batch_tokens = 16384
+        model_backend = "pytorch"
+
+    if model_name_config.lower() == "cascade":
+        fast_name, threshold = cascade_settings()
+        fast_engine, _ = load_model_engine(resolve_model_path(fast_name), device_type, batching, max_batch_tokens,
+                                           model_backend)
+        large_engine, label_map = load_model_engine(resolve_model_path("roberta"), device_type, batching,
+                                                    max_batch_tokens, model_backend)
+        fast_labels = DISTILBERT_LABELS if fast_name.lower() == "distilbert" else None
+        print(f"Cascade: {fast_name} first, XLM-RoBERTa below a confidence of {threshold}")
+        return CascadeInferenceEngine(fast_engine, large_engine, threshold, fast_labels), label_map, model_name_config
 
+    model_engine, label_map = load_model_engine(resolve_model_path(model_name_config), device_type, batching,
+                                                max_batch_tokens, model_backend)
+    return model_engine, label_map, model_name_config
 
-def init_worker():
+
+def label_results(results, model_name):
+    results_df = pd.DataFrame(results)
+
+    if model_name and model_name.lower() == "distilbert":
+        sentiment_label = results_df['label'].replace(DISTILBERT_LABELS)
+    else:
+        sentiment_label = results_df['label'].str.upper()
+
+    return pd.DataFrame({'sentiment_label': sentiment_label, 'sentiment_score': results_df['score']})
+
+
+def share_model_with_workers():
+    # Loads the model once in the parent and moves its weights into shared memory.
+    # Workers forked afterwards inherit these globals, so init_worker has nothing left to load.
+    global model_pipeline_worker
+    global model_label_map
+    global current_model_name
+
+    model_pipeline_worker, model_label_map, current_model_name = load_sentiment_model()
+    # A cascade holds two engines; both are shared.
+    for engine in getattr(model_pipeline_worker, "engines", [model_pipeline_worker]):
+        model = getattr(engine, "model", None)
+        if model is not None and hasattr(model, "share_memory"):
+            model.share_memory()
+
+    print(f"Model loaded once in the parent and shared with workers: {current_model_name}")
+
+
+def init_worker(num_threads=None):
     global model_pipeline_worker
     global model_label_map
     global current_model_name
 
+    start_time = time.time()
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    if model_pipeline_worker is not None:
+        print(f"Worker ready in {time.time() - start_time:.1f}s (shared model: {current_model_name})")
+        return
+
     print(f"Initializing sentiment model for worker process...")
 
     model_pipeline_worker, model_label_map, current_model_name = load_sentiment_model()
 
-    print(f"Worker model loaded successfully: {current_model_name}")
+    print(f"Worker model loaded successfully: {current_model_name} ({time.time() - start_time:.1f}s)")
+
 
+def open_analysis_pool(num_cores, logger, model_name="roberta", model_backend="pytorch", model_sharing="fork"):
+    if model_backend == "onnx":
+        logger.info("Preparing the ONNX model export before starting the workers...")
+        for model_path in model_paths(model_name):
+            prepare_onnx_model(model_path)
 
-def process_chunk(df_chunk):
+    # Shared mode: one model in the parent, forked copy-on-write into every worker.
+    # Needs the 'fork' start method (Linux/macOS) and the PyTorch backend.
+    share_model = (model_sharing == "fork" and model_backend == "pytorch"
+                   and "fork" in multiprocessing.get_all_start_methods())
+    if share_model:
+        logger.info("Loading the model once in the main process (shared with all workers)...")
+        share_model_with_workers()
+        pool_context = multiprocessing.get_context("fork")
+    else:
+        pool_context = multiprocessing.get_context()
+
+    threads_per_worker = max(1, (os.cpu_count() or num_cores) // num_cores)
+    pool = pool_context.Pool(processes=num_cores, initializer=init_worker, initargs=(threads_per_worker,))
+    logger.info(f"Pool initialized with {num_cores} cores ({'shared' if share_model else 'per-worker'} model, "
+                f"{threads_per_worker} threads each).")
+    return pool
+
+
+def process_micro_batch(micro_batch):
+    # Worker side of the streaming scheduler: receives (positions, texts), sends back only positions and results,
+    # plus how many of the texts the cascade escalated to the large model (0 without a cascade).
     global model_pipeline_worker
-    global model_label_map
     global current_model_name
 
+    positions, text_list = micro_batch
+
     if model_pipeline_worker is None:
         print("WARN: Model was not loaded during init_worker, loading now...")
         init_worker()
 
     try:
-        text_list = df_chunk['body'].tolist()
-        results = model_pipeline_worker(text_list, batch_size=64)
-        results_df = pd.DataFrame(results)
-
-        if current_model_name and current_model_name.lower() == "distilbert":
-            distilbert_map = {
-                'LABEL_0': 'NEGATIVE',
-                'LABEL_1': 'POSITIVE'
-            }
-            results_df['sentiment_label'] = results_df['label'].replace(distilbert_map)
-        else:
-            results_df['sentiment_label'] = results_df['label'].str.upper()
-
-        df_chunk = df_chunk.reset_index(drop=True)
-        df_chunk['sentiment_label'] = results_df['sentiment_label']
-        df_chunk['sentiment_score'] = results_df['score']
-
+        results = model_pipeline_worker(text_list, batch_size=cpu_batch_size(model_pipeline_worker))
+        results_df = label_results(results, current_model_name)
+        labels = results_df['sentiment_label'].to_numpy(dtype=object)
+        scores = results_df['sentiment_score'].to_numpy(dtype=np.float32)
+        escalated = getattr(model_pipeline_worker, "last_escalated", 0)
     except Exception as e:
-        print(f"ERROR: Failed to process chunk: {e}")
-        df_chunk['sentiment_label'] = 'ERROR'
-        df_chunk['sentiment_score'] = 0.0
+        print(f"ERROR: Failed to process micro-batch: {e}")
+        labels = np.full(len(text_list), 'ERROR', dtype=object)
+        scores = np.zeros(len(text_list), dtype=np.float32)
+        escalated = 0
+
+    return positions, labels, scores, escalated
+
+
+def iter_micro_batches(text_list, micro_batch_size):
+    # Longest texts go first, so the slow micro-batches start early and the step ends on short, fast ones.
+    # Neighbouring texts have similar lengths, which also keeps padding inside each micro-batch low.
+    order = np.argsort(np.fromiter((len(text) for text in text_list), dtype=np.int64, count=len(text_list)), kind="stable")[::-1]
+    for start in range(0, len(order), micro_batch_size):
+        positions = order[start:start + micro_batch_size]
+        yield positions, [text_list[i] for i in positions]
+
+
+def analyze_streaming(text_list, pool, logger, micro_batch_size=256, progress_seconds=30):
+    """
+    Streams small text-only micro-batches through 'pool' with imap_unordered.
+    Idle workers pick up the next micro-batch as soon as they finish, so one slow chunk can no
+    longer hold up the whole step. Returns a DataFrame aligned with 'text_list'.
+    """
+    total = len(text_list)
+    labels = np.empty(total, dtype=object)
+    scores = np.zeros(total, dtype=np.float32)
+
+    done = 0
+    escalated = 0
+    start_time = time.time()
+    last_report = start_time
+
+    for positions, batch_labels, batch_scores, batch_escalated in pool.imap_unordered(
+            process_micro_batch, iter_micro_batches(text_list, micro_batch_size)):
+        labels[positions] = batch_labels
+        scores[positions] = batch_scores
+        done += len(positions)
+        escalated += batch_escalated
+
+        now = time.time()
+        if now - last_report >= progress_seconds or done == total:
+            rate = done / (now - start_time) if now > start_time else 0.0
+            eta_minutes = (total - done) / rate / 60 if rate else 0.0
+            logger.info(f"⏳ Step 5 progress: {done}/{total} ({done / total:.1%}), {rate:.1f} comments/s, ETA {eta_minutes:.1f} min")
+            last_report = now
+
+    if escalated:
+        log_escalation(logger, escalated, total)
+    return pd.DataFrame({'sentiment_label': labels, 'sentiment_score': scores})
 
-    return df_chunk
+
+def cpu_batch_size(engine):
+    # Token-budget engines (bucketed, ONNX) size their batches themselves: a row cap would split
+    # the large batches of short comments. Only the plain pipeline needs a fixed batch size.
+    if isinstance(engine, CascadeInferenceEngine):
+        return cpu_batch_size(engine.fast_engine)
+    if isinstance(engine, BucketedInferenceEngine):
+        return None
+    return FIXED_CPU_BATCH_SIZE
+
+
+def log_escalation(logger, escalated, total):
+    logger.info(f"🪜 Cascade: {escalated} of {total} texts ({escalated / total:.1%}) were under the confidence threshold "
+                f"and scored by XLM-RoBERTa; the rest kept the fast model's result.")
 
 
 def analyze_sentiment_batch(text_list, model):
@@ -99,4 +350,40 @@ def analyze_sentiment_batch(text_list, model):
         print(f"ERROR during batch analysis: {e}")
         return []
 
-    return results
\ No newline at end of file
+    return results
+
+
+def label_batch(text_list, model, model_name):
+    # GPU path: a failed batch comes back empty; its texts are marked 'ERROR' (never cached) like failed CPU chunks.
+    results = analyze_sentiment_batch(text_list=text_list, model=model)
+    if len(results) != len(text_list):
+        return pd.DataFrame({'sentiment_label': ['ERROR'] * len(text_list), 'sentiment_score': [0.0] * len(text_list)})
+    return label_results(results, model_name)
+
+
+def analyze_with_cache(text_list, infer, cache=None, logger=None):
+    """
+    Runs 'infer' only on texts that are neither duplicates inside 'text_list' nor already cached.
+    'infer' takes a list of texts and returns a DataFrame with sentiment_label/sentiment_score.
+    Returns a DataFrame aligned with 'text_list'.
+    """
+    unique_texts = list(dict.fromkeys(text_list))
+    results = cache.get_many(unique_texts) if cache is not None else {}
+    misses = [text for text in unique_texts if text not in results]
+
+    if misses:
+        results_df = infer(misses)
+        fresh = dict(zip(misses, zip(results_df['sentiment_label'], results_df['sentiment_score'])))
+        if cache is not None:
+            cache.put_many({text: value for text, value in fresh.items() if value[0] != 'ERROR'})
+        results.update(fresh)
+
+    if logger is not None:
+        duplicates = len(text_list) - len(unique_texts)
+        cache_hits = len(unique_texts) - len(misses)
+        cache_hit_rate = cache_hits / len(unique_texts) if unique_texts else 0.0
+        logger.info(
+            f"🧠 Sentiment cache: {len(text_list)} texts, {duplicates} in-batch duplicates, "
+            f"{cache_hits} cache hits ({cache_hit_rate:.1%} of unique texts), {len(misses)} sent to the model.")
+
+    return pd.DataFrame([results[text] for text in text_list], columns=['sentiment_label', 'sentiment_score'])
@@ -0,0 +1,89 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# SQLite allows at most 999 bound variables per statement.
+LOOKUP_BATCH_SIZE = 900
+
+
+class SentimentCache:
+    """
+    Content-addressed cache of model outputs.
+    The key is a hash of (model path, model revision, preprocessed text), so identical bodies are
+    scored once no matter which comment, post or run they come from. Size is bounded by
+    'max_entries'; the least recently used entries are evicted first.
+    """
+
+    def __init__(self, model_path, model_revision, path="data/cache/sentiment_cache.db", max_entries=2_000_000):
+        db_path = Path(path)
+        if not db_path.is_absolute():
+            db_path = PROJECT_ROOT / db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = db_path
+        self.model_prefix = f"{model_path}\0{model_revision}\0"
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(str(db_path), timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment_cache ("
+            "key TEXT PRIMARY KEY, sentiment_label TEXT NOT NULL, sentiment_score REAL NOT NULL, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_cache_last_used ON sentiment_cache (last_used)")
+        self._conn.commit()
+
+    def key(self, text):
+        return hashlib.sha256((self.model_prefix + text).encode("utf-8")).hexdigest()
+
+    def get_many(self, text_list):
+        """Returns {text: (sentiment_label, sentiment_score)} for the texts that are cached."""
+        keys = {self.key(text): text for text in text_list}
+        key_list = list(keys)
+        found = {}
+        for start in range(0, len(key_list), LOOKUP_BATCH_SIZE):
+            batch = key_list[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, sentiment_label, sentiment_score FROM sentiment_cache WHERE key IN ({placeholders})",
+                batch).fetchall()
+            for key, label, score in rows:
+                found[keys[key]] = (label, score)
+
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE sentiment_cache SET last_used = ? WHERE key = ?",
+                [(now, self.key(text)) for text in found])
+            self._conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, results):
+        """'results' maps text -> (sentiment_label, sentiment_score)."""
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO sentiment_cache (key, sentiment_label, sentiment_score, last_used) VALUES (?, ?, ?, ?)",
+            [(self.key(text), label, float(score), now) for text, (label, score) in results.items()])
+        self._conn.commit()
+        self.evict()
+
+    def evict(self):
+        (entry_count,) = self._conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()
+        overflow = entry_count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM sentiment_cache WHERE key IN "
+                "(SELECT key FROM sentiment_cache ORDER BY last_used ASC LIMIT ?)", (overflow,))
+            self._conn.commit()
+        return max(overflow, 0)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
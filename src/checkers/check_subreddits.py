@@ -1,143 +1,210 @@
-from prawcore.exceptions import Redirect, NotFound
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+import threading
+from prawcore.exceptions import Redirect, NotFound, TooManyRequests, ServerError
 import pandas as pd
 from src.core.config_utils import get_config
 from src.core.logger import setup_logger
 from src.core.connect_reddit import connect_reddit
-from src.checkers.filter_subreddits import filter_subreddit
-from src.utils.save_csv import save_csv
-from src.utils.subreddit_stats import count_comments
-
-def check_subreddits(subreddits, reddit, logger, category):
-    filtered_df = filter_subreddit(subreddits, logger, category)
-
-    for index, row in filtered_df.iterrows():
-        subreddit_name = row['subreddit']
-        country_name = row['country']
-        logger.info(f"⏳ Checking subreddit of {country_name}: r/{subreddit_name} ===")
-        if pd.isna(subreddit_name):
-            logger.info(f"⏭️  {country_name}: No subreddit ===")
-            continue
-
-        subreddits.at[index, "checked"] = True
+from src.checkers.filter_subreddits import category_mask
+from src.utils.storage import save_table
+from src.utils.subreddit_stats import count_recent_comments, estimate_recent_comments
+from src.core.request_scheduler import call_with_retries
+from src.checkers.health_cache import SubredditHealthCache
+
+def probe_subreddit(reddit, subreddit_name, sub_approve_point, comment_approve_point, comment_max_days,
+                    count_mode="exact", estimate_max_pages=2, listing_cache=None):
+    # One 'new' listing answers both checks: its first post proves activity, and the same pages
+    # are read on for the comment volume (only for subreddits big enough to be approved).
+    # The pages read here are kept in 'listing_cache' for the post scraper.
+    sub = reddit.subreddit(subreddit_name)
+    subscriber_count = sub.subscribers
+    listing = sub.new(limit=None)
+    if listing_cache is not None:
+        listing = listing_cache.record(subreddit_name, listing)
+    listing = iter(listing)
+    first_post = next(listing, None)
+    has_posts = first_post is not None
+
+    comment_count = comments_low = comments_high = 0
+    if has_posts and (subscriber_count or 0) >= sub_approve_point:
+        submissions = chain([first_post], listing)
         try:
-            sub = reddit.subreddit(subreddit_name)
-            subscriber_count = sub.subscribers
-            sub.new(limit=1).__next__()
-            logger.info("✅ Found ===")
-            subreddits.at[index, "subscribers"] = subscriber_count
-            subreddits.at[index, "active"] = True
+            if count_mode == "estimate":
+                comment_count, comments_low, comments_high = estimate_recent_comments(
+                    submissions, comment_approve_point, comment_max_days, estimate_max_pages)
+            else:
+                comment_count = comments_low = comments_high = count_recent_comments(
+                    submissions, comment_approve_point, comment_max_days)
+        except (TooManyRequests, ServerError):
+            raise
+        except Exception:
+            comment_count = comments_low = comments_high = 0
+
+    return {"subscribers": subscriber_count, "active": has_posts, "comments_last_week": comment_count,
+            "comments_low": comments_low, "comments_high": comments_high}
+
+def probe_all(subreddit_names, reddit, logger, workers, scheduler, probe):
+    """Probes every subreddit once. Returns {subreddit: result}; subreddits that could not be checked map to an error string."""
+    def probe_one(client, subreddit_name):
+        logger.info(f"⏳ Checking r/{subreddit_name} ===")
+        try:
+            return call_with_retries(lambda: probe(client, subreddit_name), logger, f"checking r/{subreddit_name}", scheduler)
         except (Redirect, NotFound):
-            logger.info("❌ Not Found ===")
-            subreddits.at[index, "active"] = False
-        except StopIteration:
-             logger.info("❌ Found but no posts (inactive check) ===")
-             subreddits.at[index, "subscribers"] = subscriber_count
-             subreddits.at[index, "active"] = False
+            return {"subscribers": None, "active": False, "comments_last_week": 0}
         except Exception as e:
-            logger.info(f"❌ Other Error: {e} ===")
-            subreddits.at[index, "active"] = False
-
+            return f"{e}"
+
+    if workers <= 1 or scheduler is None:
+        return {subreddit_name: probe_one(reddit, subreddit_name) for subreddit_name in subreddit_names}
+
+    # PRAW objects are not thread-safe: one client per worker thread, all sharing the scheduler's request budget.
+    thread_state = threading.local()
+
+    def worker(subreddit_name):
+        if getattr(thread_state, "reddit", None) is None:
+            thread_state.reddit = connect_reddit(logger, scheduler)
+        return probe_one(thread_state.reddit, subreddit_name)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(subreddit_names, executor.map(worker, subreddit_names)))
+
+def as_flag(subreddits, column):
+    # Missing columns and empty cells count as False.
+    if column not in subreddits.columns:
+        return pd.Series(False, index=subreddits.index)
+    return subreddits[column].fillna(False).astype(bool)
+
+def check_subreddits(subreddits, reddit, logger, in_category, scheduler=None, sub_approve_point=0, comment_approve_point=0,
+                     comment_max_days=7, workers=1, cache=None, count_mode="exact", estimate_max_pages=2,
+                     listing_cache=None):
+    names = subreddits['subreddit']
+    to_check = in_category & names.notna()
+    subreddit_names = list(dict.fromkeys(names[to_check]))
+
+    settings = f"{comment_max_days}/{comment_approve_point}/{sub_approve_point}/{count_mode}"
+    if count_mode == "estimate":
+        settings += f"/{estimate_max_pages}"
+    results = cache.get_fresh(subreddit_names, settings) if cache is not None else {}
+    to_probe = [subreddit_name for subreddit_name in subreddit_names if subreddit_name not in results]
+    logger.info(f"🔎 {len(subreddit_names)} subreddits: {len(results)} cached, probing {len(to_probe)} "
+                f"({workers if scheduler is not None else 1} workers) ===")
+
+    probed = probe_all(
+        to_probe, reddit, logger, workers, scheduler,
+        lambda client, subreddit_name: probe_subreddit(client, subreddit_name, sub_approve_point, comment_approve_point,
+                                                       comment_max_days, count_mode, estimate_max_pages, listing_cache))
+    checked = {subreddit_name: result for subreddit_name, result in probed.items() if isinstance(result, dict)}
+    if cache is not None and checked:
+        cache.store(checked, settings)
+    results.update(probed)
+
+    for subreddit_name, result in results.items():
+        if isinstance(result, str):
+            logger.info(f"❌ r/{subreddit_name}: Other Error: {result} ===")
+        elif result["subscribers"] is None:
+            logger.info(f"❌ r/{subreddit_name}: Not Found ===")
+        elif not result["active"]:
+            logger.info(f"❌ r/{subreddit_name}: Found but no posts (inactive check) ===")
+
+    # All network results are gathered into one frame and merged back onto the rows in a single step.
+    found = {subreddit_name: result for subreddit_name, result in results.items()
+             if isinstance(result, dict) and result["subscribers"] is not None}
+    probe_df = pd.DataFrame.from_dict(found, orient='index', columns=['subscribers', 'active', 'comments_last_week',
+                                                                      'comments_low', 'comments_high'])
+    checked_names = names[to_check]
+
+    subreddits.loc[to_check, "checked"] = True
+    subreddits.loc[to_check, "subscribers"] = checked_names.map(probe_df['subscribers'])
+    subreddits.loc[to_check, "active"] = checked_names.map(probe_df['active']).fillna(False).astype(bool)
+
+    # The comment volume is only counted for active subreddits that are big enough to be approved.
+    counted = to_check & as_flag(subreddits, "active") & (subreddits["subscribers"] >= sub_approve_point)
+    subreddits.loc[counted, "comments_last_week"] = names[counted].map(probe_df['comments_last_week'])
+    if count_mode == "estimate":
+        # ~95% interval of the extrapolated weekly volume (equal to the count where the window was fully read).
+        subreddits.loc[counted, "comments_last_week_low"] = names[counted].map(probe_df['comments_low'])
+        subreddits.loc[counted, "comments_last_week_high"] = names[counted].map(probe_df['comments_high'])
+
+    logger.info(f"✅ Checked {int(to_check.sum())} subreddits: {int(as_flag(subreddits, 'active')[to_check].sum())} active ===")
     return subreddits
 
-def approve_subscribers(subreddits, logger, category, sub_approve_point):
-    filtered_df = filter_subreddit(subreddits, logger, category)
-    for index, row in filtered_df.iterrows():
-        subreddit_name = row['subreddit']
-        country_name = row['country']
-
-        if pd.isna(subreddit_name):
-            logger.info(f"⏭️ {country_name}: No subreddit, skipping approval ===")
-            continue
-
-        subreddit_active = row.get('active', False)
-        subreddit_subscribers = row.get('subscribers', 0)
-
-        logger.info(f"⏳ Approving subscribers of {country_name}: r/{subreddit_name} ===")
-        if not subreddit_active:
-            logger.info(f"⏭️  r/{subreddit_name}: is not active ===")
-            continue
-
-        if subreddit_subscribers < sub_approve_point:
-            subreddits.at[index, "enough_subscribers"] = False
-            logger.info(f"❌ Subscribers Not Approved: r/{subreddit_name} ({subreddit_subscribers} < {sub_approve_point}) ===")
-        else:
-            subreddits.at[index, "enough_subscribers"] = True
-            logger.info(f"✅ Subscribers Approved: r/{subreddit_name} ({subreddit_subscribers} >= {sub_approve_point}) ===")
+def approve_subscribers(subreddits, logger, in_category, sub_approve_point):
+    active = in_category & subreddits['subreddit'].notna() & as_flag(subreddits, "active")
+    subreddits.loc[active, "enough_subscribers"] = ~(subreddits.loc[active, "subscribers"] < sub_approve_point)
 
+    approved_count = int(as_flag(subreddits, "enough_subscribers")[active].sum())
+    logger.info(f"👥 Subscribers approved for {approved_count}/{int(active.sum())} active subreddits (>= {sub_approve_point}) ===")
     return subreddits
 
-def approve_comments(subreddits, reddit, logger, category, comment_approve_point, comment_max_days):
-    filtered_df = filter_subreddit(subreddits, logger, category)
-
-    for index, row in filtered_df.iterrows():
-        subreddit_name = row['subreddit']
-        country_name = row['country']
-        subreddit_active = row.get('active', False)
-        enough_subscribers = row.get('enough_subscribers', False)
-
-        if pd.isna(subreddit_name) or not subreddit_active or not enough_subscribers:
-            logger.info(f"⏭️  r/{subreddit_name} ({country_name}): Skipping comment check (inactive or not enough subs) ===")
-            continue
-
-        logger.info(f"⏳ Approving comments of {country_name}: r/{subreddit_name} ===")
-        try:
-            sub = reddit.subreddit(subreddit_name)
-            comment_count = count_comments(sub, logger, comment_approve_point, comment_max_days)
-        except (Redirect, NotFound):
-            logger.info(f"❌ r/{subreddit_name} not found during comment check ===")
-            comment_count = 0
-        except Exception as e:
-            logger.info(f"❌ Error during comment count for r/{subreddit_name}: {e} ===")
-            comment_count = 0
-
-        logger.info(f"🔍 r/{subreddit_name} comments last week (approx): {comment_count} ===")
-        subreddits.at[index, "comments_last_week"] = comment_count
-        subreddits.at[index, "enough_comments"] = comment_count >= comment_approve_point
+def approve_comments(subreddits, logger, in_category, comment_approve_point):
+    # 'comments_last_week' was already counted by check_subreddits from the same listing, so no API calls here.
+    eligible = (in_category & subreddits['subreddit'].notna() & as_flag(subreddits, "active")
+                & as_flag(subreddits, "enough_subscribers"))
+    subreddits.loc[eligible, "enough_comments"] = subreddits.loc[eligible, "comments_last_week"] >= comment_approve_point
 
+    approved_count = int(as_flag(subreddits, "enough_comments")[eligible].sum())
+    logger.info(f"🔍 Comment volume approved for {approved_count}/{int(eligible.sum())} subreddits (>= {comment_approve_point}) ===")
     return subreddits
 
-def approve_subreddits(subreddits, logger, category):
-    filtered_df = filter_subreddit(subreddits, logger, category)
-
-    for index, row in filtered_df.iterrows():
-        subreddit_name = row['subreddit']
-
-        if pd.isna(subreddit_name):
-            subreddits.at[index, "approved"] = False
-            continue
+def approve_subreddits(subreddits, logger, in_category):
+    approved = (subreddits['subreddit'].notna() & as_flag(subreddits, "active")
+                & as_flag(subreddits, "enough_subscribers") & as_flag(subreddits, "enough_comments"))
+    subreddits.loc[in_category, "approved"] = approved[in_category]
 
-        subreddit_active = row.get('active', False)
-        enough_subscribers = row.get('enough_subscribers', False)
-        enough_comments = row.get('enough_comments', False)
-
-        approved = subreddit_active and enough_subscribers and enough_comments
-
-        subreddits.at[index, "approved"] = approved
-        if approved:
-            logger.info(f"✅ r/{subreddit_name} is APPROVED ===")
+    for row in subreddits[in_category & subreddits['subreddit'].notna()].itertuples():
+        if row.approved:
+            logger.info(f"✅ r/{row.subreddit} is APPROVED ===")
         else:
-            logger.info(f"❌ r/{subreddit_name} is NOT APPROVED (Active: {subreddit_active}, Subs OK: {enough_subscribers}, Comments OK: {enough_comments}) ===")
+            logger.info(f"❌ r/{row.subreddit} is NOT APPROVED (Active: {getattr(row, 'active', None)}, "
+                        f"Subs OK: {getattr(row, 'enough_subscribers', None)}, Comments OK: {getattr(row, 'enough_comments', None)}) ===")
 
     return subreddits
 
-def main(subreddits, reddit=None, logger=None):
+def main(subreddits, reddit=None, logger=None, scheduler=None, checkpoint=None, listing_cache=None):
     if logger is None:
         logger = setup_logger()
     if reddit is None:
-        reddit = connect_reddit(logger)
+        reddit = connect_reddit(logger, scheduler)
 
     file_location = "data/raw/subreddits/"
+    run_date = checkpoint.run_date if checkpoint else None
+
+    if checkpoint:
+        finished = checkpoint.finished_units("check")
+        if "subreddits" in finished:
+            logger.info("♻️ Subreddits were already checked in this run. Reusing the result.")
+            return pd.DataFrame(finished["subreddits"])
 
     comment_max_days = get_config("global", "comment_max_days", type=int)
     comment_approve_point = get_config("check_subreddits", "comment_approve_point", type=int)
     sub_approve_point = get_config("check_subreddits", "sub_approve_point", type=int)
     category = get_config("global", "category")
-
-    subreddits_checked = check_subreddits(subreddits, reddit, logger, category)
-    subreddits_approved_subs = approve_subscribers(subreddits_checked, logger, category, sub_approve_point)
-    subreddits_approved_comments = approve_comments(subreddits_approved_subs, reddit, logger, category, comment_approve_point, comment_max_days)
-    subreddits_final = approve_subreddits(subreddits_approved_comments, logger, category)
-
-    save_csv(subreddits_final, logger, file_location)
+    workers = get_config("check_subreddits", "workers", type=int, fallback=4)
+    count_mode = get_config("check_subreddits", "comment_count_mode", fallback="exact").lower()
+    estimate_max_pages = get_config("check_subreddits", "estimate_max_pages", type=int, fallback=2)
+
+    cache = None
+    if get_config("check_subreddits", "cache_enabled", type=bool, fallback=True):
+        cache = SubredditHealthCache(
+            get_config("check_subreddits", "cache_path", fallback="data/cache/subreddit_health.db"),
+            ttl_hours=get_config("check_subreddits", "cache_ttl_hours", type=float, fallback=72)
+        )
+        cache.prune()
+
+    # The category filter is computed once and shared by every step below.
+    in_category = category_mask(subreddits, category)
+    logger.info(f"⏳ Checking {int(in_category.sum())} subreddits in category '{category}' ===")
+
+    subreddits_checked = check_subreddits(subreddits, reddit, logger, in_category, scheduler, sub_approve_point,
+                                          comment_approve_point, comment_max_days, workers, cache, count_mode,
+                                          estimate_max_pages, listing_cache)
+    subreddits_approved_subs = approve_subscribers(subreddits_checked, logger, in_category, sub_approve_point)
+    subreddits_approved_comments = approve_comments(subreddits_approved_subs, logger, in_category, comment_approve_point)
+    subreddits_final = approve_subreddits(subreddits_approved_comments, logger, in_category)
+
+    save_table(subreddits_final, logger, file_location, run_date)
+    if checkpoint:
+        checkpoint.save_unit("check", "subreddits", subreddits_final.to_dict("records"))
 
     return subreddits_final
\ No newline at end of file
@@ -1,13 +1,6 @@
 import pandas as pd
-from pathlib import Path
-
-def filter_subreddit(subreddits, logger, category):
-    if isinstance(subreddits, (str, Path)):
-        subreddits = pd.read_csv(subreddits)
 
+def category_mask(subreddits, category):
     if category == "all":
-        filtered_df = subreddits
-    else:
-        filtered_df = subreddits[subreddits["category"] == category]
-
-    return filtered_df
+        return pd.Series(True, index=subreddits.index)
+    return subreddits["category"] == category
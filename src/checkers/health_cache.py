@@ -0,0 +1,56 @@
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+
+class SubredditHealthCache:
+    """
+    Remembers each subreddit's probe result (subscribers, active, recent comment volume) for 'ttl_hours',
+    so communities that were checked recently are not probed again on the next run.
+    Results are scoped to the settings they were probed with ('settings', e.g. the comment window and approve
+    points), because the comment count stops early at the approve point and is skipped for small subreddits.
+    """
+
+    def __init__(self, path="data/cache/subreddit_health.db", ttl_hours=72):
+        db_path = Path(path)
+        if not db_path.is_absolute():
+            db_path = PROJECT_ROOT / db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = db_path
+        self.ttl_seconds = ttl_hours * 3600
+        self._conn = sqlite3.connect(str(db_path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS subreddit_probes ("
+            "subreddit TEXT NOT NULL, settings TEXT NOT NULL, result TEXT NOT NULL, checked_at REAL NOT NULL, "
+            "PRIMARY KEY (subreddit, settings))")
+        self._conn.commit()
+
+    def get_fresh(self, subreddit_names, settings):
+        """Returns {subreddit: probe result dict} for the subreddits checked within the TTL."""
+        oldest = time.time() - self.ttl_seconds
+        found = {}
+        for name in subreddit_names:
+            row = self._conn.execute(
+                "SELECT result FROM subreddit_probes WHERE subreddit = ? AND settings = ? AND checked_at >= ?",
+                (name.lower(), settings, oldest)).fetchone()
+            if row is not None:
+                found[name] = json.loads(row[0])
+        return found
+
+    def store(self, results, settings):
+        """'results' maps subreddit -> probe result dict."""
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO subreddit_probes (subreddit, settings, result, checked_at) VALUES (?, ?, ?, ?)",
+            [(name.lower(), settings, json.dumps(result), now) for name, result in results.items()])
+        self._conn.commit()
+
+    def prune(self):
+        cursor = self._conn.execute("DELETE FROM subreddit_probes WHERE checked_at < ?", (time.time() - self.ttl_seconds,))
+        self._conn.commit()
+        return cursor.rowcount
@@ -0,0 +1,109 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+
+def _to_native(value):
+    # numpy scalars (np.int64, np.bool_) -> plain Python values
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+class CheckpointStore:
+    """
+    SQLite store that remembers which units of work (a checked subreddit list, a scraped subreddit,
+    a scraped post) a run has already finished, together with the records they produced.
+    A restarted run loads those records instead of asking Reddit again.
+    """
+
+    def __init__(self, path="data/checkpoints/pipeline.db"):
+        db_path = Path(path)
+        if not db_path.is_absolute():
+            db_path = PROJECT_ROOT / db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "run_date TEXT PRIMARY KEY, started_at TEXT NOT NULL, finished INTEGER NOT NULL DEFAULT 0)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS units ("
+            "run_date TEXT NOT NULL, stage TEXT NOT NULL, unit_key TEXT NOT NULL, records TEXT NOT NULL, "
+            "PRIMARY KEY (run_date, stage, unit_key))")
+        self._conn.commit()
+
+    def open_run(self, logger, resume_max_days=1):
+        """
+        Returns the newest unfinished run if it is younger than 'resume_max_days', otherwise starts a new one.
+        A resumed run keeps its original date and start time, so file names and the scrape window do not move.
+        """
+        now = datetime.utcnow()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_date, started_at FROM runs WHERE finished = 0 ORDER BY started_at DESC LIMIT 1").fetchone()
+
+        if row is not None:
+            run_date, started_at = row[0], datetime.fromisoformat(row[1])
+            if now - started_at <= timedelta(days=resume_max_days):
+                logger.info(f"♻️ Resuming unfinished run from {run_date} (started {started_at:%Y-%m-%d %H:%M} UTC).")
+                return CheckpointRun(self, run_date, started_at)
+            logger.warning(f"⚠️ Unfinished run from {run_date} is older than {resume_max_days} days. Starting a new run.")
+
+        # Date and start time come from the same UTC timestamp, so a run started around midnight cannot
+        # end up with a date partition that disagrees with its scrape window.
+        run_date = now.strftime("%Y-%m-%d")
+        with self._lock:
+            existing = self._conn.execute("SELECT finished FROM runs WHERE run_date = ?", (run_date,)).fetchone()
+            if existing is not None:
+                # Same-day re-run of a finished run: start over with a clean slate.
+                self._conn.execute("DELETE FROM units WHERE run_date = ?", (run_date,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs (run_date, started_at, finished) VALUES (?, ?, 0)",
+                (run_date, now.isoformat()))
+            self._conn.commit()
+        return CheckpointRun(self, run_date, now)
+
+    def finished_units(self, run_date, stage):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT unit_key, records FROM units WHERE run_date = ? AND stage = ?", (run_date, stage)).fetchall()
+        return {unit_key: json.loads(records) for unit_key, records in rows}
+
+    def save_unit(self, run_date, stage, unit_key, records):
+        payload = json.dumps(records, default=_to_native)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO units (run_date, stage, unit_key, records) VALUES (?, ?, ?, ?)",
+                (run_date, stage, str(unit_key), payload))
+            self._conn.commit()
+
+    def finish_run(self, run_date):
+        with self._lock:
+            self._conn.execute("UPDATE runs SET finished = 1 WHERE run_date = ?", (run_date,))
+            self._conn.execute("DELETE FROM units WHERE run_date = ?", (run_date,))
+            self._conn.commit()
+
+
+class CheckpointRun:
+    """Checkpoint view bound to one run date; this is what the pipeline steps receive."""
+
+    def __init__(self, store, run_date, started_at):
+        self.store = store
+        self.run_date = run_date
+        self.started_at = started_at
+
+    def finished_units(self, stage):
+        return self.store.finished_units(self.run_date, stage)
+
+    def save_unit(self, stage, unit_key, records):
+        self.store.save_unit(self.run_date, stage, unit_key, records)
+
+    def finish(self):
+        self.store.finish_run(self.run_date)
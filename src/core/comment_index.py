@@ -0,0 +1,154 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# SQLite allows at most 999 bound variables per statement.
+LOOKUP_BATCH_SIZE = 900
+
+
+def body_hash(text):
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+
+class CommentIndex:
+    """
+    Persistent index of every comment scored so far, keyed by comment_id (and post_id).
+    Stores the hash of the scraped body next to its sentiment, so a comment that shows up again
+    in a later weekly run reuses its label unless the body was edited.
+    Entries are scoped to 'model_name', the identity of the scores (model path and revision from
+    resolve_model_identity): switching models, truncation, backend or cascade threshold never reuses the other labels.
+    """
+
+    def __init__(self, path="data/index/comment_index.db", model_name="roberta"):
+        db_path = Path(path)
+        if not db_path.is_absolute():
+            db_path = PROJECT_ROOT / db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = db_path
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS comments ("
+            "comment_id TEXT NOT NULL, model_name TEXT NOT NULL, post_id TEXT NOT NULL, body_hash TEXT NOT NULL, "
+            "sentiment_label TEXT, sentiment_score REAL, last_seen REAL NOT NULL, "
+            "PRIMARY KEY (comment_id, model_name))")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_comments_post ON comments (post_id)")
+        # Per-post high-water marks for delta comment fetching (not model specific):
+        # the post's comment count when it was scraped, when that was, and the run date its comments were saved under.
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS post_marks ("
+            "post_id TEXT PRIMARY KEY, num_comments INTEGER NOT NULL, scraped_at REAL NOT NULL, "
+            "scraped_on TEXT NOT NULL, last_seen REAL NOT NULL)")
+        self._conn.commit()
+
+    def lookup(self, comment_ids):
+        """Returns {comment_id: (body_hash, sentiment_label, sentiment_score)} for the ids that are known."""
+        comment_ids = [str(comment_id) for comment_id in comment_ids]
+        found = {}
+        with self._lock:
+            for start in range(0, len(comment_ids), LOOKUP_BATCH_SIZE):
+                batch = comment_ids[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT comment_id, body_hash, sentiment_label, sentiment_score FROM comments "
+                    f"WHERE model_name = ? AND comment_id IN ({placeholders})", [self.model_name] + batch).fetchall()
+                for comment_id, stored_hash, label, score in rows:
+                    found[comment_id] = (stored_hash, label, score)
+        return found
+
+    def store(self, rows):
+        """'rows' is an iterable of (comment_id, post_id, body_hash, sentiment_label, sentiment_score)."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO comments "
+                "(comment_id, model_name, post_id, body_hash, sentiment_label, sentiment_score, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(str(c), self.model_name, str(p), h, label, float(score), now) for c, p, h, label, score in rows])
+            self._conn.commit()
+
+    def touch(self, comment_ids):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE comments SET last_seen = ? WHERE comment_id = ? AND model_name = ?",
+                [(now, str(comment_id), self.model_name) for comment_id in comment_ids])
+            self._conn.commit()
+
+    def post_marks(self, post_ids):
+        """Returns {post_id: (num_comments, scraped_at, scraped_on)} for the posts scraped in earlier runs."""
+        post_ids = [str(post_id) for post_id in post_ids]
+        found = {}
+        with self._lock:
+            for start in range(0, len(post_ids), LOOKUP_BATCH_SIZE):
+                batch = post_ids[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT post_id, num_comments, scraped_at, scraped_on FROM post_marks WHERE post_id IN ({placeholders})",
+                    batch).fetchall()
+                for post_id, num_comments, scraped_at, scraped_on in rows:
+                    found[post_id] = (num_comments, scraped_at, scraped_on)
+        return found
+
+    def store_post_marks(self, rows):
+        """'rows' is an iterable of (post_id, num_comments, scraped_at, scraped_on)."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO post_marks (post_id, num_comments, scraped_at, scraped_on, last_seen) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(str(p), int(count), float(scraped_at), scraped_on, now) for p, count, scraped_at, scraped_on in rows])
+            self._conn.commit()
+
+    def prune(self, retention_days):
+        cutoff = time.time() - retention_days * 86400
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM comments WHERE last_seen < ?", (cutoff,)).rowcount
+            self._conn.execute("DELETE FROM post_marks WHERE last_seen < ?", (cutoff,))
+            self._conn.commit()
+        return deleted
+
+
+def fill_known_sentiment(df, comment_index):
+    """
+    Copies stored sentiment onto rows whose comment_id is in the index with an unchanged body_hash.
+    Rows that already carry a label (filled by the scraper) are left alone.
+    """
+    if df.empty or 'comment_id' not in df.columns or 'body_hash' not in df.columns:
+        return df
+
+    df = df.copy()
+    if 'sentiment_label' not in df.columns:
+        df['sentiment_label'] = None
+        df['sentiment_score'] = float('nan')
+
+    comment_ids = df['comment_id'].astype(str)
+    known = comment_index.lookup(comment_ids[df['sentiment_label'].isna()])
+    if known:
+        known_df = pd.DataFrame.from_dict(known, orient='index', columns=['body_hash', 'sentiment_label', 'sentiment_score'])
+        known_labels = comment_ids.map(known_df['sentiment_label'])
+        unchanged = df['sentiment_label'].isna() & known_labels.notna() & (comment_ids.map(known_df['body_hash']) == df['body_hash'])
+        df.loc[unchanged, 'sentiment_label'] = known_labels[unchanged]
+        df.loc[unchanged, 'sentiment_score'] = comment_ids[unchanged].map(known_df['sentiment_score'])
+
+    comment_index.touch(comment_ids[df['sentiment_label'].notna()])
+    return df
+
+
+def record_sentiment(df, comment_index):
+    if df.empty or 'body_hash' not in df.columns:
+        return 0
+
+    scored = df[df['sentiment_label'].notna() & (df['sentiment_label'] != 'ERROR')]
+    comment_index.store(zip(scored['comment_id'], scored['post_id'], scored['body_hash'],
+                            scored['sentiment_label'], scored['sentiment_score']))
+    return len(scored)
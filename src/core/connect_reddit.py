@@ -1,13 +1,20 @@
 import praw
 import os
 from dotenv import load_dotenv
+from src.core.rate_limiter import RateLimitedRequestor
 
-def connect_reddit(logger):
+def connect_reddit(logger, rate_limiter=None):
     load_dotenv()
+    reddit_kwargs = {}
+    if rate_limiter is not None:
+        reddit_kwargs["requestor_class"] = RateLimitedRequestor
+        reddit_kwargs["requestor_kwargs"] = {"rate_limiter": rate_limiter}
+
     reddit = praw.Reddit(
         client_id=os.getenv("CLIENT_ID"),
         client_secret=os.getenv("CLIENT_SECRET"),
-        user_agent=os.getenv("USER_AGENT")
+        user_agent=os.getenv("USER_AGENT"),
+        **reddit_kwargs
     )
     logger.info("✅ Connected to Reddit ===")
-    return reddit
\ No newline at end of file
+    return reddit
@@ -0,0 +1,226 @@
+import signal
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from src.core.config_utils import get_config
+from src.core.comment_index import CommentIndex, fill_known_sentiment, record_sentiment
+from src.core.daemon_state import DaemonState
+from src.core.request_scheduler import call_with_retries
+from src.checkers.check_subreddits import main as check_main
+from src.scrapers.comment_stream import scrape_subreddit_stream
+from src.utils.cleaners import nlp_preprocess
+from src.utils.memory import peak_rss_mb
+from src.analyzers.data_aggregator import publish_live
+from src.analyzers.sentiment_analyzer import (
+    open_analysis_pool,
+    analyze_streaming,
+    analyze_with_cache,
+    resolve_model_identity,
+)
+from src.analyzers.sentiment_cache import SentimentCache
+
+# Re-read a little before the last mark: comments can show up in the stream a few seconds late.
+STREAM_OVERLAP_SECONDS = 120
+
+
+class IngestionDaemon:
+    """
+    Long-running alternative to the weekly batch (python main.py --daemon).
+
+    The Reddit client, the sentiment cache, the comment index and the worker pool with its loaded model stay warm.
+    Every 'poll_minutes' the comment stream of every approved subreddit is read back to where the last cycle
+    stopped; new comments are cleaned, scored and added to running per-country/per-day totals (DaemonState).
+    Comments on all posts are counted: without a post listing there is no post_comment_approve_limit filter.
+    Every 'publish_minutes' the mean over the last 'comment_max_days' days is published as the live snapshot.
+    Nothing grows with uptime: comments are dropped once counted, the totals keep a bounded number of days,
+    and the pool is restarted every 'recycle_pool_hours'.
+    """
+
+    def __init__(self, logger, reddit, scheduler):
+        self.logger = logger
+        self.reddit = reddit
+        self.scheduler = scheduler
+
+        self.poll_seconds = get_config("daemon", "poll_minutes", type=float, fallback=5) * 60
+        self.publish_seconds = get_config("daemon", "publish_minutes", type=float, fallback=15) * 60
+        self.recheck_seconds = get_config("daemon", "recheck_subreddits_hours", type=float, fallback=24) * 3600
+        self.recycle_seconds = get_config("daemon", "recycle_pool_hours", type=float, fallback=24) * 3600
+        self.backfill_seconds = get_config("daemon", "backfill_hours", type=float, fallback=24) * 3600
+        max_comments = get_config("daemon", "max_comments_per_cycle", type=int, fallback=-1)
+        self.max_comments = None if max_comments == -1 else max_comments
+        self.window_days = get_config("global", "comment_max_days", type=int, fallback=7)
+        self.confidence = get_config("sampling", "confidence", type=float, fallback=0.95)
+
+        self.num_cores = get_config("analysis", "cpu_cores", type=int, fallback=4)
+        self.model_name = get_config("analysis", "model_name", fallback="roberta")
+        self.model_backend = get_config("analysis", "model_backend", fallback="pytorch").lower()
+        self.model_sharing = get_config("analysis", "model_sharing", fallback="fork").lower()
+        self.micro_batch_size = get_config("analysis", "micro_batch_size", type=int, fallback=256)
+
+        self.state = DaemonState(get_config("daemon", "state_path", fallback="data/cache/daemon_state.db"))
+        self.comment_index = None
+        if get_config("comment_index", "enabled", type=bool, fallback=True):
+            self.comment_index = CommentIndex(
+                get_config("comment_index", "path", fallback="data/index/comment_index.db"),
+                model_name="@".join(resolve_model_identity(self.model_name)))
+        self.retention_days = get_config("comment_index", "retention_days", type=int, fallback=30)
+        self.sentiment_cache = self.open_sentiment_cache()
+
+        self.pool = None
+        self.pool_started = 0.0
+        self.subreddits = pd.DataFrame()
+        self.subreddits_checked = 0.0
+        self.last_published = 0.0
+        self.last_day = None
+        self.stopping = False
+
+    def open_sentiment_cache(self):
+        if not get_config("sentiment_cache", "enabled", type=bool, fallback=True):
+            return None
+        model_path, model_revision = resolve_model_identity(self.model_name)
+        return SentimentCache(
+            model_path,
+            model_revision,
+            path=get_config("sentiment_cache", "path", fallback="data/cache/sentiment_cache.db"),
+            max_entries=get_config("sentiment_cache", "max_entries", type=int, fallback=2_000_000))
+
+    def stop(self, signum=None, frame=None):
+        self.logger.info("🛑 Stop requested. Finishing the current cycle ===")
+        self.stopping = True
+
+    def ensure_pool(self):
+        if self.pool is not None and time.time() - self.pool_started < self.recycle_seconds:
+            return
+        if self.pool is not None:
+            self.logger.info("♻️ Restarting the worker pool ===")
+            self.pool.close()
+            self.pool.join()
+        self.pool = open_analysis_pool(self.num_cores, self.logger, self.model_name, self.model_backend, self.model_sharing)
+        self.pool_started = time.time()
+
+    def refresh_subreddits(self):
+        if not self.subreddits.empty and time.time() - self.subreddits_checked < self.recheck_seconds:
+            return
+        subreddits_checked = check_main(subreddits=pd.read_csv("assets/subreddits.csv"), reddit=self.reddit,
+                                        logger=self.logger, scheduler=self.scheduler)
+        approved = subreddits_checked[subreddits_checked['approved'] == True]
+        self.subreddits = approved[['subreddit', 'country']].dropna(subset=['subreddit']).drop_duplicates('subreddit')
+        self.subreddits_checked = time.time()
+        self.logger.info(f"✅ Following the comment streams of {len(self.subreddits)} approved subreddits ===")
+
+    def read_streams(self, cycle_start):
+        marks = self.state.stream_marks()
+        comments = []
+        read_until = {}
+        for row in self.subreddits.itertuples():
+            since = marks.get(row.subreddit, cycle_start - self.backfill_seconds) - STREAM_OVERLAP_SECONDS
+            try:
+                sub_comments, read, reached = call_with_retries(
+                    lambda: scrape_subreddit_stream(row.subreddit, row.country, self.logger, self.reddit,
+                                                    datetime.utcfromtimestamp(since), None, None, self.max_comments),
+                    self.logger, f"reading the comment stream of r/{row.subreddit}", self.scheduler)
+            except Exception as e:
+                self.logger.error(f"❌ Failed to read the comment stream of r/{row.subreddit}: {e}")
+                continue
+            if not reached:
+                self.logger.warning(f"⚠️ r/{row.subreddit}'s comment stream ended after {read} comments, before its "
+                                    f"last mark. Comments in between are missing.")
+            comments.extend(sub_comments)
+            read_until[row.subreddit] = cycle_start
+        return comments, read_until
+
+    def score(self, comments_df):
+        processed = nlp_preprocess(comments_df)
+        if processed.empty:
+            return processed
+        if self.comment_index is not None:
+            processed = fill_known_sentiment(processed, self.comment_index)
+        if 'sentiment_label' not in processed.columns:
+            processed['sentiment_label'] = None
+            processed['sentiment_score'] = float('nan')
+
+        pending = processed['sentiment_label'].isna()
+        if pending.any():
+            results_df = analyze_with_cache(
+                processed.loc[pending, 'body'].tolist(),
+                lambda texts: analyze_streaming(texts, self.pool, self.logger, micro_batch_size=self.micro_batch_size),
+                self.sentiment_cache, self.logger)
+            processed.loc[pending, 'sentiment_label'] = results_df['sentiment_label'].to_numpy()
+            processed.loc[pending, 'sentiment_score'] = results_df['sentiment_score'].to_numpy()
+            if self.comment_index is not None:
+                record_sentiment(processed[pending], self.comment_index)
+        return processed
+
+    def run_cycle(self):
+        cycle_start = time.time()
+        comments, read_until = self.read_streams(cycle_start)
+
+        # The comments in the overlap before each mark were counted by the previous cycle (also before a restart).
+        seen = self.state.overlap_ids()
+        new_comments = [comment for comment in comments if comment['comment_id'] not in seen]
+
+        overlap_ids = {subreddit: set() for subreddit in read_until}
+        for comment in comments:
+            if comment['created_utc'] >= read_until[comment['subreddit']] - STREAM_OVERLAP_SECONDS:
+                overlap_ids[comment['subreddit']].add(comment['comment_id'])
+
+        scored = self.score(pd.DataFrame(new_comments)) if new_comments else pd.DataFrame()
+        counted = self.state.add(scored, read_until, overlap_ids)
+
+        rss = peak_rss_mb()
+        self.logger.info(f"⏳ Cycle: {len(comments)} comments read, {len(new_comments)} new, {counted} counted in "
+                         f"{time.time() - cycle_start:.0f}s. {self.scheduler.total_requests} API requests so far"
+                         + (f", peak RSS {rss:.0f} MB." if rss is not None else "."))
+
+    def publish(self):
+        today_str = datetime.utcnow().strftime("%Y-%m-%d")
+        snapshot = self.state.snapshot(today_str, self.window_days, self.confidence)
+        if snapshot.empty:
+            self.logger.warning("⚠️ No comments counted in the window yet. Nothing to publish.")
+            return
+        publish_live(snapshot, self.logger, today_str)
+        self.last_published = time.time()
+
+    def housekeeping(self):
+        # Once a day: drop totals that left the window (a few extra days are kept) and old index entries.
+        today_str = datetime.utcnow().strftime("%Y-%m-%d")
+        if today_str == self.last_day:
+            return
+        self.last_day = today_str
+        pruned = self.state.prune(self.window_days * 2)
+        if self.comment_index is not None:
+            pruned += self.comment_index.prune(self.retention_days)
+        self.logger.info(f"🧹 Daily housekeeping: {pruned} old entries pruned.")
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.logger.info(f"🚀 Daemon started: polling every {self.poll_seconds / 60:.0f} min, "
+                         f"publishing every {self.publish_seconds / 60:.0f} min ===")
+        try:
+            while not self.stopping:
+                next_cycle = time.time() + self.poll_seconds
+                try:
+                    self.housekeeping()
+                    self.refresh_subreddits()
+                    self.ensure_pool()
+                    self.run_cycle()
+                    if time.time() - self.last_published >= self.publish_seconds:
+                        self.publish()
+                except Exception as e:
+                    # One failed cycle (network, disk) must not end the service; the marks were not moved.
+                    self.logger.error(f"❌ Cycle failed: {e}")
+                while not self.stopping and time.time() < next_cycle:
+                    time.sleep(1)
+            self.publish()
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+            self.logger.info("✅ Daemon stopped ===")
+
+
+def run_daemon(logger, reddit, scheduler):
+    IngestionDaemon(logger, reddit, scheduler).run()
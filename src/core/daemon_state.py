@@ -0,0 +1,101 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+import pandas as pd
+from src.analyzers.data_aggregator import HAPPINESS_VALUES, confidence_interval
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+
+class DaemonState:
+    """
+    What the ingestion daemon keeps between cycles and restarts:
+      - per subreddit, the time its comment stream was last read up to (the high-water mark);
+      - per subreddit, the ids of the comments just before the mark, which the next cycle reads again;
+      - per country and day, the running count, sum and sum of squares of happiness values (-1/0/1).
+    The live snapshot is the mean over the last days, so memory and disk stay bounded by days x countries
+    no matter how long the daemon runs.
+    """
+
+    def __init__(self, path="data/cache/daemon_state.db"):
+        db_path = Path(path)
+        if not db_path.is_absolute():
+            db_path = PROJECT_ROOT / db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = db_path
+        self._conn = sqlite3.connect(str(db_path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stream_marks (subreddit TEXT PRIMARY KEY, read_until REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS overlap_comments (subreddit TEXT NOT NULL, comment_id TEXT NOT NULL, "
+            "PRIMARY KEY (subreddit, comment_id))")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS daily_happiness ("
+            "country TEXT NOT NULL, day TEXT NOT NULL, total REAL NOT NULL, count INTEGER NOT NULL, squares REAL, "
+            "PRIMARY KEY (country, day))")
+        # State files from before the confidence intervals: their days keep squares = NULL (no interval).
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(daily_happiness)").fetchall()]
+        if "squares" not in columns:
+            self._conn.execute("ALTER TABLE daily_happiness ADD COLUMN squares REAL")
+        self._conn.commit()
+
+    def stream_marks(self):
+        return dict(self._conn.execute("SELECT subreddit, read_until FROM stream_marks").fetchall())
+
+    def overlap_ids(self):
+        return {row[0] for row in self._conn.execute("SELECT comment_id FROM overlap_comments")}
+
+    def add(self, scored, marks, overlap_ids=None):
+        """
+        Adds the labelled comments of one cycle ('scored': country, created_utc in epoch seconds, sentiment_label)
+        and moves the stream marks ({subreddit: epoch seconds}) in the same transaction,
+        so a crash never counts a comment twice or skips it. 'overlap_ids' ({subreddit: comment ids}) replaces
+        the remembered ids of the comments the next cycle reads again before each moved mark.
+        """
+        daily = pd.DataFrame(columns=['country', 'day', 'sum', 'count', 'squares'])
+        if not scored.empty:
+            # Unlabelled and failed ('ERROR') comments are not counted.
+            values = scored['sentiment_label'].map(HAPPINESS_VALUES).astype(float)
+            days = pd.to_datetime(scored['created_utc'], unit='s').dt.strftime("%Y-%m-%d")
+            counted = scored.assign(happiness_value=values, squared_value=values ** 2, day=days)[values.notna()]
+            grouped = counted.groupby(['country', 'day'], observed=True)
+            daily = grouped['happiness_value'].agg(['sum', 'count']).join(grouped['squared_value'].sum()).reset_index()
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO daily_happiness (country, day, total, count, squares) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (country, day) DO UPDATE SET total = total + excluded.total, count = count + excluded.count, "
+                "squares = squares + excluded.squares",
+                [(country, day, float(total), int(count), float(squares))
+                 for country, day, total, count, squares in daily.itertuples(index=False)])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO stream_marks (subreddit, read_until) VALUES (?, ?)", list(marks.items()))
+            for subreddit, comment_ids in (overlap_ids or {}).items():
+                self._conn.execute("DELETE FROM overlap_comments WHERE subreddit = ?", (subreddit,))
+                self._conn.executemany("INSERT OR IGNORE INTO overlap_comments (subreddit, comment_id) VALUES (?, ?)",
+                                       [(subreddit, comment_id) for comment_id in comment_ids])
+        return int(daily['count'].sum())
+
+    def snapshot(self, date_str, days, confidence=0.95):
+        """Per-country mean happiness over the 'days' days up to 'date_str', in the Step 6 layout."""
+        first_day = (datetime.strptime(date_str, "%Y-%m-%d") - timedelta(days - 1)).strftime("%Y-%m-%d")
+        # The interval is left empty while a day without squares (older state file) is in the window.
+        rows = self._conn.execute(
+            "SELECT country, SUM(total) / SUM(count), SUM(count), SUM(total), "
+            "CASE WHEN COUNT(squares) = COUNT(*) THEN SUM(squares) END "
+            "FROM daily_happiness WHERE day BETWEEN ? AND ? "
+            "GROUP BY country HAVING SUM(count) > 0 ORDER BY country", (first_day, date_str)).fetchall()
+        snapshot = pd.DataFrame(rows, columns=['country', 'happiness_value', 'sample_size', 'total', 'squares'])
+        snapshot['ci_low'], snapshot['ci_high'] = confidence_interval(
+            snapshot['sample_size'], snapshot['total'], snapshot['squares'].astype(float), confidence)
+        snapshot = snapshot.drop(columns=['total', 'squares'])
+        snapshot['Date'] = date_str
+        return snapshot
+
+    def prune(self, keep_days):
+        oldest_day = time.strftime("%Y-%m-%d", time.gmtime(time.time() - keep_days * 86400))
+        with self._conn:
+            return self._conn.execute("DELETE FROM daily_happiness WHERE day < ?", (oldest_day,)).rowcount
@@ -0,0 +1,288 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.analyzers.sentiment_analyzer import process_micro_batch, log_escalation
+from src.core.comment_index import fill_known_sentiment, record_sentiment
+from src.utils.cleaners import nlp_preprocess
+from src.utils.frame_schema import compact
+from src.utils.segments import SegmentWriter
+
+_END_OF_STREAM = object()
+
+# Texts scored recently, kept to deduplicate repeats without a cache lookup. Older repeats go through the sentiment cache.
+RECENT_TEXTS = 20000
+
+# How often a wait on the worker pool wakes up to look for micro-batches that will never finish.
+POLL_SECONDS = 10
+
+
+class PipelinedRun:
+    """
+    Runs Steps 3-5 as overlapping stages instead of strict barriers:
+
+        scraper thread --(bounded queue of per-post comment batches)--> preprocessing (main thread)
+                       --(at most 'max_in_flight' micro-batches)--> sentiment worker pool
+
+    The scraper blocks when the queue is full and preprocessing blocks when too many micro-batches are in flight.
+    Raw comments and labelled cleaned comments are spilled to on-disk segments as they finish (SegmentWriter),
+    so only the comments still waiting for their labels are held in memory, while the network-bound and CPU-bound stages run
+    at the same time. Labels are written straight into the part of cleaned comments they belong to.
+    Texts are deduplicated against the recently scored ones and looked up in the sentiment cache before they reach
+    a worker.
+    """
+
+    def __init__(self, pool, num_workers, logger, micro_batch_size=256, queue_size=32, max_in_flight=None,
+                 comment_index=None, sentiment_cache=None, progress_seconds=30, batch_timeout=1800):
+        self.pool = pool
+        self.logger = logger
+        self.micro_batch_size = micro_batch_size
+        self.comment_index = comment_index
+        self.sentiment_cache = sentiment_cache
+        self.progress_seconds = progress_seconds
+
+        self.raw_queue = queue.Queue(maxsize=queue_size)
+        self.max_in_flight = max_in_flight or num_workers * 2
+        self.in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self.producer_error = None
+
+        # A worker killed by the OS (OOM, segfault) never calls back: its micro-batch is failed after this long.
+        self.batch_timeout = batch_timeout
+
+        # Shared with the pool's result thread, guarded by 'lock'.
+        self.lock = threading.Lock()
+        self.parts = {}         # part id -> part of cleaned comments waiting for labels (see _schedule)
+        self.finished = []      # ids of parts whose every row is labelled
+        self.recent = OrderedDict()  # text -> (label, score), the last RECENT_TEXTS texts finished in this run
+        self.pending_rows = {}  # text -> (part id, row) waiting for this text (buffered or in flight)
+        self.fresh = {}         # model results not yet written to the sentiment cache
+        self.in_flight_batches = {}  # batch id -> (texts, AsyncResult, submit time)
+
+        self.buffer = []
+        self.next_part = 0
+        self.next_batch = 0
+        self.rows_total = 0
+        self.rows_scored = 0
+        self.posts_done = 0
+        self.texts_sent = 0
+        self.texts_escalated = 0
+
+    def _produce(self, comment_batches):
+        try:
+            for post_comments in comment_batches:
+                self.raw_queue.put(post_comments)
+        except Exception as e:
+            self.producer_error = e
+        finally:
+            self.raw_queue.put(_END_OF_STREAM)
+
+    def _label(self, part_id, row, value):
+        # Called with 'lock' held.
+        part = self.parts[part_id]
+        part["labels"][row], part["scores"][row] = value
+        part["missing"] -= 1
+        self.rows_scored += 1
+        if part["missing"] == 0:
+            self.finished.append(part_id)
+
+    def _remember(self, text, value):
+        # Called with 'lock' held.
+        self.recent[text] = value
+        self.recent.move_to_end(text)
+        if len(self.recent) > RECENT_TEXTS:
+            self.recent.popitem(last=False)
+
+    def _on_result(self, batch_id, result):
+        positions, labels, scores, escalated = result
+        with self.lock:
+            batch = self.in_flight_batches.pop(batch_id, None)
+            if batch is None:
+                # Already failed by the timeout check.
+                return
+            text_list = batch[0]
+            self.texts_escalated += escalated
+            for position, label, score in zip(positions, labels, scores):
+                text = text_list[position]
+                value = (label, float(score))
+                if label != 'ERROR':
+                    self._remember(text, value)
+                    self.fresh[text] = value
+                for part_id, row in self.pending_rows.pop(text, []):
+                    self._label(part_id, row, value)
+        self.in_flight.release()
+
+    def _on_error(self, batch_id, text_count, error):
+        self.logger.error(f"❌ Micro-batch of {text_count} texts failed: {error}")
+        self._on_result(batch_id, (range(text_count), ['ERROR'] * text_count, [0.0] * text_count, 0))
+
+    def _fail_stuck_batches(self):
+        # A micro-batch whose worker died is never answered; fail it so its semaphore slot is freed.
+        now = time.time()
+        with self.lock:
+            stuck = [(batch_id, len(text_list)) for batch_id, (text_list, result, submitted) in self.in_flight_batches.items()
+                     if not result.ready() and now - submitted > self.batch_timeout]
+        for batch_id, text_count in stuck:
+            self._on_error(batch_id, text_count, TimeoutError(f"no result after {self.batch_timeout:.0f}s, "
+                                                             f"the worker probably died"))
+
+    def _acquire_slot(self):
+        while not self.in_flight.acquire(timeout=POLL_SECONDS):
+            self._fail_stuck_batches()
+
+    def _submit(self):
+        text_list, self.buffer = self.buffer, []
+        if not text_list:
+            return
+        # Blocks while 'max_in_flight' micro-batches are being analysed: this is the backpressure on preprocessing.
+        self._acquire_slot()
+        self.texts_sent += len(text_list)
+        batch_id = self.next_batch
+        self.next_batch += 1
+        with self.lock:
+            result = self.pool.apply_async(
+                process_micro_batch, ((np.arange(len(text_list)), text_list),),
+                callback=lambda result: self._on_result(batch_id, result),
+                error_callback=lambda error: self._on_error(batch_id, len(text_list), error))
+            self.in_flight_batches[batch_id] = (text_list, result, time.time())
+
+    def _flush_cache(self):
+        if self.sentiment_cache is None:
+            return
+        with self.lock:
+            fresh, self.fresh = self.fresh, {}
+        if fresh:
+            self.sentiment_cache.put_many(fresh)
+
+    def _schedule(self, processed):
+        part_id = self.next_part
+        self.next_part += 1
+        self.rows_total += len(processed)
+
+        labels = np.full(len(processed), None, dtype=object)
+        scores = np.full(len(processed), np.nan)
+        from_index = np.zeros(len(processed), dtype=bool)
+        if 'sentiment_label' in processed.columns:
+            from_index = processed['sentiment_label'].notna().to_numpy()
+            labels[from_index] = processed['sentiment_label'].to_numpy(dtype=object)[from_index]
+            scores[from_index] = processed['sentiment_score'].to_numpy(dtype=float)[from_index]
+        bodies = processed['body'].tolist()
+
+        with self.lock:
+            new_texts = [text for text in dict.fromkeys(bodies) if text not in self.recent and text not in self.pending_rows]
+        cached = self.sentiment_cache.get_many(new_texts) if self.sentiment_cache is not None and new_texts else {}
+
+        with self.lock:
+            for text, value in cached.items():
+                self._remember(text, value)
+            self.parts[part_id] = {"frame": processed, "labels": labels, "scores": scores, "from_index": from_index,
+                                   "missing": int((~from_index).sum())}
+            self.rows_scored += int(from_index.sum())
+            if not self.parts[part_id]["missing"]:
+                self.finished.append(part_id)
+            for row, text in enumerate(bodies):
+                if from_index[row]:
+                    continue
+                if text in self.recent:
+                    self._label(part_id, row, self.recent[text])
+                elif text in self.pending_rows:
+                    self.pending_rows[text].append((part_id, row))
+                else:
+                    self.pending_rows[text] = [(part_id, row)]
+                    self.buffer.append(text)
+
+        while len(self.buffer) >= self.micro_batch_size:
+            overflow = self.buffer[self.micro_batch_size:]
+            self.buffer = self.buffer[:self.micro_batch_size]
+            self._submit()
+            self.buffer = overflow
+
+    def _take_finished(self):
+        """Removes the fully labelled parts. Returns [(cleaned comments with their labels, mask of rows from the index)]."""
+        with self.lock:
+            finished, self.finished = self.finished, []
+            parts = [self.parts.pop(part_id) for part_id in finished]
+        frames = []
+        for part in parts:
+            labels = part["labels"]
+            # Failed micro-batches are left unlabelled, so Step 5 retries them.
+            failed = labels == 'ERROR'
+            labels[failed] = None
+            part["scores"][failed] = np.nan
+            frames.append((part["frame"].assign(sentiment_label=labels, sentiment_score=part["scores"]), part["from_index"]))
+        return frames
+
+    def run(self, comment_batches):
+        """
+        Returns (raw comments, preprocessed comments with sentiment_label/sentiment_score), both as lazy
+        SegmentedTables: save them with save_segments and discard() them when done.
+        """
+        producer = threading.Thread(target=self._produce, args=(comment_batches,), name="comment-scraper", daemon=True)
+        producer.start()
+
+        raw_writer = SegmentWriter("comments")
+        processed_writer = SegmentWriter("processed_comments")
+        stored_count = 0
+        start_time = time.time()
+        last_report = start_time
+
+        def write_finished():
+            nonlocal stored_count
+            for processed, from_index in self._take_finished():
+                processed_writer.extend(processed.to_dict("records"))
+                if self.comment_index is not None:
+                    stored_count += record_sentiment(processed[~from_index], self.comment_index)
+
+        while True:
+            post_comments = self.raw_queue.get()
+            if post_comments is _END_OF_STREAM:
+                break
+            self.posts_done += 1
+            if not post_comments:
+                continue
+
+            raw_writer.extend(post_comments)
+            processed = nlp_preprocess(compact(pd.DataFrame(post_comments)))
+            if processed.empty:
+                continue
+            if self.comment_index is not None:
+                processed = fill_known_sentiment(processed, self.comment_index)
+            self._schedule(processed.reset_index(drop=True))
+            write_finished()
+
+            now = time.time()
+            if now - last_report >= self.progress_seconds:
+                self._flush_cache()
+                with self.lock:
+                    analysed = self.rows_scored
+                self.logger.info(
+                    f"⏳ Pipeline: {self.posts_done} posts, {self.rows_total} comments preprocessed, {analysed} scored, "
+                    f"{self.texts_sent} texts sent to workers, queue {self.raw_queue.qsize()}, "
+                    f"{now - start_time:.0f}s elapsed.")
+                last_report = now
+
+        producer.join()
+        if self.producer_error is not None:
+            self.logger.error(f"❌ Comment scraping stopped early: {self.producer_error}")
+
+        self._submit()
+        # Wait for every micro-batch still in flight (a dead worker's micro-batch fails after 'batch_timeout').
+        for _ in range(self.max_in_flight):
+            self._acquire_slot()
+        for _ in range(self.max_in_flight):
+            self.in_flight.release()
+        self._flush_cache()
+        write_finished()
+
+        if self.comment_index is not None:
+            self.logger.info(f"🗂️ Stored {stored_count} new comment scores in the comment index.")
+        elapsed = time.time() - start_time
+        self.logger.info(
+            f"📊 Pipelined Steps 3-5: {self.posts_done} posts, {self.rows_total} comments, "
+            f"{self.texts_sent} unique texts sent to the model in {elapsed / 60:.1f} minutes.")
+        if self.texts_escalated:
+            log_escalation(self.logger, self.texts_escalated, self.texts_sent)
+        return raw_writer.close(), processed_writer.close()
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from prawcore import Requestor
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every Reddit client of a run.
+    Refills continuously at 'requests_per_minute' and allows bursts of up to 'burst' requests.
+    """
+
+    def __init__(self, requests_per_minute, burst=None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst) if burst else max(1.0, requests_per_minute / 10.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.total_requests = 0
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.total_requests += 1
+                    self.throttled_seconds += waited
+                    return waited
+                wait_seconds = (1 - self.tokens) / self.rate
+
+            time.sleep(wait_seconds)
+            waited += wait_seconds
+
+    def observe(self, response):
+        # The plain bucket paces from its own clock only; see RequestScheduler for header-aware pacing.
+        pass
+
+
+class RateLimitedRequestor(Requestor):
+    """
+    prawcore Requestor that takes a token from the shared bucket before every HTTP request
+    and reports every response back to it, so all clients built with it stay inside one budget.
+    """
+
+    def __init__(self, *args, rate_limiter=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+
+    def request(self, *args, **kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        response = super().request(*args, **kwargs)
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe(response)
+        return response
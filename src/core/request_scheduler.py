@@ -0,0 +1,145 @@
+import random
+import threading
+import time
+
+from prawcore.exceptions import TooManyRequests, ServerError
+
+from src.core.rate_limiter import TokenBucket
+
+# x-ratelimit-reset is sent in whole seconds, so the reset time of one window wobbles by up to a second.
+WINDOW_RESET_SLACK_SECONDS = 1.5
+
+
+class RequestScheduler(TokenBucket):
+    """
+    Rate-limit aware scheduler shared by the checker, the post scraper and the comment scraper.
+
+    Every response passes through 'observe', which reads Reddit's x-ratelimit-remaining/-reset headers.
+    While those headers are fresh, requests are spread evenly over what is left of the reset window,
+    so the run uses the whole quota without ever emptying it. Without header data (first request,
+    stale window) it falls back to the plain token bucket.
+    """
+
+    def __init__(self, requests_per_minute, burst=None, reserve=2, max_retries=3, backoff_seconds=2.0):
+        super().__init__(requests_per_minute, burst)
+        self.reserve = reserve
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.remaining = None
+        self.header_remaining = None
+        self.reset_at = None
+        self.next_slot = 0.0
+        self.blocked_until = 0.0
+        self.rate_limit_hits = 0
+        self.retries = 0
+        self._header_lock = threading.Lock()
+
+    def observe(self, response):
+        headers = getattr(response, "headers", None) or {}
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        now = time.monotonic()
+
+        with self._header_lock:
+            if remaining is not None and reset is not None:
+                header_remaining = float(remaining)
+                header_reset_at = now + float(reset)
+                # Within one window the reset time stays put and 'remaining' only counts down (responses of
+                # concurrent requests can arrive slightly out of order). A later reset or a jump in 'remaining'
+                # means Reddit started a new window: take its numbers as they are.
+                new_window = (self.remaining is None or self.reset_at is None
+                              or header_reset_at > self.reset_at + WINDOW_RESET_SLACK_SECONDS
+                              or header_remaining > self.header_remaining + self.capacity)
+                if new_window:
+                    self.remaining = header_remaining
+                    self.next_slot = 0.0
+                else:
+                    # The local estimate also counts requests still in flight, so keep the lower value.
+                    self.remaining = min(self.remaining, header_remaining)
+                self.reset_at = header_reset_at
+                self.header_remaining = header_remaining
+
+            if getattr(response, "status_code", None) == 429:
+                self.rate_limit_hits += 1
+                self.blocked_until = max(self.blocked_until, now + self.seconds_until_reset(now))
+
+    def seconds_until_reset(self, now=None):
+        now = time.monotonic() if now is None else now
+        if self.reset_at is None or self.reset_at <= now:
+            return self.backoff_seconds
+        return self.reset_at - now
+
+    def acquire(self):
+        waited = 0.0
+        while True:
+            granted = False
+            with self._header_lock:
+                now = time.monotonic()
+                wait_seconds = None
+
+                if now < self.blocked_until:
+                    wait_seconds = self.blocked_until - now
+                elif self.reset_at is not None and now >= self.reset_at:
+                    # A new window has started; forget the old numbers until the next response.
+                    self.remaining = None
+                    self.reset_at = None
+                    self.next_slot = 0.0
+
+                if wait_seconds is None and self.remaining is not None:
+                    usable = self.remaining - self.reserve
+                    if usable < 1:
+                        wait_seconds = self.reset_at - now
+                    else:
+                        # Book the next free slot; slots are spaced so the usable quota lasts the whole window.
+                        slot = max(now, self.next_slot)
+                        self.next_slot = slot + (self.reset_at - now) / usable
+                        self.remaining -= 1
+                        self.total_requests += 1
+                        wait_seconds = slot - now
+                        self.throttled_seconds += waited + wait_seconds
+                        granted = True
+
+            if wait_seconds is None:
+                # Waits for a 429 block or an empty window count as throttling too.
+                with self._header_lock:
+                    self.throttled_seconds += waited
+                return waited + super().acquire()
+
+            if wait_seconds > 0:
+                time.sleep(wait_seconds)
+            waited += wait_seconds
+
+            if granted:
+                return waited
+
+    def backoff_delay(self, attempt):
+        exponential = self.backoff_seconds * (2 ** attempt)
+        return max(self.seconds_until_reset(), exponential) + random.uniform(0, self.backoff_seconds)
+
+
+def call_with_retries(fn, logger, description, scheduler=None, max_retries=None):
+    """
+    Calls 'fn' and retries it on 429/5xx errors with exponential backoff.
+    The wait is never shorter than the time left until Reddit resets the rate-limit window.
+    """
+    if max_retries is None:
+        max_retries = scheduler.max_retries if scheduler is not None else 3
+
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except (TooManyRequests, ServerError) as e:
+            if attempt >= max_retries:
+                logger.error(f"❌ Giving up on {description} after {attempt + 1} attempts: {e}")
+                raise
+
+            if scheduler is not None:
+                delay = scheduler.backoff_delay(attempt)
+                scheduler.retries += 1
+            else:
+                delay = 2.0 * (2 ** attempt)
+
+            logger.warning(f"⚠️ {e.__class__.__name__} while {description}. Retrying in {delay:.1f}s (attempt {attempt + 2}/{max_retries + 1})...")
+            time.sleep(delay)
+            attempt += 1
@@ -129,41 +129,63 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-@st.cache_data
+DASHBOARD_COLUMNS = ['country', 'happiness_value']
+
+
+def list_snapshots(folder):
+    # Snapshots are either '<date>.csv' files or 'date=<date>/' Parquet partitions written by main.py.
+    snapshots = [entry for entry in folder.glob("*.csv")]
+    snapshots += [entry for entry in folder.glob("date=*") if entry.is_dir() and ".tmp-" not in entry.name]
+    return sorted(snapshots, key=snapshot_date)
+
+
+def snapshot_date(path):
+    return path.name[len("date="):] if path.is_dir() else path.stem
+
+
+def read_snapshot(path):
+    # Only the columns the charts use are read.
+    if path.is_dir():
+        return pd.read_parquet(path, columns=DASHBOARD_COLUMNS)
+    return pd.read_csv(path, usecols=DASHBOARD_COLUMNS)
+
+
+# Refreshed every few minutes, so snapshots published by the daemon mode show up without a restart.
+@st.cache_data(ttl=300)
 def load_data():
-    live_files = list(LIVE_DIR.glob("*.csv"))
+    live_files = list_snapshots(LIVE_DIR)
     if not live_files:
         return None, None, None
 
-    live_file_to_load = live_files[0]
+    live_file_to_load = live_files[-1]
 
     try:
-        df_live = pd.read_csv(live_file_to_load)
+        df_live = read_snapshot(live_file_to_load)
     except (FileNotFoundError, pd.errors.EmptyDataError):
         return None, None, None
 
-    ts_files = list(TIMESERIES_DIR.glob("*.csv"))
+    ts_files = list_snapshots(TIMESERIES_DIR)
     all_timeseries_data = []
 
     if not ts_files:
         df_timeseries = df_live.copy()
         if not df_timeseries.empty:
             try:
-                df_timeseries['Date'] = pd.to_datetime(live_file_to_load.stem)
+                df_timeseries['Date'] = pd.to_datetime(snapshot_date(live_file_to_load))
             except Exception:
                 df_timeseries['Date'] = pd.NaT
     else:
         for file_path in ts_files:
             try:
-                df = pd.read_csv(file_path)
-                df['Date'] = pd.to_datetime(file_path.stem)
+                df = read_snapshot(file_path)
+                df['Date'] = pd.to_datetime(snapshot_date(file_path))
                 all_timeseries_data.append(df)
             except Exception:
                 continue
 
         df_live_with_date = df_live.copy()
         try:
-            df_live_with_date['Date'] = pd.to_datetime(live_file_to_load.stem)
+            df_live_with_date['Date'] = pd.to_datetime(snapshot_date(live_file_to_load))
             all_timeseries_data.append(df_live_with_date)
         except Exception:
             pass
@@ -191,7 +213,7 @@ with col2:
         st.metric(
             label="Countries Tracked",
             value=len(df_live),
-            delta=f"Updated {df_live_path.name[:10]}" if df_live_path else "Today"
+            delta=f"Updated {snapshot_date(df_live_path)}" if df_live_path else "Today"
         )
 
 if df_live is None or df_live.empty:
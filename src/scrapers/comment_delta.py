@@ -0,0 +1,177 @@
+from src.core.request_scheduler import call_with_retries
+from src.scrapers.comment_scraper import scrape_a_comment
+from src.utils.storage import load_table
+from src.utils.frame_schema import to_epoch
+
+COMMENTS_LOCATION = "data/raw/weekly_scrapings/comments/"
+
+# Comment listings hold 100 comments per page (one request).
+COMMENT_PAGE_SIZE = 100
+
+
+def stream_new_comments(reddit, subreddit_name, wanted, since, max_pages):
+    """
+    Reads r/<subreddit_name>'s comment stream (newest first) back to the epoch time 'since'.
+    'wanted' maps link_id -> (mark time, new comments needed). At every page boundary the read stops early
+    once no wanted post can still be covered: its mark was passed, or the pages left cannot hold enough of its comments.
+    Returns ({link_id: [comments]} for the posts in 'wanted', whether 'since' was reached, comments read).
+    """
+    found = {}
+    counted = dict.fromkeys(wanted, 0)
+    budget = max_pages * COMMENT_PAGE_SIZE
+    read = 0
+    for comment in reddit.subreddit(subreddit_name).comments(limit=budget):
+        read += 1
+        if comment.created_utc < since:
+            return found, True, read
+        if comment.link_id in wanted:
+            found.setdefault(comment.link_id, []).append(comment)
+            if comment.created_utc >= wanted[comment.link_id][0]:
+                counted[comment.link_id] += 1
+        if read % COMMENT_PAGE_SIZE == 0:
+            left = budget - read
+            if not any(comment.created_utc >= marked_at and counted[link_id] + left >= needed
+                       for link_id, (marked_at, needed) in wanted.items()):
+                return found, False, read
+    # A stream that ended before the page budget holds every comment Reddit still lists.
+    return found, read < budget, read
+
+
+def comments_since(subreddit_posts, marks, since):
+    """
+    Lower bound of the comments a subreddit received after the epoch time 'since', from the listed posts:
+    all comments of the posts created after it, plus the growth of the marked posts since their marks.
+    The comment stream has to page through at least that many comments to reach 'since'.
+    """
+    total = int(subreddit_posts.loc[subreddit_posts['created_utc'] >= since, 'num_comments'].sum())
+    for post_id, num_comments in zip(subreddit_posts['post_id'], subreddit_posts['num_comments']):
+        mark = marks.get(post_id)
+        if mark is not None and mark[1] >= since:
+            total += max(num_comments - mark[0], 0)
+    return total
+
+
+def pages_read(read):
+    return max(1, -(-read // COMMENT_PAGE_SIZE))
+
+
+def load_previous_comments(marks, post_ids):
+    """Loads the comments saved for 'post_ids' by the runs in their marks. Returns {post_id: [comment rows]}."""
+    previous = {}
+    by_date = {}
+    for post_id in post_ids:
+        by_date.setdefault(marks[post_id][2], set()).add(post_id)
+
+    for scraped_on, date_post_ids in by_date.items():
+        comments = load_table(COMMENTS_LOCATION, scraped_on)
+        if comments.empty or 'post_id' not in comments.columns:
+            continue
+        comments = comments[comments['post_id'].isin(date_post_ids)]
+        # Runs before the compact schema saved 'created_utc' as a 'YYYY-MM-DD' string.
+        comments = comments.assign(created_utc=to_epoch(comments['created_utc']))
+        for post_id, post_comments in comments.groupby('post_id', sort=False):
+            previous[post_id] = post_comments.to_dict("records")
+    return previous
+
+
+def plan_delta_fetch(posts_scraped, logger, reddit, comment_index, scheduler=None, max_pages=10):
+    """
+    Finds the approved posts whose comments do not need a full comment-tree fetch, using the high-water marks
+    (comment count, scrape time) stored in the comment index by earlier runs:
+      - unchanged comment count: the comments saved by that run are reused as they are;
+      - grown: the subreddit's comment stream is read back to the last scrape, once per subreddit,
+        and the new comments are added, if it holds at least as many new comments as the count grew.
+        Subreddits that received more comments since then than 'max_pages' pages hold are not read at all.
+    Returns {post_id: comment rows} for those posts; every other post is fetched in full as before.
+    Edits to comments that were already saved are only picked up by a full fetch.
+    """
+    approved_posts = posts_scraped[(posts_scraped['approved'] == True) & posts_scraped['post_id'].notna()]
+    marks = comment_index.post_marks(approved_posts['post_id'])
+    if not marks:
+        return {}
+
+    approved_posts = approved_posts[approved_posts['post_id'].isin(list(marks))]
+    previous = load_previous_comments(marks, approved_posts['post_id'])
+
+    reused = {}
+    grown = []
+    for row in approved_posts.itertuples():
+        if row.post_id not in previous:
+            continue
+        marked_count = marks[row.post_id][0]
+        if row.num_comments == marked_count:
+            reused[row.post_id] = previous[row.post_id]
+        elif row.num_comments > marked_count:
+            grown.append(row)
+    unchanged = len(reused)
+
+    requests = 0
+    wasted = 0
+    skipped = 0
+    budget = max_pages * COMMENT_PAGE_SIZE
+    grown_by_subreddit = {}
+    for row in grown:
+        grown_by_subreddit.setdefault(row.subreddit, []).append(row)
+
+    for subreddit_name, rows in grown_by_subreddit.items():
+        since = min(marks[row.post_id][1] for row in rows)
+        expected = comments_since(posts_scraped[posts_scraped['subreddit'] == subreddit_name], marks, since)
+        if expected > budget:
+            skipped += 1
+            logger.info(f"ℹ️ r/{subreddit_name} received at least {expected} comments since the last scrape, more than "
+                        f"{max_pages} stream pages hold. Fetching its {len(rows)} grown posts in full.")
+            continue
+
+        wanted = {f"t3_{row.post_id}": (marks[row.post_id][1], row.num_comments - marks[row.post_id][0]) for row in rows}
+        try:
+            found, reached, read = call_with_retries(
+                lambda: stream_new_comments(reddit, subreddit_name, wanted, since, max_pages),
+                logger, f"reading the comment stream of r/{subreddit_name}", scheduler)
+        except Exception as e:
+            logger.error(f"❌ Failed to read the comment stream of r/{subreddit_name}: {e}. Fetching its posts in full.")
+            continue
+        pages = pages_read(read)
+        requests += pages
+
+        updated = 0
+        for row in rows:
+            marked_count, scraped_at, _ = marks[row.post_id]
+            post_comments = list(previous[row.post_id])
+            seen = {comment['comment_id'] for comment in post_comments}
+            new_comments = [comment for comment in found.get(f"t3_{row.post_id}", [])
+                            if comment.created_utc >= scraped_at and comment.id not in seen]
+            if len(new_comments) < row.num_comments - marked_count:
+                continue
+            for comment in new_comments:
+                comment_dict = scrape_a_comment(row.post_id, row.subreddit, row.country, logger, comment)
+                if comment_dict:
+                    post_comments.append(comment_dict)
+            reused[row.post_id] = post_comments
+            updated += 1
+
+        if not updated:
+            wasted += pages
+        if not reached:
+            logger.info(f"ℹ️ The comment stream of r/{subreddit_name} did not reach back to the last scrape "
+                        f"({pages} of {max_pages} pages read): {updated} of {len(rows)} grown posts covered"
+                        + (f", {pages} requests wasted." if not updated else "."))
+
+    logger.info(f"♻️ Delta fetch: {unchanged} posts unchanged since their last scrape, {len(reused) - unchanged} of "
+                f"{len(grown)} grown posts updated from the comment streams of {len(grown_by_subreddit) - skipped} "
+                f"subreddits ({requests} requests, {wasted} wasted; {skipped} subreddits skipped as too busy), "
+                f"{len(approved_posts) - len(reused)} of {len(approved_posts)} known posts need a full fetch.")
+    return reused
+
+
+def record_post_marks(comments_scraped, posts_scraped, comment_index, run_date, scraped_at):
+    """
+    Stores the high-water mark of every post with comments in this run: its comment count, the run start
+    (epoch seconds) and the run date its comments are saved under. Called after the comments are saved.
+    """
+    if comments_scraped.empty or posts_scraped.empty:
+        return 0
+    scraped_ids = set(comments_scraped['post_id'])
+    posts = posts_scraped[posts_scraped['post_id'].isin(scraped_ids)].drop_duplicates('post_id')
+    comment_index.store_post_marks(
+        (post_id, num_comments, scraped_at, run_date) for post_id, num_comments in zip(posts['post_id'], posts['num_comments']))
+    return len(posts)
@@ -2,34 +2,139 @@ from datetime import datetime
 import pandas as pd
 from src.core.logger import setup_logger
 from src.core.connect_reddit import connect_reddit
-from src.utils.save_csv import save_csv
+from src.utils.storage import save_segments, table_exists, load_table
+from src.utils.segments import SegmentWriter
 from pathlib import Path
 from src.utils.cleaners import clean_text
-from prawcore.exceptions import TooManyRequests
+from src.core.request_scheduler import call_with_retries
+from src.core.comment_index import body_hash
+from prawcore.exceptions import TooManyRequests, ServerError
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import threading
 import time
 
+# reddit.info() accepts up to 100 fullnames per request.
+INFO_BATCH_SIZE = 100
 
-def scrape_a_comment(post_id, subreddit, country, logger, comment):
+
+def scrape_a_comment(post_id, subreddit, country, logger, comment, known=None):
     try:
         author_name = comment.author.name if comment.author else "deleted_user"
-        return {
+        body = clean_text(comment.body)
+        comment_dict = {
             "post_id": post_id,
             "comment_id": comment.id,
             "author": author_name,
             "subreddit": subreddit,
             "country": country,
-            "body": clean_text(comment.body),
+            "body": body,
+            "body_hash": body_hash(body),
             "score": comment.score,
-            "created_utc": datetime.utcfromtimestamp(comment.created_utc).strftime("%Y-%m-%d")
+            "created_utc": int(comment.created_utc)
         }
+        # 'known' is this comment's entry in the comment index: (body_hash, label, score).
+        # An unedited comment keeps the sentiment it got in an earlier run.
+        if known is not None and known[0] == comment_dict["body_hash"] and known[1] is not None:
+            comment_dict["sentiment_label"] = known[1]
+            comment_dict["sentiment_score"] = known[2]
+        return comment_dict
     except Exception as e:
         logger.error(f"❌ Error processing comment {comment.id} under post {post_id}: {e}")
         return None
 
 
-def scrape_all_comments(posts_scraped, logger, reddit, comment_link_limit):
+def scrape_post_comments(post_id, subreddit, country, logger, reddit, comment_link_limit, comment_index=None):
+    post = reddit.submission(id=post_id)
+
+    limit_value_for_praw = None if comment_link_limit == -1 else comment_link_limit
+
+    post.comments.replace_more(limit=limit_value_for_praw)
+
+    comments = post.comments.list()
+    known_comments = comment_index.lookup([comment.id for comment in comments]) if comment_index else {}
+
+    post_comments = []
+    for comment in comments:
+        comment_dict = scrape_a_comment(post_id, subreddit, country, logger, comment, known_comments.get(comment.id))
+        if comment_dict:
+            post_comments.append(comment_dict)
+    return post_comments
+
+
+def is_removed(submission):
+    return (getattr(submission, "removed_by_category", None) is not None
+            or submission.selftext in ("[deleted]", "[removed]"))
+
+
+def hydrate_posts(posts_scraped, logger, reddit, post_comment_approve_limit, scheduler=None, checkpoint=None):
+    """
+    Refreshes 'num_comments' and 'score' of the approved posts with one reddit.info() request per 100 posts,
+    before any comment tree is fetched. Posts that were deleted/removed since Step 2, or whose comment count
+    is now under 'post_comment_approve_limit', are no longer approved, which saves their comment-tree fetch.
+    Posts whose comments are already in the checkpoint are left as they are.
+    """
+    finished_posts = checkpoint.finished_units("comments") if checkpoint else {}
+    to_hydrate = (posts_scraped['approved'] == True) & posts_scraped['post_id'].notna() \
+        & ~posts_scraped['post_id'].isin(list(finished_posts))
+    post_ids = list(dict.fromkeys(posts_scraped.loc[to_hydrate, 'post_id']))
+    if not post_ids:
+        return posts_scraped
+
+    found = {}
+    requests = 0
+    for start in range(0, len(post_ids), INFO_BATCH_SIZE):
+        fullnames = [f"t3_{post_id}" for post_id in post_ids[start:start + INFO_BATCH_SIZE]]
+        try:
+            submissions = call_with_retries(lambda: list(reddit.info(fullnames=fullnames)), logger,
+                                            f"refreshing posts {start + 1}-{start + len(fullnames)}", scheduler)
+        except Exception as e:
+            logger.error(f"❌ Failed to refresh posts {start + 1}-{start + len(fullnames)}: {e}. Keeping their Step 2 data.")
+            found.update({fullname[3:]: None for fullname in fullnames})
+            continue
+        requests += 1
+        found.update({submission.id: submission for submission in submissions})
+
+    # None = the batch failed and the post keeps its Step 2 data; missing = Reddit no longer returns the post.
+    refreshed = {post_id: submission for post_id, submission in found.items() if submission is not None}
+    removed = {post_id for post_id in post_ids
+               if post_id not in found or (post_id in refreshed and is_removed(refreshed[post_id]))}
+
+    fresh = pd.DataFrame([(post_id, submission.num_comments, submission.score) for post_id, submission in refreshed.items()],
+                         columns=['post_id', 'num_comments', 'score']).set_index('post_id')
+    posts_scraped = posts_scraped.copy()
+    hydrated_ids = posts_scraped.loc[to_hydrate, 'post_id']
+    for column in ('num_comments', 'score'):
+        posts_scraped.loc[to_hydrate, column] = hydrated_ids.map(fresh[column]).fillna(
+            posts_scraped.loc[to_hydrate, column]).astype('int64')
+
+    gone = to_hydrate & posts_scraped['post_id'].isin(removed)
+    under_limit = to_hydrate & ~gone & (posts_scraped['num_comments'] < post_comment_approve_limit)
+    posts_scraped.loc[gone | under_limit, 'approved'] = False
+
+    skipped = int((gone | under_limit).sum())
+    logger.info(f"🔄 Refreshed {len(post_ids)} approved posts in {requests} requests: {int(gone.sum())} deleted/removed, "
+                f"{int(under_limit.sum())} now under {post_comment_approve_limit} comments. "
+                f"{skipped} comment-tree fetches avoided.")
+    return posts_scraped
+
+
+def load_finished_posts(checkpoint, logger):
+    if checkpoint is None:
+        return {}
+    finished_posts = checkpoint.finished_units("comments")
+    if finished_posts:
+        logger.info(f"♻️ {len(finished_posts)} posts already scraped in this run. Reusing their comments.")
+    return finished_posts
+
+
+def iter_post_comments(posts_scraped, logger, reddit, comment_link_limit, scheduler=None, checkpoint=None,
+                       comment_index=None, reused_posts=None):
+    """
+    Yields (position, comments of one post) for every approved post, in post order.
+    'reused_posts' ({post_id: comments}, see comment_delta.plan_delta_fetch) are yielded without a fetch.
+    """
     approved_posts = posts_scraped[posts_scraped['approved'] == True]
-    all_comments = []
+    finished_posts = {**(reused_posts or {}), **load_finished_posts(checkpoint, logger)}
 
     total_posts_to_scrape = len(approved_posts)
     logger.info(f"Found {total_posts_to_scrape} approved posts to scrape comments from.")
@@ -43,59 +148,170 @@ def scrape_all_comments(posts_scraped, logger, reddit, comment_link_limit):
             logger.warning(f"⚠️ Skipping row {i + 1} due to missing post_id.")
             continue
 
+        if post_id in finished_posts:
+            yield i, finished_posts[post_id]
+            continue
+
         logger.info(f"⏳ Scraping comments for post {post_id} (r/{subreddit}) [{i + 1}/{total_posts_to_scrape}] ===")
 
         try:
-            post = reddit.submission(id=post_id)
+            post_comments = call_with_retries(
+                lambda: scrape_post_comments(post_id, subreddit, country, logger, reddit, comment_link_limit,
+                                             comment_index),
+                logger, f"scraping comments of post {post_id}", scheduler)
+            if checkpoint:
+                checkpoint.save_unit("comments", post_id, post_comments)
+            logger.info(f"✅ Found {len(post_comments)} comments for post {post_id}.")
 
-            limit_value_for_praw = None if comment_link_limit == -1 else comment_link_limit
+        except (TooManyRequests, ServerError):
+            logger.warning(f"⏭️ Skipping post {post_id} after exhausting retries.")
+            continue
+        except Exception as e:
+            logger.error(f"❌ Failed to process comments for post {post_id}: {e}")
+            continue
 
-            post.comments.replace_more(limit=limit_value_for_praw)
+        yield i, post_comments
 
-            comment_count_for_post = 0
-            for comment in post.comments.list():
-                comment_dict = scrape_a_comment(post_id, subreddit, country, logger, comment)
-                if comment_dict:
-                    all_comments.append(comment_dict)
-                    comment_count_for_post += 1
-            logger.info(f"✅ Found {comment_count_for_post} comments for post {post_id}.")
 
-        except TooManyRequests:
-            logger.warning(f"⚠️ Rate limit (429) hit while processing post {post_id}. Sleeping for 60 seconds...")
-            time.sleep(60)
-            logger.warning(f"⏭️ Skipping to next post after rate limit sleep.")
-            continue
+def iter_post_comments_concurrent(posts_scraped, logger, comment_link_limit, workers, scheduler, checkpoint=None,
+                                  comment_index=None, reused_posts=None):
+    """
+    Yields (position, comments of one post) as posts finish, so the order follows completion.
+    At most 2 x 'workers' posts are in flight, so a slow consumer holds the scraper back instead of piling up results,
+    and none is more than 4 x 'workers' positions after the oldest post still in flight.
+    """
+    # PRAW objects are not thread-safe, so every worker thread gets its own client.
+    # All clients share 'scheduler', which keeps the whole pool inside one request budget.
+    approved_posts = posts_scraped[posts_scraped['approved'] == True]
+    total_posts_to_scrape = len(approved_posts)
+    logger.info(f"Found {total_posts_to_scrape} approved posts to scrape comments from ({workers} workers).")
+    finished_posts = {**(reused_posts or {}), **load_finished_posts(checkpoint, logger)}
+
+    thread_state = threading.local()
+
+    def worker(i, post_id, subreddit, country):
+        if getattr(thread_state, "reddit", None) is None:
+            thread_state.reddit = connect_reddit(logger, scheduler)
+
+        logger.info(f"⏳ Scraping comments for post {post_id} (r/{subreddit}) [{i + 1}/{total_posts_to_scrape}] ===")
+        try:
+            post_comments = call_with_retries(
+                lambda: scrape_post_comments(post_id, subreddit, country, logger, thread_state.reddit,
+                                             comment_link_limit, comment_index),
+                logger, f"scraping comments of post {post_id}", scheduler)
+            if checkpoint:
+                checkpoint.save_unit("comments", post_id, post_comments)
+            logger.info(f"✅ Found {len(post_comments)} comments for post {post_id}.")
+            return post_comments
+        except (TooManyRequests, ServerError):
+            logger.warning(f"⏭️ Skipping post {post_id} after exhausting retries.")
+            return []
         except Exception as e:
             logger.error(f"❌ Failed to process comments for post {post_id}: {e}")
-            continue
+            return []
+
+    start_time = time.time()
+    posts_done = 0
+    # No post is started more than 'max_ahead' positions after the oldest unfinished one, so one slow post
+    # cannot leave an unbounded number of later results waiting for it in an in-order consumer.
+    max_ahead = workers * 4
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+
+        def finish_while(blocked):
+            nonlocal posts_done
+            while in_flight and blocked():
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    posts_done += 1
+                    yield in_flight.pop(future), future.result()
 
-    comments_df = pd.DataFrame(all_comments)
-    return comments_df
+        for i, row in enumerate(approved_posts.itertuples()):
+            if pd.isna(row.post_id):
+                logger.warning(f"⚠️ Skipping row {i + 1} due to missing post_id.")
+                continue
+            yield from finish_while(lambda: i - min(in_flight.values()) >= max_ahead)
+            if row.post_id in finished_posts:
+                posts_done += 1
+                yield i, finished_posts[row.post_id]
+                continue
 
+            yield from finish_while(lambda: len(in_flight) >= workers * 2)
+            in_flight[executor.submit(worker, i, row.post_id, row.subreddit, row.country)] = i
 
-def main(posts_scraped, logger, reddit, comment_limit):
+        for future in as_completed(list(in_flight)):
+            posts_done += 1
+            yield in_flight.pop(future), future.result()
+
+    elapsed = time.time() - start_time
+    posts_per_second = posts_done / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"📊 Scraped {posts_done} posts in {elapsed:.1f}s ({posts_per_second:.2f} posts/s), "
+        f"{scheduler.total_requests} API requests, {scheduler.throttled_seconds:.1f}s throttled (summed over workers).")
+
+
+def scrape_all_comments(posts_scraped, logger, reddit, comment_link_limit, scheduler=None, checkpoint=None,
+                        comment_index=None, reused_posts=None):
+    # Comments are spilled to disk in fixed-size segments, so memory does not grow with the run.
+    writer = SegmentWriter("comments")
+    for _, post_comments in iter_post_comments(posts_scraped, logger, reddit, comment_link_limit, scheduler,
+                                               checkpoint, comment_index, reused_posts):
+        writer.extend(post_comments)
+    return writer.close()
+
+
+def scrape_all_comments_concurrent(posts_scraped, logger, comment_link_limit, workers, scheduler, checkpoint=None,
+                                   comment_index=None, reused_posts=None):
+    approved_posts = posts_scraped[posts_scraped['approved'] == True]
+    expected_positions = iter([i for i, post_id in enumerate(approved_posts['post_id']) if not pd.isna(post_id)])
+    next_position = next(expected_positions, None)
+
+    # Keep the same row order as the serial scraper: a post is written once every post before it is written.
+    # Only the posts that finish out of order wait in memory: iter_post_comments_concurrent starts no post more
+    # than 4 x 'workers' positions after the oldest unfinished one, so at most that many wait.
+    writer = SegmentWriter("comments")
+    waiting = {}
+    for position, post_comments in iter_post_comments_concurrent(posts_scraped, logger, comment_link_limit, workers,
+                                                                 scheduler, checkpoint, comment_index, reused_posts):
+        waiting[position] = post_comments
+        while next_position in waiting:
+            writer.extend(waiting.pop(next_position))
+            next_position = next(expected_positions, None)
+
+    return writer.close()
+
+
+def main(posts_scraped, logger, reddit, comment_limit, workers=1, scheduler=None, checkpoint=None,
+         comment_index=None, reused_posts=None):
     if logger is None:
         logger = setup_logger()
     if reddit is None:
-        reddit = connect_reddit(logger)
+        reddit = connect_reddit(logger, scheduler)
+
+    run_date = checkpoint.run_date if checkpoint else None
 
     if isinstance(posts_scraped, (str, Path)):
-        today_str = datetime.today().strftime("%Y-%m-%d")
-        csv_path = Path(posts_scraped) / f"{today_str}.csv"
-        try:
-            posts_scraped = pd.read_csv(csv_path)
-        except FileNotFoundError:
-            logger.error(f"❌ Posts file not found at: {csv_path}. Cannot scrape comments.")
-            return pd.DataFrame()
+        today_str = run_date or datetime.today().strftime("%Y-%m-%d")
+        if not table_exists(posts_scraped, today_str):
+            logger.error(f"❌ Posts data for {today_str} not found in: {posts_scraped}. Cannot scrape comments.")
+            return SegmentWriter("comments").close()
+        posts_scraped = load_table(posts_scraped, today_str)
 
     if posts_scraped.empty:
         logger.warning("⚠️ Input DataFrame 'posts_scraped' is empty. No comments to scrape.")
-        return pd.DataFrame()
+        return SegmentWriter("comments").close()
 
-    scraped_comments = scrape_all_comments(posts_scraped, logger, reddit, comment_limit)
+    if workers > 1 and scheduler is not None:
+        scraped_comments = scrape_all_comments_concurrent(posts_scraped, logger, comment_limit, workers, scheduler,
+                                                          checkpoint, comment_index, reused_posts)
+    else:
+        scraped_comments = scrape_all_comments(posts_scraped, logger, reddit, comment_limit, scheduler, checkpoint,
+                                               comment_index, reused_posts)
 
     file_location = "data/raw/weekly_scrapings/comments/"
 
-    save_csv(scraped_comments, logger, file_location)
+    save_segments(scraped_comments, logger, file_location, run_date)
 
-    return scraped_comments
\ No newline at end of file
+    # A lazy SegmentedTable: read it batch by batch and discard() it when done.
+    return scraped_comments
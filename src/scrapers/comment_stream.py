@@ -0,0 +1,119 @@
+from datetime import datetime
+from src.core.logger import setup_logger
+from src.core.connect_reddit import connect_reddit
+from src.utils.storage import save_segments
+from src.utils.segments import SegmentWriter
+from src.scrapers.comment_scraper import scrape_a_comment
+from src.core.request_scheduler import call_with_retries
+from prawcore.exceptions import TooManyRequests, ServerError
+
+# Comment listings hold 100 comments per page (one request). Reddit serves about 1000 comments per listing.
+COMMENT_PAGE_SIZE = 100
+
+
+def scrape_subreddit_stream(subreddit_name, country, logger, reddit, scrape_till, post_ids=None, comment_index=None,
+                            max_comments=None):
+    """
+    Reads r/<subreddit_name>'s comment stream (/r/<sub>/comments, newest first) back to 'scrape_till'.
+    Keeps the comments on 'post_ids' (all posts if None). Returns (comment rows, comments read, whether
+    'scrape_till' was reached); the rows have the same schema as the per-post comment scraper.
+    """
+    comments = []
+    read = 0
+    reached = False
+    for comment in reddit.subreddit(subreddit_name).comments(limit=max_comments):
+        read += 1
+        if datetime.utcfromtimestamp(comment.created_utc) < scrape_till:
+            reached = True
+            break
+        if post_ids is None or comment.link_id[3:] in post_ids:
+            comments.append(comment)
+
+    known_comments = comment_index.lookup([comment.id for comment in comments]) if comment_index else {}
+    rows = []
+    for comment in comments:
+        comment_dict = scrape_a_comment(comment.link_id[3:], subreddit_name, country, logger, comment,
+                                        known_comments.get(comment.id))
+        if comment_dict:
+            rows.append(comment_dict)
+    return rows, read, reached
+
+
+def stream_post_filter(posts_scraped, subreddit_name, stream_posts):
+    # "approved" = the posts the tree scraper would expand, "listed" = every post Step 2 listed, "all" = no filter.
+    if stream_posts == "all":
+        return None
+    sub_posts = posts_scraped[posts_scraped['subreddit'] == subreddit_name]
+    if stream_posts == "approved":
+        sub_posts = sub_posts[sub_posts['approved'] == True]
+    return set(sub_posts['post_id'].dropna())
+
+
+def iter_subreddit_comments(posts_scraped, logger, reddit, scrape_till, stream_posts="approved", max_comments=None,
+                            scheduler=None, checkpoint=None, comment_index=None):
+    """Yields (position, comments of one subreddit) for every subreddit in 'posts_scraped', in order."""
+    subreddits = posts_scraped[['subreddit', 'country']].dropna(subset=['subreddit']).drop_duplicates('subreddit')
+    finished_subs = checkpoint.finished_units("stream") if checkpoint else {}
+    if finished_subs:
+        logger.info(f"♻️ {len(finished_subs)} comment streams already read in this run. Reusing their comments.")
+    logger.info(f"Found {len(subreddits)} subreddits to read the comment stream of ({stream_posts} posts).")
+
+    for i, row in enumerate(subreddits.itertuples()):
+        subreddit_name = row.subreddit
+        if subreddit_name in finished_subs:
+            yield i, finished_subs[subreddit_name]
+            continue
+
+        post_ids = stream_post_filter(posts_scraped, subreddit_name, stream_posts)
+        if post_ids is not None and not post_ids:
+            continue
+
+        logger.info(f"⏳ Reading the comment stream of r/{subreddit_name} ({row.country}) [{i + 1}/{len(subreddits)}] ===")
+        try:
+            sub_comments, read, reached = call_with_retries(
+                lambda: scrape_subreddit_stream(subreddit_name, row.country, logger, reddit, scrape_till, post_ids,
+                                                comment_index, max_comments),
+                logger, f"reading the comment stream of r/{subreddit_name}", scheduler)
+        except (TooManyRequests, ServerError):
+            logger.warning(f"⏭️ Skipping r/{subreddit_name} after exhausting retries.")
+            continue
+        except Exception as e:
+            logger.error(f"❌ Failed to read the comment stream of r/{subreddit_name}: {e}")
+            continue
+
+        if not reached:
+            logger.warning(f"⚠️ r/{subreddit_name}'s comment stream ended after {read} comments, before "
+                           f"{scrape_till.strftime('%Y-%m-%d %H:%M')} UTC. Older comments are missing.")
+        if checkpoint:
+            checkpoint.save_unit("stream", subreddit_name, sub_comments)
+        logger.info(f"✅ Kept {len(sub_comments)} of {read} streamed comments from r/{subreddit_name} "
+                    f"({read // COMMENT_PAGE_SIZE + 1} requests).")
+        yield i, sub_comments
+
+
+def scrape_all_stream_comments(posts_scraped, logger, reddit, scrape_till, stream_posts="approved", max_comments=None,
+                               scheduler=None, checkpoint=None, comment_index=None):
+    writer = SegmentWriter("stream-comments")
+    for _, sub_comments in iter_subreddit_comments(posts_scraped, logger, reddit, scrape_till, stream_posts,
+                                                   max_comments, scheduler, checkpoint, comment_index):
+        writer.extend(sub_comments)
+    return writer.close()
+
+
+def main(posts_scraped, logger, reddit, scrape_till, stream_posts="approved", max_comments=None, scheduler=None,
+         checkpoint=None, comment_index=None):
+    if logger is None:
+        logger = setup_logger()
+    if reddit is None:
+        reddit = connect_reddit(logger, scheduler)
+
+    if posts_scraped.empty:
+        logger.warning("⚠️ Input DataFrame 'posts_scraped' is empty. No comment streams to read.")
+        return SegmentWriter("stream-comments").close()
+
+    scraped_comments = scrape_all_stream_comments(posts_scraped, logger, reddit, scrape_till, stream_posts, max_comments,
+                                                  scheduler, checkpoint, comment_index)
+
+    save_segments(scraped_comments, logger, "data/raw/weekly_scrapings/comments/",
+                  checkpoint.run_date if checkpoint else None)
+    return scraped_comments
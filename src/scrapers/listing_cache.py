@@ -0,0 +1,78 @@
+import threading
+from collections import namedtuple
+
+# The submission fields Step 2 reads. Plain tuples instead of PRAW objects keep the cache small
+# for the many subreddits that are listed in Step 1 but never approved.
+ListedPost = namedtuple("ListedPost", ["id", "fullname", "title", "selftext", "score", "num_comments", "created_utc"])
+
+
+def listed_post(submission):
+    return ListedPost(submission.id, submission.fullname, submission.title, submission.selftext, submission.score,
+                      submission.num_comments, submission.created_utc)
+
+
+class ListingCache:
+    """
+    Keeps the 'new' listing pages read while checking the subreddits (Step 1) for the post scraper (Step 2),
+    so an approved subreddit is not listed twice in one run.
+    For each subreddit it remembers the posts of the pages that were fetched, newest first, and whether the listing
+    was fetched to its end. Step 2 replays them and only requests the pages after the last remembered post.
+    Lives for one run in memory; posts keep the score/comment count they had when Step 1 listed them.
+    """
+
+    def __init__(self):
+        self._listings = {}
+        self._lock = threading.Lock()
+        self.reused_posts = 0
+        self.fetched_posts = 0
+
+    def record(self, subreddit_name, submissions):
+        """
+        Yields 'submissions' (a 'new' listing) unchanged while remembering the posts of every page it fetched.
+        A PRAW listing holds the whole page it requested, so the posts after the last one read (the probe stops
+        at the approve point or the window edge) are saved too, without another request.
+        """
+        posts = []
+        entry = {"posts": posts, "complete": False}
+        with self._lock:
+            # A retried probe starts the subreddit's listing over.
+            self._listings[subreddit_name.lower()] = entry
+        saved_page = None
+        for submission in submissions:
+            page = getattr(submissions, "_listing", None)
+            if page is None:
+                posts.append(listed_post(submission))
+            elif page is not saved_page:
+                saved_page = page
+                posts.extend(listed_post(post) for post in page)
+                # PRAW marks the listing exhausted when this page was its last one.
+                entry["complete"] = getattr(submissions, "_exhausted", False)
+            yield submission
+        entry["complete"] = True
+
+    def new(self, sub, subreddit_name, limit=None):
+        """
+        Same posts as sub.new(limit=limit): the remembered ones first, then the listing continues
+        after the last of them. Without a remembered listing this is just sub.new(limit=limit).
+        """
+        with self._lock:
+            entry = self._listings.get(subreddit_name.lower())
+        posts = list(entry["posts"]) if entry else []
+        if limit is not None:
+            posts = posts[:limit]
+
+        for post in posts:
+            self.reused_posts += 1
+            yield post
+
+        if entry and (entry["complete"] or len(posts) == limit):
+            return
+        remaining = None if limit is None else limit - len(posts)
+        params = {"after": posts[-1].fullname} if posts else None
+        for submission in sub.new(limit=remaining, params=params):
+            self.fetched_posts += 1
+            yield submission
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
@@ -2,9 +2,11 @@ from datetime import datetime, timedelta
 import pandas as pd
 from src.core.logger import setup_logger
 from src.core.connect_reddit import connect_reddit
-from src.utils.save_csv import save_csv
+from src.utils.storage import save_segments, table_exists, load_table
+from src.utils.segments import SegmentWriter
 from pathlib import Path
 from src.utils.cleaners import clean_text
+from src.core.request_scheduler import call_with_retries
 
 
 def scrape_a_post(subreddit_name, logger, post, post_comment_approve_limit):
@@ -18,7 +20,7 @@ def scrape_a_post(subreddit_name, logger, post, post_comment_approve_limit):
             "selftext": clean_text(post.selftext),
             "score": post.score,
             "num_comments": num_comments,
-            "created_utc": datetime.utcfromtimestamp(post.created_utc).strftime("%Y-%m-%d"),
+            "created_utc": int(post.created_utc),
             "post_url": f"https://www.reddit.com/r/{subreddit_name}/comments/{post.id}",
             "approved": num_comments >= post_comment_approve_limit,
         }
@@ -27,9 +29,33 @@ def scrape_a_post(subreddit_name, logger, post, post_comment_approve_limit):
         return None
 
 
-def scrape_all_posts(subreddits, logger, reddit, post_limit, post_comment_approve_limit, scrape_till):
+def scrape_subreddit_posts(subreddit_name, country, logger, reddit, post_limit, post_comment_approve_limit, scrape_till,
+                           listing_cache=None):
+    sub = reddit.subreddit(subreddit_name)
+    sub_posts = []
+    # Pages already listed by the subreddit check are replayed; only the rest is requested.
+    listing = listing_cache.new(sub, subreddit_name, post_limit) if listing_cache else sub.new(limit=post_limit)
+    for post in listing:
+        post_time_utc = datetime.utcfromtimestamp(post.created_utc)
+
+        if post_time_utc < scrape_till:
+            logger.info(f"ℹ️ Date limit reached for r/{subreddit_name}. Moving to next sub.")
+            break
+
+        post_dict = scrape_a_post(subreddit_name, logger, post, post_comment_approve_limit)
+        if post_dict:
+            post_dict["country"] = country
+            sub_posts.append(post_dict)
+    return sub_posts
+
+
+def scrape_all_posts(subreddits, logger, reddit, post_limit, post_comment_approve_limit, scrape_till, scheduler=None,
+                     checkpoint=None, listing_cache=None):
     approved_subs = subreddits[subreddits['approved'] == True]
-    posts = []
+    posts = SegmentWriter("posts")
+    finished_subs = checkpoint.finished_units("posts") if checkpoint else {}
+    if finished_subs:
+        logger.info(f"♻️ {len(finished_subs)} subreddits already scraped in this run. Reusing their posts.")
 
     logger.info(f"ℹ️ Only posts after {scrape_till.strftime('%Y-%m-%d %H:%M')} UTC will be scraped.")
 
@@ -40,51 +66,56 @@ def scrape_all_posts(subreddits, logger, reddit, post_limit, post_comment_approv
         if pd.isna(subreddit_name):
             continue
 
+        if subreddit_name in finished_subs:
+            posts.extend(finished_subs[subreddit_name])
+            continue
+
         logger.info(f"⏳ Scraping posts from r/{subreddit_name} ({country}) ===")
         try:
-            sub = reddit.subreddit(subreddit_name)
-            post_count = 0
-            for post in sub.new(limit=post_limit):
-                post_time_utc = datetime.utcfromtimestamp(post.created_utc)
-
-                if post_time_utc < scrape_till:
-                    logger.info(f"ℹ️ Date limit reached for r/{subreddit_name}. Moving to next sub.")
-                    break
-
-                post_dict = scrape_a_post(subreddit_name, logger, post, post_comment_approve_limit)
-                if post_dict:
-                    post_dict["country"] = country
-                    posts.append(post_dict)
-                    post_count += 1
-            logger.info(f"✅ Scraped {post_count} posts from r/{subreddit_name}.")
+            sub_posts = call_with_retries(
+                lambda: scrape_subreddit_posts(subreddit_name, country, logger, reddit, post_limit,
+                                               post_comment_approve_limit, scrape_till, listing_cache),
+                logger, f"scraping posts from r/{subreddit_name}", scheduler)
+            posts.extend(sub_posts)
+            if checkpoint:
+                checkpoint.save_unit("posts", subreddit_name, sub_posts)
+            logger.info(f"✅ Scraped {len(sub_posts)} posts from r/{subreddit_name}.")
         except Exception as e:
             logger.error(f"❌ Failed to scrape posts from r/{subreddit_name}: {e}")
             continue
 
-    posts_df = pd.DataFrame(posts)
-    return posts_df
+    if listing_cache:
+        logger.info(f"♻️ {listing_cache.reused_posts} posts reused from the subreddit check listings, "
+                    f"{listing_cache.fetched_posts} newly listed.")
+
+    return posts.close()
 
 
-def main(subreddits, logger, reddit, post_limit, post_comment_approve_limit, scrape_till):
+def main(subreddits, logger, reddit, post_limit, post_comment_approve_limit, scrape_till, scheduler=None,
+         checkpoint=None, listing_cache=None):
     if logger is None:
         logger = setup_logger()
     if reddit is None:
-        reddit = connect_reddit(logger)
+        reddit = connect_reddit(logger, scheduler)
+
+    run_date = checkpoint.run_date if checkpoint else None
 
     if isinstance(subreddits, (str, Path)):
-        today_str = datetime.today().strftime("%Y-%m-%d")
-        csv_path = Path(subreddits) / f"{today_str}.csv"
-        try:
-            subreddits = pd.read_csv(csv_path)
-        except FileNotFoundError:
-             logger.error(f"❌ Subreddit check file not found at: {csv_path}. Cannot scrape posts.")
-             return pd.DataFrame()
+        today_str = run_date or datetime.today().strftime("%Y-%m-%d")
+        if not table_exists(subreddits, today_str):
+            logger.error(f"❌ Subreddit check data for {today_str} not found in: {subreddits}. Cannot scrape posts.")
+            return pd.DataFrame()
+        subreddits = load_table(subreddits, today_str)
 
 
     file_location = "data/raw/weekly_scrapings/posts/"
 
-    scraped_posts = scrape_all_posts(subreddits, logger, reddit, post_limit, post_comment_approve_limit, scrape_till)
+    scraped_posts = scrape_all_posts(subreddits, logger, reddit, post_limit, post_comment_approve_limit, scrape_till, scheduler,
+                                     checkpoint, listing_cache)
 
-    save_csv(scraped_posts, logger, file_location)
+    save_segments(scraped_posts, logger, file_location, run_date)
 
-    return scraped_posts
\ No newline at end of file
+    # Posts are few compared to comments; the later steps use them as one DataFrame.
+    posts_df = scraped_posts.to_pandas()
+    scraped_posts.discard()
+    return posts_df
\ No newline at end of file
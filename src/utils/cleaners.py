@@ -1,5 +1,25 @@
+import multiprocessing
 import re
 
+import pandas as pd
+
+from src.utils.frame_schema import ARROW_STRING, compact
+
+# preprocess_text lowercases, drops URLs, digits and punctuation, then collapses whitespace to one space.
+URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+REMOVE_PATTERN = re.compile(r'[^\w\s]|\d')
+WHITESPACE_PATTERN = re.compile(r'\s')
+
+# ASCII characters are handled with one bytes.translate: digits/punctuation are deleted, whitespace becomes ' '.
+# Bytes >= 0x80 are never touched, so this is safe on UTF-8 encoded text.
+ASCII_DELETE = bytes(code for code in range(128) if REMOVE_PATTERN.fullmatch(chr(code)))
+ASCII_TABLE = bytes(32 if WHITESPACE_PATTERN.fullmatch(chr(code)) else code for code in range(128)) + bytes(range(128, 256))
+
+# Non-ASCII characters are classified once with the same regexes and remembered.
+KEPT_CHARS = {chr(code) for code in range(128)}
+REPLACED_CHARS = {}
+
+
 def clean_text(text):
     if not text:
         return ""
@@ -12,20 +32,68 @@ def clean_text(text):
 
     return text_str.strip()
 
+
+def replacement_for(char):
+    replacement = REPLACED_CHARS.get(char)
+    if replacement is None:
+        if REMOVE_PATTERN.fullmatch(char):
+            replacement = ''
+        elif WHITESPACE_PATTERN.fullmatch(char):
+            replacement = ' '
+        else:
+            KEPT_CHARS.add(char)
+            return None
+        REPLACED_CHARS[char] = replacement
+    return replacement
+
+
 def preprocess_text(text):
+    """
+    Same output as lower() -> remove URLs -> remove \\d+ -> remove [^\\w\\s] -> \\s+ to ' ', without a regex pass per step:
+    the URL regex only runs when a URL is possible, ASCII goes through one bytes table, and the few distinct
+    non-ASCII symbols/spaces of a comment are replaced directly. Removal and whitespace mapping are per character,
+    so their order does not matter. 'benchmarks/text_normalisation.py' checks that the output is byte-identical.
+    """
     text = text.lower()
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)
-    text = re.sub(r'\d+', '', text)
-    text = re.sub(r'[^\w\s]', '', text)
-    text = re.sub(r'\s+', ' ', text)
+    if 'http' in text or 'www.' in text:
+        text = URL_PATTERN.sub('', text)
+
+    text = text.encode('utf-8', 'surrogatepass').translate(ASCII_TABLE, ASCII_DELETE).decode('utf-8', 'surrogatepass')
+
+    if not text.isascii():
+        for char in set(text).difference(KEPT_CHARS):
+            replacement = replacement_for(char)
+            if replacement is not None:
+                text = text.replace(char, replacement)
+
+    while '  ' in text:
+        text = text.replace('  ', ' ')
     return text
 
-def nlp_preprocess(df):
-    df['author'] = df['author'].fillna('unknown_user_fill')
-    df['body'] = df['body'].fillna('')
-    df = df[~df['author'].str.lower().isin(['automoderator', 'deleted_user', 'unknown_user_fill'])]
+
+def preprocess_texts(text_list):
+    return [preprocess_text(text) for text in text_list]
+
+
+def preprocess_bodies(bodies, workers=1, chunk_size=20000):
+    """Runs preprocess_text over a list of texts, split across 'workers' processes for large inputs."""
+    bodies = list(bodies)
+    if workers <= 1 or len(bodies) < chunk_size * 2:
+        return preprocess_texts(bodies)
+
+    chunks = [bodies[start:start + chunk_size] for start in range(0, len(bodies), chunk_size)]
+    with multiprocessing.Pool(processes=workers) as pool:
+        results = pool.map(preprocess_texts, chunks)
+    return [text for chunk in results for text in chunk]
+
+
+def nlp_preprocess(df, workers=1):
+    df = compact(df)
+    df = df.assign(body=df['body'].fillna(''))
+    # Missing authors are dropped directly: a categorical 'author' cannot be filled with a new value.
+    df = df[df['author'].notna() & ~df['author'].str.lower().isin(['automoderator', 'deleted_user', 'unknown_user_fill'])]
     df = df[~df['body'].isin(['[deleted]', '[removed]'])]
-    df['body'] = df['body'].apply(preprocess_text)
+    df = df.assign(body=pd.array(preprocess_bodies(df['body'], workers), dtype=ARROW_STRING))
     df = df.dropna(subset=['body'])
     df = df[df['body'].str.len() >= 15]
     return df
@@ -0,0 +1,82 @@
+import pandas as pd
+
+# In-memory schema of the comment frames, from scraping to aggregation:
+#   - low-cardinality columns repeated on every row are categoricals (one small integer code per row);
+#   - free text is held in Arrow buffers instead of one Python str object per row;
+#   - timestamps are int64 epoch seconds.
+CATEGORY_COLUMNS = ["post_id", "author", "subreddit", "country"]
+TEXT_COLUMNS = ["comment_id", "body", "body_hash", "title", "selftext", "post_url"]
+EPOCH_COLUMNS = ["created_utc"]
+
+# Labels are only made categorical once they are final (Step 5 output): filling labels into a categorical
+# column would fail for labels that are not among its categories yet.
+SCORED_CATEGORY_COLUMNS = CATEGORY_COLUMNS + ["sentiment_label"]
+
+ARROW_STRING = pd.StringDtype("pyarrow")
+
+
+def to_epoch(values):
+    """int64 epoch seconds from epoch numbers or, for data saved before the compact schema, 'YYYY-MM-DD' strings."""
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("int64")
+    dates = pd.to_datetime(values.astype(str), format="%Y-%m-%d", utc=True)
+    return (dates - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+
+
+def compact(df, category_columns=CATEGORY_COLUMNS):
+    """Returns 'df' with the compact dtypes above. Columns already compact (and unknown columns) are left as they are."""
+    columns = {}
+    for column in df.columns:
+        dtype = df[column].dtype
+        if column in category_columns:
+            if not isinstance(dtype, pd.CategoricalDtype):
+                columns[column] = df[column].astype("category")
+        elif column in TEXT_COLUMNS:
+            if dtype != ARROW_STRING:
+                columns[column] = df[column].astype(ARROW_STRING)
+        elif column in EPOCH_COLUMNS:
+            if dtype != "int64":
+                columns[column] = to_epoch(df[column])
+    return df.assign(**columns) if columns else df
+
+
+def concat_frames(frames, category_columns=CATEGORY_COLUMNS):
+    """
+    pd.concat for compact frames. pd.concat turns a categorical column into objects when the frames have different
+    categories, so the categories are unified first and the result keeps the compact schema.
+    """
+    frames = [compact(frame, category_columns) for frame in frames]
+    if not frames:
+        return pd.DataFrame()
+    for column in category_columns:
+        present = [frame[column].cat.categories for frame in frames if column in frame.columns]
+        if len(present) > 1:
+            categories = present[0].append(present[1:]).unique()
+            frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)})
+                      if column in frame.columns else frame for frame in frames]
+    return compact(pd.concat(frames, ignore_index=True), category_columns)
+
+
+def plain_bytes(df):
+    """Size of 'df' with every text column as Python str objects, the layout before the compact schema."""
+    total = df.index.memory_usage()
+    for column in df.columns:
+        series = df[column]
+        if column in EPOCH_COLUMNS:
+            # The old layout held a 'YYYY-MM-DD' string per row.
+            series = pd.Series(["0000-00-00"] * len(series), dtype=object)
+        elif isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == ARROW_STRING:
+            series = series.astype(object)
+        total += series.memory_usage(index=False, deep=True)
+    return total
+
+
+def memory_report(df, logger, stage):
+    """Logs how much memory 'df' takes in the compact schema and how much the same rows would take as objects."""
+    if df is None or df.empty:
+        return
+    compact_mb = df.memory_usage(index=True, deep=True).sum() / 1024 ** 2
+    plain_mb = plain_bytes(df) / 1024 ** 2
+    logger.info(f"🧮 {stage}: {len(df)} rows in {compact_mb:.1f} MB "
+                f"({plain_mb:.1f} MB as object columns, {1 - compact_mb / plain_mb:.0%} less).")
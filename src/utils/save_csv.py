@@ -1,8 +1,9 @@
 from datetime import datetime
 from pathlib import Path
 import csv
+import os
 
-def parent_root(file_location):
+def parent_root(file_location, date_str=None):
     current_file = Path(__file__)
     project_root = current_file.parent.parent.parent
 
@@ -10,7 +11,7 @@ def parent_root(file_location):
     target_dir = full_path if not full_path.suffix else full_path.parent
     target_dir.mkdir(parents=True, exist_ok=True)
 
-    today_str = datetime.today().strftime("%Y-%m-%d")
+    today_str = date_str or datetime.today().strftime("%Y-%m-%d")
 
     file_path = (
         full_path / f"{today_str}.csv"
@@ -21,9 +22,12 @@ def parent_root(file_location):
     return file_path
 
 
-def save_csv(df, logger, file_location):
-    file_path = parent_root(file_location)
-    df.to_csv(file_path, index=False, encoding='utf-8', quoting=csv.QUOTE_MINIMAL)
+def save_csv(df, logger, file_location, date_str=None):
+    file_path = parent_root(file_location, date_str)
+    # Written next to the target and swapped in, so readers never see a half-written file.
+    temp_path = file_path.with_name(file_path.name + ".tmp")
+    df.to_csv(temp_path, index=False, encoding='utf-8', quoting=csv.QUOTE_MINIMAL)
+    os.replace(temp_path, file_path)
     project_root = Path(__file__).parent.parent.parent
     logger.info(f"📁 CSV successfully saved: {file_path.relative_to(project_root)}")
 
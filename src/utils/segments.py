@@ -0,0 +1,104 @@
+import os
+import shutil
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.core.config_utils import get_config
+from src.utils.storage import dataset_root, to_arrow
+
+
+class SegmentWriter:
+    """
+    Collects scraped records (dicts) in fixed-size batches and writes every full batch to a typed Parquet segment
+    under [storage] spill_dir, so a long scrape never holds more than 'batch_rows' records in memory.
+    close() returns a SegmentedTable over the segments.
+    """
+
+    def __init__(self, name, batch_rows=None, spill_dir=None):
+        spill_root = dataset_root(spill_dir or get_config("storage", "spill_dir", fallback="data/tmp/segments"))
+        self.directory = spill_root / f"{name}-{os.getpid()}-{time.time_ns()}"
+        self.batch_rows = batch_rows or get_config("storage", "spill_batch_rows", type=int, fallback=50000)
+        self.buffer = []
+        self.paths = []
+
+    def append(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_rows:
+            self.flush()
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"segment-{len(self.paths):05d}.parquet"
+        pq.write_table(to_arrow(pd.DataFrame(self.buffer)), str(path))
+        self.paths.append(path)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        return SegmentedTable(self.paths, self.directory)
+
+
+class SegmentedTable:
+    """
+    Lazy handle over Parquet segments: nothing is loaded until iter_batches() or to_pandas() is called.
+    Segments may have different columns (e.g. sentiment only on some comments); missing ones read as null.
+    """
+
+    def __init__(self, paths, directory=None):
+        self.paths = list(paths)
+        self.directory = directory
+        self._schema = None
+
+    @property
+    def schema(self):
+        if self._schema is None:
+            schemas = [pq.read_schema(str(path)) for path in self.paths]
+            self._schema = pa.unify_schemas(schemas) if schemas else pa.schema([])
+        return self._schema
+
+    @property
+    def columns(self):
+        return self.schema.names
+
+    def __len__(self):
+        return sum(pq.ParquetFile(str(path)).metadata.num_rows for path in self.paths)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def iter_tables(self, columns=None):
+        """Yields one Arrow table per segment, all with the unified schema (or just 'columns')."""
+        schema = self.schema
+        if columns is not None:
+            schema = pa.schema([schema.field(column) for column in columns if column in schema.names])
+        for path in self.paths:
+            table = pq.read_table(str(path), columns=[name for name in schema.names
+                                                      if name in pq.read_schema(str(path)).names])
+            for field in schema:
+                if field.name not in table.column_names:
+                    table = table.append_column(field, pa.nulls(table.num_rows, field.type))
+            yield table.select(schema.names).cast(schema)
+
+    def iter_batches(self, columns=None):
+        """Yields one DataFrame per segment."""
+        for table in self.iter_tables(columns):
+            yield table.to_pandas()
+
+    def to_pandas(self, columns=None):
+        frames = list(self.iter_batches(columns))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def discard(self):
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        self.paths = []
@@ -0,0 +1,209 @@
+import csv
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from src.core.config_utils import get_config
+from src.utils.save_csv import parent_root, save_csv
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# Explicit Arrow types per column, so every partition of a dataset has the same schema
+# (an all-empty partition would otherwise infer 'null' columns) and dtypes survive the round trip.
+# Columns not listed here keep the type Arrow infers from pandas.
+COLUMN_TYPES = {
+    "subreddit": pa.string(),
+    "country": pa.string(),
+    "subscribers": pa.int64(),
+    "approved": pa.bool_(),
+    "post_id": pa.string(),
+    "comment_id": pa.string(),
+    "author": pa.string(),
+    "title": pa.string(),
+    "selftext": pa.string(),
+    "body": pa.string(),
+    "body_hash": pa.string(),
+    "score": pa.int64(),
+    "num_comments": pa.int64(),
+    "created_utc": pa.int64(),  # epoch seconds
+    "post_url": pa.string(),
+    "sentiment_label": pa.string(),
+    "sentiment_score": pa.float32(),
+    "happiness_value": pa.float64(),
+    "sample_size": pa.int64(),
+    "ci_low": pa.float64(),
+    "ci_high": pa.float64(),
+    "Date": pa.string(),
+}
+
+COUNTRY_PARTITIONING = ds.partitioning(pa.schema([("country", pa.string())]), flavor="hive")
+
+_COLUMN_ORDER_KEY = b"column_order"
+
+
+def storage_format():
+    return get_config("storage", "format", fallback="parquet").lower()
+
+
+def dataset_root(file_location):
+    root = Path(file_location)
+    if not root.is_absolute():
+        root = PROJECT_ROOT / root
+    return root
+
+
+def partition_dir(file_location, date_str=None):
+    today_str = date_str or datetime.today().strftime("%Y-%m-%d")
+    return dataset_root(file_location) / f"date={today_str}"
+
+
+def to_arrow(df):
+    fields = []
+    for column in df.columns:
+        if column in COLUMN_TYPES:
+            fields.append(pa.field(column, COLUMN_TYPES[column]))
+        else:
+            fields.append(pa.Schema.from_pandas(df[[column]], preserve_index=False).field(column))
+
+    table = pa.Table.from_pandas(df, schema=pa.schema(fields), preserve_index=False)
+    # The pandas metadata would describe the 'country' column that partitioning moves into the folder names.
+    return table.replace_schema_metadata({_COLUMN_ORDER_KEY: json.dumps(list(df.columns)).encode("utf-8")})
+
+
+def save_table(df, logger, file_location, date_str=None, partition_by_country=True):
+    """
+    Saves one day of a dataset as Parquet under '<file_location>/date=<date>/country=<country>/'.
+    The day is written to a temporary folder and swapped in at the end, so readers never see half a partition.
+    With [storage] format = csv the old '<file_location>/<date>.csv' layout is written instead;
+    [storage] csv_export = true writes the CSV next to the Parquet data.
+    """
+    if storage_format() == "csv":
+        save_csv(df, logger, file_location, date_str)
+        return
+
+    target_dir = partition_dir(file_location, date_str)
+    tmp_dir = target_dir.with_name(target_dir.name + f".tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    table = to_arrow(df.reset_index(drop=True))
+    if partition_by_country and "country" in df.columns and len(df):
+        pq.write_to_dataset(table, root_path=str(tmp_dir), partition_cols=["country"],
+                            basename_template="part-{i}.parquet")
+    else:
+        pq.write_table(table, str(tmp_dir / "part-0.parquet"))
+
+    shutil.rmtree(target_dir, ignore_errors=True)
+    os.replace(tmp_dir, target_dir)
+    logger.info(f"📁 Parquet successfully saved: {os.path.relpath(target_dir, PROJECT_ROOT)} ({len(df)} rows)")
+
+    if get_config("storage", "csv_export", type=bool, fallback=False):
+        save_csv(df, logger, file_location, date_str)
+
+
+def save_segments(segments, logger, file_location, date_str=None, partition_by_country=True):
+    """
+    Same layout as save_table, for a SegmentedTable: the segments are streamed to the dataset one at a time,
+    so saving does not need the whole table in memory. The segments are left in place for the caller.
+    """
+    if segments.empty:
+        save_table(pd.DataFrame(columns=segments.columns), logger, file_location, date_str, partition_by_country)
+        return
+
+    if storage_format() == "csv" or get_config("storage", "csv_export", type=bool, fallback=False):
+        csv_path = parent_root(file_location, date_str)
+        temp_path = csv_path.with_name(csv_path.name + ".tmp")
+        for number, batch in enumerate(segments.iter_batches()):
+            batch.to_csv(temp_path, mode="w" if number == 0 else "a", header=number == 0, index=False,
+                         encoding="utf-8", quoting=csv.QUOTE_MINIMAL)
+        os.replace(temp_path, csv_path)
+        logger.info(f"📁 CSV successfully saved: {os.path.relpath(csv_path, PROJECT_ROOT)}")
+        if storage_format() == "csv":
+            return
+
+    target_dir = partition_dir(file_location, date_str)
+    tmp_dir = target_dir.with_name(target_dir.name + f".tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    schema = segments.schema.with_metadata({_COLUMN_ORDER_KEY: json.dumps(segments.columns).encode("utf-8")})
+    batches = (batch for table in segments.iter_tables() for batch in table.cast(schema).to_batches())
+    if partition_by_country and "country" in segments.columns:
+        ds.write_dataset(batches, str(tmp_dir), schema=schema, format="parquet", partitioning=COUNTRY_PARTITIONING,
+                         basename_template="part-{i}.parquet")
+    else:
+        with pq.ParquetWriter(str(tmp_dir / "part-0.parquet"), schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+
+    shutil.rmtree(target_dir, ignore_errors=True)
+    os.replace(tmp_dir, target_dir)
+    logger.info(f"📁 Parquet successfully saved: {os.path.relpath(target_dir, PROJECT_ROOT)} ({len(segments)} rows)")
+
+
+def table_exists(file_location, date_str=None):
+    if partition_dir(file_location, date_str).is_dir():
+        return True
+    csv_path = dataset_root(file_location) / f"{date_str or datetime.today().strftime('%Y-%m-%d')}.csv"
+    return csv_path.exists()
+
+
+def read_parquet_dir(path, columns=None):
+    """
+    Reads one date partition through Arrow. Only the requested columns are read from disk and the
+    files are memory-mapped, so numeric columns reach pandas without an extra copy.
+    """
+    dataset = ds.dataset(str(path), format="parquet", partitioning=COUNTRY_PARTITIONING,
+                         filesystem=pafs.LocalFileSystem(use_mmap=True))
+    if columns is not None:
+        columns = [column for column in columns if column in dataset.schema.names]
+    table = dataset.to_table(columns=columns)
+
+    if columns is None and table.num_rows:
+        stored_order = dataset.schema.metadata or {}
+        if _COLUMN_ORDER_KEY in stored_order:
+            column_order = [column for column in json.loads(stored_order[_COLUMN_ORDER_KEY]) if column in table.column_names]
+            table = table.select(column_order)
+
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def load_table(file_location, date_str=None, columns=None):
+    """
+    Loads one day of a dataset, Parquet first and the legacy CSV as a fallback.
+    'columns' limits what is read, e.g. ['body'] for analysis. Returns an empty DataFrame when nothing exists.
+    """
+    parquet_dir = partition_dir(file_location, date_str)
+    if parquet_dir.is_dir():
+        return read_parquet_dir(parquet_dir, columns)
+
+    csv_path = parent_root(file_location, date_str)
+    if not csv_path.exists():
+        return pd.DataFrame()
+    try:
+        return pd.read_csv(csv_path, usecols=(lambda column: column in columns) if columns is not None else None)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+
+
+def list_dates(file_location):
+    """Dates (YYYY-MM-DD) stored under 'file_location', in either layout, oldest first."""
+    root = dataset_root(file_location)
+    if not root.is_dir():
+        return []
+
+    dates = set()
+    for entry in root.iterdir():
+        if entry.is_dir() and entry.name.startswith("date=") and ".tmp-" not in entry.name:
+            dates.add(entry.name[len("date="):])
+        elif entry.suffix == ".csv":
+            dates.add(entry.stem)
+    return sorted(dates)
@@ -1,19 +1,61 @@
+import math
 from datetime import datetime, timedelta
 
-def count_comments(sub, logger, comment_approve_point, comment_max_days):
+# Posts per 'new' listing page (one request).
+LISTING_PAGE_SIZE = 100
+
+def count_recent_comments(submissions, comment_approve_point, comment_max_days):
+    # 'submissions' must be newest first (a 'new' listing). Stops at the window edge or the approve point.
     one_week_ago = datetime.utcnow() - timedelta(comment_max_days)
     comment_count = 0
-    try:
-        for submission in sub.new(limit=None):
-            created = datetime.utcfromtimestamp(submission.created_utc)
-            if created < one_week_ago:
-                break
-            comment_count += submission.num_comments
-            if comment_count >= comment_approve_point:
-                comment_count = comment_approve_point
-                break
-    except Exception as e:
-        logger.info(f" Error counting comments for r/{sub.display_name}: {e} ===")
-        comment_count = 0
+    for submission in submissions:
+        created = datetime.utcfromtimestamp(submission.created_utc)
+        if created < one_week_ago:
+            break
+        comment_count += submission.num_comments
+        if comment_count >= comment_approve_point:
+            comment_count = comment_approve_point
+            break
+    return comment_count
+
+def estimate_recent_comments(submissions, comment_approve_point, comment_max_days, max_pages=2):
+    """
+    Like count_recent_comments, but reads at most 'max_pages' listing pages.
+    If the window (or the approve point) is not reached within them, the weekly volume is extrapolated
+    from the comment rate over the sampled time span. Returns (estimate, low, high): a ~95% interval
+    treating posts as a Poisson stream (variance = sum of squared comment counts, scaled to the window).
+    The observed count is a hard lower bound. Exact results have low == high == estimate, and all three are
+    capped at 'comment_approve_point' like the exact count.
+    """
+    now = datetime.utcnow()
+    window_start = now - timedelta(comment_max_days)
+    max_posts = max_pages * LISTING_PAGE_SIZE
+
+    comment_count = 0
+    squared_sum = 0
+    sampled = 0
+    oldest = now
+    for submission in submissions:
+        created = datetime.utcfromtimestamp(submission.created_utc)
+        if created < window_start:
+            return comment_count, comment_count, comment_count
+        comment_count += submission.num_comments
+        if comment_count >= comment_approve_point:
+            return comment_approve_point, comment_approve_point, comment_approve_point
+        squared_sum += submission.num_comments ** 2
+        sampled += 1
+        oldest = created
+        if sampled >= max_posts:
+            break
+    else:
+        # The listing ended inside the window: every post was seen.
+        return comment_count, comment_count, comment_count
 
-    return comment_count
\ No newline at end of file
+    sampled_seconds = max((now - oldest).total_seconds(), 1.0)
+    scale = timedelta(comment_max_days).total_seconds() / sampled_seconds
+    estimate = comment_count * scale
+    margin = 1.96 * scale * math.sqrt(squared_sum)
+    # Capped at the approve point like the exact count, so both modes report the same value for approved subreddits.
+    low = max(comment_count, round(estimate - margin))
+    return (min(round(estimate), comment_approve_point), min(low, comment_approve_point),
+            min(round(estimate + margin), comment_approve_point))
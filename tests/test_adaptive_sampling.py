@@ -0,0 +1,51 @@
+"""Comments with a stored label must not be over-weighted: the sample has to estimate the mean of all comments."""
+import logging
+
+import numpy as np
+import pandas as pd
+
+from src.analyzers.adaptive_sampling import sample_and_score
+from src.analyzers.data_aggregator import aggregate_main
+
+
+def comments(labelled_count, pending_count):
+    # The labelled comments are all positive and the ones still to be scored all negative.
+    return pd.DataFrame({
+        "country": "Testland",
+        "body": [f"comment {index}" for index in range(labelled_count + pending_count)],
+        "sentiment_label": ["POSITIVE"] * labelled_count + [None] * pending_count,
+        "sentiment_score": [0.9] * labelled_count + [np.nan] * pending_count,
+    })
+
+
+def score_negative(texts):
+    return pd.DataFrame({"sentiment_label": ["NEGATIVE"] * len(texts), "sentiment_score": [0.9] * len(texts)})
+
+
+def test_sample_mean_is_not_biased_towards_labelled_comments():
+    # True mean: (2000 - 8000) / 10000 = -0.6.
+    processed_df = comments(2000, 8000)
+    estimates = []
+    for seed in range(20):
+        sampled_df = sample_and_score(processed_df, score_negative, logging.getLogger("test"), ci_width=0.1,
+                                      batch_size=200, seed=seed)
+        assert sampled_df.index.is_unique
+        estimates.append(aggregate_main(sampled_df)["happiness_value"].iloc[0])
+
+    assert abs(np.mean(estimates) - (-0.6)) < 0.02
+
+
+def test_labelled_comments_are_not_scored_again():
+    processed_df = comments(300, 700)
+    scored = []
+
+    def score_texts(texts):
+        scored.extend(texts)
+        return score_negative(texts)
+
+    sampled_df = sample_and_score(processed_df, score_texts, logging.getLogger("test"), ci_width=0.0, seed=0)
+
+    # A zero width never stops early, so every comment is taken and only the unlabelled ones are scored.
+    assert len(sampled_df) == len(processed_df)
+    assert sorted(scored) == sorted(processed_df["body"].iloc[300:])
+    assert aggregate_main(sampled_df)["happiness_value"].iloc[0] == -0.4
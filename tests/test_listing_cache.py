@@ -0,0 +1,65 @@
+"""The listing cache must save whole fetched pages, so Step 2 never requests a page Step 1 already received."""
+import time
+from types import SimpleNamespace
+
+from praw.models.listing.generator import ListingGenerator
+from praw.models.listing.listing import Listing
+
+from src.checkers.check_subreddits import probe_subreddit
+from src.scrapers.listing_cache import ListingCache
+
+
+class FakeReddit:
+    """Serves a 'new' listing of 'post_count' posts in pages of 100 and counts the requests."""
+
+    def __init__(self, post_count, num_comments=5):
+        now = time.time()
+        self.posts = [SimpleNamespace(id=f"p{index}", fullname=f"t3_p{index}", title="title", selftext="",
+                                      score=1, num_comments=num_comments, created_utc=now - index * 60)
+                      for index in range(post_count)]
+        self.requests = 0
+        # Listing objectifies its children through the client; the fake posts are already objects.
+        self._objector = SimpleNamespace(objectify=lambda data: data)
+
+    def get(self, url, params=None):
+        self.requests += 1
+        after = params.get("after")
+        start = next(index for index, post in enumerate(self.posts) if post.fullname == after) + 1 if after else 0
+        page = self.posts[start:start + min(params["limit"], 100)]
+        more = start + len(page) < len(self.posts)
+        return Listing(self, _data={"children": page, "after": page[-1].fullname if page and more else None,
+                                    "before": None})
+
+    def subreddit(self, name):
+        return SimpleNamespace(display_name=name, subscribers=10000,
+                               new=lambda limit=100, params=None: ListingGenerator(self, f"r/{name}/new", limit, params))
+
+
+def probe_then_list(reddit, comment_approve_point):
+    listing_cache = ListingCache()
+    probe_subreddit(reddit, "test", 0, comment_approve_point, 7, listing_cache=listing_cache)
+    probe_requests = reddit.requests
+    posts = list(listing_cache.new(reddit.subreddit("test"), "test"))
+    return listing_cache, probe_requests, posts
+
+
+def test_posts_after_the_approve_point_are_reused_without_a_request():
+    reddit = FakeReddit(250)
+    # The probe stops after 30 posts (150 comments) on the first page.
+    listing_cache, probe_requests, posts = probe_then_list(reddit, comment_approve_point=150)
+
+    assert [post.id for post in posts] == [post.id for post in reddit.posts]
+    assert probe_requests == 1
+    # Only the two pages after the first one are requested again (posts 101-200 and 201-250).
+    assert reddit.requests - probe_requests == 2
+    assert listing_cache.reused_posts == 100
+    assert listing_cache.fetched_posts == 150
+
+
+def test_single_page_listing_is_not_requested_again():
+    reddit = FakeReddit(40)
+    listing_cache, probe_requests, posts = probe_then_list(reddit, comment_approve_point=10)
+
+    assert [post.id for post in posts] == [post.id for post in reddit.posts]
+    assert reddit.requests == probe_requests == 1
+    assert listing_cache.fetched_posts == 0
@@ -0,0 +1,28 @@
+"""Golden check: preprocess_text must stay byte-identical to the original regex implementation."""
+from benchmarks.corpus import raw_corpus
+from benchmarks.text_normalisation import legacy_preprocess_text
+from src.utils.cleaners import preprocess_bodies, preprocess_text
+
+# Code points where the fast paths branch: ASCII digits/punctuation, Unicode digits, marks, spaces, emoji, ligatures.
+EDGE_CASES = [
+    "", " ", "\t\n", "Hello, World!", "https://example.org/a?b=1 rest", "see www.x.com.", "http:/not-a-url",
+    "3.5% of 1,000", "²³ ٣ 五", "naïve café", "é", "İstanbul ÇOK", "ß ẞ ﬁ", "a b　c", "x​y",
+    "😀 👍🏽 🇩🇪", "l'été — “quoted”", "&amp; **bold** _underscore_", "tab\tnew\nline  ",
+]
+
+
+def test_preprocess_text_matches_regex_version_on_fixed_corpus():
+    text_list = raw_corpus(2000) + EDGE_CASES
+    assert [preprocess_text(text) for text in text_list] == [legacy_preprocess_text(text) for text in text_list]
+
+
+def test_preprocess_text_matches_regex_version_on_every_code_point():
+    # Blocks of 256 code points, each between ASCII neighbours, so every character's class is checked.
+    for block in range(0, 0x110000, 256):
+        text = "".join(f"a{chr(code)}b " for code in range(block, block + 256))
+        assert preprocess_text(text) == legacy_preprocess_text(text), f"differs in block U+{block:04X}"
+
+
+def test_preprocess_bodies_matches_regex_version():
+    text_list = raw_corpus(500) + EDGE_CASES
+    assert preprocess_bodies(text_list) == [legacy_preprocess_text(text) for text in text_list]